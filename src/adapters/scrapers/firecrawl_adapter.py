@@ -1,23 +1,45 @@
 # adapters/scrapers/firecrawl.py
 
-from firecrawl import FirecrawlApp
-from models.adapter import ContentAdapter
+from typing import Optional
+from models.adapter import ContentAdapter, ProgressCallback
 from models.database import ExtractedContent
-from services.llm.gemini import summarize_text
+from services.llm.gemini import summarize_text, stream_text_summary, collect_stream
+from utils.rate_limiter import get_limiter
+from utils.registry import services
+from utils.telemetry import stage
 from dotenv import load_dotenv
 load_dotenv()
 import os
 
+def _make_app():
+    from firecrawl import FirecrawlApp
+    return FirecrawlApp(api_key=os.getenv("FIRECRAWL_API_KEY"))
+
+services.register("firecrawl", _make_app)
+
 class FirecrawlAdapter(ContentAdapter):
-    app = FirecrawlApp(api_key=os.getenv("FIRECRAWL_API_KEY"))
+    limiter = get_limiter("firecrawl")
 
     @classmethod
-    def extract(cls, url: str) -> ExtractedContent:
+    def extract(cls, url: str, on_progress: Optional[ProgressCallback] = None) -> ExtractedContent:
         try:
-            result = cls.app.scrape_url(url, formats=["markdown", "html"])
+            with stage("firecrawl.scrape_url"):
+                result = cls.limiter.call(services.get("firecrawl").scrape_url, url, formats=["markdown"])
             metadata = result.metadata or {}
-            content = result.markdown or result.html
-            summary = summarize_text(content) if content else None
+            content = result.markdown
+            if not content:
+                # HTML is only the fallback, so it is fetched for the few
+                # pages without markdown instead of alongside every page
+                with stage("firecrawl.scrape_html"):
+                    result = cls.limiter.call(services.get("firecrawl").scrape_url, url, formats=["html"])
+                metadata = metadata or result.metadata or {}
+                content = result.html
+            if not content:
+                summary = None
+            elif on_progress is None:
+                summary = summarize_text(content)
+            else:
+                summary = collect_stream(stream_text_summary(content), on_progress)
 
             return ExtractedContent(
                 url=metadata.get("sourceURL", url),
@@ -1,20 +1,45 @@
 # adapters/scrapers/images.py
 
-import requests
-from models.adapter import ContentAdapter
+from typing import Optional
+from models.adapter import ContentAdapter, ProgressCallback
 from models.database import ExtractedContent
-from services.llm.gemini import describe_image
+from services.ingest.image_dedup import ImageHashIndex
+from services.llm.gemini import describe_image, stream_image_description, collect_stream
+from utils.image_hash import dhash, is_featureless
+from utils.image_prep import download_image, prepare_for_vision
 
 class ImageAdapter(ContentAdapter):
+    # Perceptual hashes of every image described so far
+    hash_index = ImageHashIndex()
+
     @classmethod
-    def extract(cls, image_url: str) -> ExtractedContent:
-        # Download image bytes
-        response = requests.get(image_url)
-        response.raise_for_status()
-        image_bytes = response.content
+    def extract(cls, image_url: str, on_progress: Optional[ProgressCallback] = None) -> ExtractedContent:
+        # Stream the image with a size cap
+        image_bytes = download_image(image_url)
+        image_hash = dhash(image_bytes)
+        metadata = {"source": "gemini-vision"}
+        if image_hash is not None:
+            metadata["image_hash"] = f"{image_hash:016x}"
 
-        # Get description and OCR from Gemini
-        description = describe_image(image_bytes)
+        # The same image reposted under another CDN URL reuses its description.
+        # Blank and flat images all hash alike, so they are always described,
+        # and so are images PIL can't decode (no hash).
+        featureless = image_hash is None or is_featureless(image_hash)
+        match = None if featureless else cls.hash_index.find(image_hash)
+        if match is not None:
+            description = match.description
+            metadata.update({"duplicate_of": match.url, "hash_distance": match.distance})
+        else:
+            # Shrink it to what Gemini actually looks at, then get
+            # description and OCR
+            prepared, mime_type = prepare_for_vision(image_bytes)
+            if on_progress is None:
+                description = describe_image(prepared, mime_type=mime_type)
+            else:
+                description = collect_stream(stream_image_description(prepared, mime_type=mime_type), on_progress)
+            metadata["mime_type"] = mime_type
+            if not featureless:
+                cls.hash_index.add(image_hash, image_url, description)
 
         return ExtractedContent(
             source="image",
@@ -24,5 +49,5 @@ class ImageAdapter(ContentAdapter):
             content=description,
             tags=[],
             media_type="image",
-            metadata={"source": "gemini-vision"}
+            metadata=metadata
         )
@@ -1,14 +1,18 @@
 # adapters/scrapers/youtube.py
 
-from models.adapter import ContentAdapter
+from typing import Optional
+from models.adapter import ContentAdapter, ProgressCallback
 from models.database import ExtractedContent
-from services.llm.gemini import summarize_youtube_video
+from services.llm.gemini import summarize_youtube_video, stream_youtube_summary, collect_stream
 
 class YouTubeAdapter(ContentAdapter):
     @classmethod
-    def extract(cls, url: str) -> ExtractedContent:
-        summary = summarize_youtube_video(url)
-        
+    def extract(cls, url: str, on_progress: Optional[ProgressCallback] = None) -> ExtractedContent:
+        if on_progress is None:
+            summary = summarize_youtube_video(url)
+        else:
+            summary = collect_stream(stream_youtube_summary(url), on_progress)
+
         return ExtractedContent(
             source="youtube",
             url=url,
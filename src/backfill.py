@@ -0,0 +1,140 @@
+# backfill.py
+#
+# Ingests the links already sitting in channel history, which the bot never
+# saw because it only reacts to new messages.
+#
+#   cd src && python backfill.py --channel 1377194701551173662 --channel ...
+#   cd src && python backfill.py --guild 1234567890 --workers 16
+#
+# Progress is checkpointed in BACKFILL_CHECKPOINT_PATH; running the same
+# command again resumes where the last run stopped.
+
+import argparse
+import logging
+import os
+from typing import Optional
+
+import discord
+from dotenv import load_dotenv
+
+from database.vector_db import flush_documents
+from database.pg_database import close_pool, get_indexed_urls
+from services.ingest.backfill import (
+    BACKFILL_BATCH_SIZE, BACKFILL_CHECKPOINT_PATH, BACKFILL_WORKERS,
+    Backfiller, BackfillCheckpoint, HistoryMessage, HistorySource,
+)
+from services.ingest.pipeline import IngestPipeline
+from services.persist.persist_to_db import persist_many, persist_to_db
+from services.scrape.scrape_links import scrape
+from utils.detect_link_type import detect_scraper_type
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def discord_history(client: discord.Client) -> HistorySource:
+    """Reads a channel's messages through discord.py, oldest first."""
+    async def history(channel_id: int, after: Optional[int]):
+        channel = client.get_channel(channel_id) or await client.fetch_channel(channel_id)
+        guild_id = channel.guild.id if getattr(channel, "guild", None) else None
+        async for message in channel.history(
+            limit=None, after=discord.Object(id=after) if after else None, oldest_first=True
+        ):
+            yield HistoryMessage(
+                id=message.id,
+                channel_id=channel_id,
+                guild_id=guild_id,
+                author_id=message.author.id,
+                content=message.content,
+            )
+    return history
+
+
+async def channels_to_backfill(client: discord.Client, args) -> list[int]:
+    channel_ids = list(args.channel or [])
+    for guild_id in args.guild or []:
+        guild = client.get_guild(guild_id) or await client.fetch_guild(guild_id)
+        for channel in await guild.fetch_channels():
+            if isinstance(channel, discord.TextChannel) and channel.permissions_for(guild.me).read_message_history:
+                channel_ids.append(channel.id)
+    return channel_ids
+
+
+async def run_backfill(client: discord.Client, args):
+    pipeline = IngestPipeline(
+        scrape_fn=scrape,
+        persist_fn=persist_to_db,
+        detect_fn=detect_scraper_type,
+        max_workers=args.workers,
+    )
+    checkpoint = BackfillCheckpoint(args.checkpoint)
+    backfiller = Backfiller(
+        pipeline,
+        persist_many_fn=persist_many,
+        checkpoint=checkpoint,
+        known_fn=get_indexed_urls,
+        workers=args.workers,
+        batch_size=args.batch_size,
+    )
+    try:
+        if args.retry_failed:
+            await backfiller.retry_failed()
+        channel_ids = await channels_to_backfill(client, args)
+        logger.info(f"Backfilling {len(channel_ids)} channel(s)")
+        stats = await backfiller.run(discord_history(client), channel_ids)
+        print(f"✅ Backfill finished: {stats.summary()}")
+    finally:
+        pipeline.shutdown()
+        checkpoint.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest links from existing channel history")
+    parser.add_argument("--channel", type=int, action="append", help="Channel id to backfill (repeatable)")
+    parser.add_argument("--guild", type=int, action="append", help="Backfill every readable text channel of this guild")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    parser.add_argument("--checkpoint", default=BACKFILL_CHECKPOINT_PATH)
+    parser.add_argument("--retry-failed", action="store_true", help="Scrape URLs earlier runs failed on first")
+    args = parser.parse_args()
+    if not args.channel and not args.guild:
+        parser.error("pass at least one --channel or --guild")
+
+    load_dotenv()
+    token = os.getenv("DISCORD_TOKEN")
+    if not token:
+        print("❌ Set DISCORD_TOKEN in your .env")
+        return
+
+    intents = discord.Intents.default()
+    intents.message_content = True
+    client = discord.Client(intents=intents)
+
+    started = False
+
+    @client.event
+    async def on_ready():
+        # on_ready fires again after a reconnect
+        nonlocal started
+        if started:
+            return
+        started = True
+        try:
+            await run_backfill(client, args)
+        except Exception as e:
+            logger.error(f"Backfill failed: {str(e)}", exc_info=True)
+        finally:
+            await client.close()
+
+    try:
+        client.run(token, log_handler=None)
+    finally:
+        flush_documents()
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# src/benchmarks/bench_chroma_batching.py
+#
+# Compares one-document-per-call Chroma writes (the old add_document path)
+# with the batched writes done by ChromaWriteBuffer, on a local persistent
+# client with the default ONNX embedding function.
+#
+#   cd src && python -m benchmarks.bench_chroma_batching --docs 256 --batch-size 64
+
+import argparse
+import random
+import tempfile
+import time
+
+import chromadb
+
+from database.chroma_buffer import ChromaWriteBuffer
+
+WORDS = (
+    "vector database embedding summary discord gemini firecrawl link article "
+    "python async latency throughput index query chunk model token batch"
+).split()
+
+
+def make_documents(count: int, words_per_doc: int) -> list[tuple[str, str, dict]]:
+    rng = random.Random(42)
+    return [
+        (f"https://example.com/{i}", " ".join(rng.choices(WORDS, k=words_per_doc)), {"url": f"https://example.com/{i}"})
+        for i in range(count)
+    ]
+
+
+def bench_single(collection, docs) -> float:
+    start = time.perf_counter()
+    for doc_id, content, metadata in docs:
+        collection.add(ids=[doc_id], documents=[content], metadatas=[metadata])
+    return time.perf_counter() - start
+
+
+def bench_batched(collection, docs, batch_size: int) -> float:
+    buffer = ChromaWriteBuffer(collection, batch_size=batch_size, flush_interval=3600, wal_path=None)
+    start = time.perf_counter()
+    for doc_id, content, metadata in docs:
+        buffer.add(doc_id, content, metadata)
+    buffer.close()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single vs. batched Chroma embedding throughput")
+    parser.add_argument("--docs", type=int, default=256)
+    parser.add_argument("--words", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    docs = make_documents(args.docs, args.words)
+
+    with tempfile.TemporaryDirectory() as path:
+        client = chromadb.PersistentClient(path=path)
+        # Warm the ONNX session so model loading isn't billed to either run
+        client.get_or_create_collection("warmup").add(ids=["w"], documents=["warm up"])
+
+        single = bench_single(client.get_or_create_collection("single"), docs)
+        batched = bench_batched(client.get_or_create_collection("batched"), docs, args.batch_size)
+
+    print(f"documents:          {args.docs} x ~{args.words} words")
+    print(f"single add():       {single:8.2f}s  {args.docs / single:8.1f} docs/s")
+    print(f"batched (size {args.batch_size:>3}): {batched:8.2f}s  {args.docs / batched:8.1f} docs/s")
+    print(f"speedup:            {single / batched:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# src/benchmarks/bench_chunking.py
+#
+# Indexing time and recall@k for whole-page vs. chunked embedding on a corpus
+# of long synthetic markdown pages. Each page hides a handful of unique
+# "facts" at random depths; a query for a fact counts as recalled when its
+# page is among the top-k parents returned.
+#
+#   cd src && python -m benchmarks.bench_chunking --pages 50 --words 5000
+
+import argparse
+import random
+import tempfile
+import time
+
+import chromadb
+
+from utils.chunk_text import chunk_text, chunk_id, collapse_to_parents
+
+FILLER = (
+    "the team discussed general updates about the roadmap and upcoming plans "
+    "while reviewing several notes from previous meetings and other topics"
+).split()
+SUBJECTS = ["kafka", "postgres", "rust", "kubernetes", "redis", "pytorch", "graphql", "terraform", "nginx", "sqlite"]
+PROBLEMS = ["memory leak", "deadlock", "timeout", "cold start", "index bloat", "race condition", "rate limit", "oom kill"]
+
+
+def make_corpus(pages: int, words: int, facts_per_page: int, rng: random.Random):
+    corpus, queries = [], []
+    for p in range(pages):
+        url = f"https://example.com/page-{p}"
+        body = [rng.choice(FILLER) for _ in range(words)]
+        sections = []
+        for f in range(facts_per_page):
+            subject, problem = rng.choice(SUBJECTS), rng.choice(PROBLEMS)
+            fact = f"incident {p}-{f}: {subject} {problem} fixed by tuning setting {rng.randint(1000, 9999)}"
+            body.insert(rng.randrange(len(body)), fact)
+            queries.append((f"{subject} {problem} incident {p}-{f}", url))
+        step = max(len(body) // 8, 1)
+        for s in range(0, len(body), step):
+            sections.append(f"## Section {s // step}\n" + " ".join(body[s:s + step]))
+        corpus.append((url, "\n".join(sections)))
+    return corpus, queries
+
+
+def index(collection, corpus, chunked: bool) -> float:
+    start = time.perf_counter()
+    ids, docs, metas = [], [], []
+    for url, text in corpus:
+        pieces = chunk_text(text) if chunked else [text]
+        for i, piece in enumerate(pieces):
+            ids.append(chunk_id(url, i) if chunked else url)
+            docs.append(piece)
+            metas.append({"parent_url": url})
+    batch = 256
+    for i in range(0, len(ids), batch):
+        collection.add(ids=ids[i:i + batch], documents=docs[i:i + batch], metadatas=metas[i:i + batch])
+    return time.perf_counter() - start
+
+
+def recall_at_k(collection, queries, k: int, oversample: int) -> float:
+    found = 0
+    for query, url in queries:
+        results = collection.query(query_texts=[query], n_results=k * oversample)
+        if url in collapse_to_parents(results, k)["ids"][0]:
+            found += 1
+    return found / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whole-page vs. chunked indexing benchmark")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--words", type=int, default=5000)
+    parser.add_argument("--facts", type=int, default=4)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus, queries = make_corpus(args.pages, args.words, args.facts, random.Random(7))
+
+    with tempfile.TemporaryDirectory() as path:
+        client = chromadb.PersistentClient(path=path)
+        client.get_or_create_collection("warmup").add(ids=["w"], documents=["warm up"])
+
+        whole = client.get_or_create_collection("whole")
+        chunked = client.get_or_create_collection("chunked")
+        whole_time = index(whole, corpus, chunked=False)
+        chunked_time = index(chunked, corpus, chunked=True)
+
+        whole_recall = recall_at_k(whole, queries, args.k, oversample=1)
+        chunked_recall = recall_at_k(chunked, queries, args.k, oversample=4)
+
+    print(f"corpus:   {args.pages} pages x ~{args.words} words, {len(queries)} queries")
+    print(f"whole:    index {whole_time:7.2f}s  recall@{args.k} {whole_recall:.2%}")
+    print(f"chunked:  index {chunked_time:7.2f}s  recall@{args.k} {chunked_recall:.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+# src/benchmarks/bench_end_to_end.py
+#
+# Throughput of the whole message path: on_message → job queue → detect →
+# scrape (Firecrawl / Gemini) → persist_to_db → vector store, with every
+# upstream replaced by a local stand-in so runs are repeatable offline and
+# can be compared between commits.
+#
+#   cd src && python -m benchmarks.bench_end_to_end --messages 200 --concurrency 16
+#   cd src && python -m benchmarks.bench_end_to_end --json before.json
+#   cd src && python -m benchmarks.bench_end_to_end --json after.json --compare before.json
+#   cd src && python -m benchmarks.bench_end_to_end --gemini-error-rate 0.05 --mix link=6,youtube=2,image=2
+#   cd src && python -m benchmarks.bench_end_to_end --dsn postgres://localhost/bench
+#
+# Gemini and Firecrawl are HTTP servers in a child process
+# (benchmarks/fake_upstreams.py); the real google-genai and firecrawl
+# clients reach them through GEMINI_BASE_URL and FIRECRAWL_API_URL.
+# Postgres is a SQLite file behind the real PgPool unless --dsn names a
+# local server (a throwaway schema is created there; --content-storage
+# compressed moves page bodies into content_blobs), and the vector store
+# (Chroma, or the NumPy one with --vector-backend numpy) is a temporary
+# directory with a hashing embedding instead of the ONNX model
+# (--embedding onnx keeps the real one, which is downloaded on first use).
+# The run happens in a temporary working directory, so the job queue, LLM and
+# embedding caches and write-ahead files start empty.
+#
+# Upstream rate limits are lifted unless --keep-rate-limits is given, so the
+# numbers measure the bot rather than the API quotas. Per-URL latency runs
+# from submission to the job queue until its result; peak memory is the
+# process's maximum RSS, which excludes the fake servers.
+
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA = "bench_end_to_end"
+
+# Checked by --compare: (result path, True if higher is better)
+COMPARED = [
+    ("messages_per_s", True),
+    ("url_latency_ms.p50", False),
+    ("url_latency_ms.p95", False),
+    ("peak_rss_mb", False),
+]
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    pick = lambda q: round(ordered[min(int(q * len(ordered)), len(ordered) - 1)], 1)
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1], 1)}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in ("link", "youtube", "image"):
+            raise ValueError(f"Unknown URL kind {kind!r} in --mix; use link, youtube or image")
+        weights[kind] = float(weight or 1)
+    return weights
+
+
+def make_plan(args, upstream_url: str) -> list[list[str]]:
+    """The URLs each message carries; --duplicate-rate of them repeat an earlier one."""
+    rng = random.Random(args.seed)
+    weights = parse_mix(args.mix)
+    numbers = itertools.count()
+    seen, plan = [], []
+    for _ in range(args.messages):
+        urls = []
+        for _ in range(args.urls_per_message):
+            if seen and rng.random() < args.duplicate_rate:
+                urls.append(rng.choice(seen))
+                continue
+            kind = rng.choices(list(weights), list(weights.values()))[0]
+            n = next(numbers)
+            url = {
+                "link": f"https://bench.example.com/articles/{n}",
+                "youtube": f"https://www.youtube.com/watch?v=bench{n:06d}",
+                "image": f"{upstream_url}/images/{n}.png",
+            }[kind]
+            seen.append(url)
+            urls.append(url)
+        plan.append(urls)
+    return plan
+
+
+def configure_environment(args, upstream_url: str):
+    # Read at import time by the modules under test, so set before importing them
+    os.environ.update({
+        "GEMINI_API_KEY": "benchmark",
+        "GEMINI_BASE_URL": upstream_url,
+        "FIRECRAWL_API_KEY": "benchmark",
+        "FIRECRAWL_API_URL": upstream_url,
+        "VECTOR_BACKEND": args.vector_backend,
+        "CONTENT_STORAGE": args.content_storage,
+        "TELEMETRY_EXPORTER": "none",
+        "TELEMETRY_WINDOW": str(10 ** 6),
+        "WARM_UP_SERVICES": "false",
+        # Chroma's product telemetry would try to reach the network
+        "ANONYMIZED_TELEMETRY": "False",
+    })
+    if not args.keep_rate_limits:
+        for name in ("GEMINI_TEXT_RPS", "GEMINI_VISION_RPS", "FIRECRAWL_RPS"):
+            os.environ[name] = "1000"
+
+
+def install_database(args):
+    """Points pg_database at SQLite, or at a fresh schema on --dsn."""
+    from database import pg_database
+    from database.pg_pool import PgPool
+
+    if args.dsn:
+        import psycopg2
+        from database.scripts.migrate_to_neon_db import apply_migrations
+        conn = psycopg2.connect(args.dsn)
+        conn.autocommit = True
+        cur = conn.cursor()
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        cur.execute(f"SET search_path TO {SCHEMA}")
+        apply_migrations(conn)
+        conn.close()
+        connect = partial(psycopg2.connect, args.dsn, options=f"-c search_path={SCHEMA}")
+    else:
+        from tests.conftest import SqliteConnection
+        connect = partial(SqliteConnection, os.path.abspath("bench.sqlite3"))
+    pg_database._pool = PgPool(connect_fn=connect)
+
+
+def drop_schema(args):
+    if args.dsn and not args.keep:
+        import psycopg2
+        conn = psycopg2.connect(args.dsn)
+        conn.autocommit = True
+        conn.cursor().execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.close()
+
+
+def count_rows() -> int:
+    from database.pg_database import get_pool
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM scraped_content")
+            return cur.fetchone()[0]
+
+
+async def drive(bot_module, plan: list[list[str]], args) -> dict:
+    from benchmarks.standins import FakeChannel, FakeGuild, FakeMessage
+
+    workers = bot_module.workers
+    url_latencies, message_latencies = [], []
+    outcomes = {"ok": 0, "failed": 0, "queued": 0}
+    submit = workers.submit
+
+    async def timed_submit(url, payload=None, on_progress=None):
+        started = time.perf_counter()
+        future = await submit(url, payload, on_progress=on_progress)
+
+        def finished(f):
+            if f.cancelled():
+                # Still retrying when on_message stopped waiting
+                outcomes["queued"] += 1
+                return
+            url_latencies.append((time.perf_counter() - started) * 1000)
+            outcomes["failed" if f.exception() is not None else "ok"] += 1
+
+        future.add_done_callback(finished)
+        return future
+
+    workers.submit = timed_submit
+
+    guild = FakeGuild(1)
+    channels = [FakeChannel(100 + index, guild) for index in range(args.channels)]
+    messages = [FakeMessage(channels[index % len(channels)], " ".join(urls)) for index, urls in enumerate(plan)]
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def handle(message):
+        async with limit:
+            started = time.perf_counter()
+            await bot_module.on_message(message)
+            message_latencies.append((time.perf_counter() - started) * 1000)
+
+    workers.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(handle(message) for message in messages))
+    elapsed = time.perf_counter() - started
+    await workers.stop()
+
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "messages_per_s": round(len(messages) / elapsed, 2),
+        "urls_per_s": round(sum(outcomes.values()) / elapsed, 2),
+        "url_latency_ms": percentiles(url_latencies),
+        "message_latency_ms": percentiles(message_latencies),
+        "outcomes": outcomes,
+        "discord_calls": sum(channel.calls for channel in channels),
+    }
+
+
+async def measure(args, upstream_url: str) -> dict:
+    configure_environment(args, upstream_url)
+    started = time.perf_counter()
+    import discord.discord_bot as bot_module
+    from database.vector_db import flush_documents, get_store
+    from database.pg_database import close_pool
+    from utils.registry import services
+    from utils.telemetry import stats
+    import_s = time.perf_counter() - started
+
+    install_database(args)
+    if args.embedding == "hash":
+        from benchmarks.standins import HashEmbedding
+        # Behind the embedding service, so its caches are exercised as in the bot
+        services.register("embedder", HashEmbedding)
+
+    pipeline = bot_module.pipeline
+    started = time.perf_counter()
+    await pipeline.run_blocking(services.warm_up)
+    warm_up_s = time.perf_counter() - started
+
+    plan = make_plan(args, upstream_url)
+    if args.tracemalloc:
+        tracemalloc.start()
+    try:
+        results = await drive(bot_module, plan, args)
+        started = time.perf_counter()
+        await pipeline.run_blocking(flush_documents)
+        results["vector_flush_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if args.tracemalloc:
+            results["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+        results["rows"] = await pipeline.run_blocking(count_rows)
+        results["chunks"] = await pipeline.run_blocking(lambda: get_store().count())
+    finally:
+        if args.tracemalloc:
+            tracemalloc.stop()
+        pipeline.shutdown(wait=False)
+        bot_module.job_queue.close()
+        close_pool()
+        drop_schema(args)
+
+    results["import_ms"] = round(import_s * 1000, 1)
+    results["warm_up_ms"] = round(warm_up_s * 1000, 1)
+    results["stages"] = {
+        summary.stage: summary.model_dump(exclude={"stage"}) for summary in stats.snapshot()
+    }
+    return results
+
+
+def run(args) -> dict:
+    from benchmarks.fake_upstreams import UpstreamConfig, serve_upstreams
+
+    config = UpstreamConfig(**{
+        name: getattr(args, name) for name in UpstreamConfig.model_fields if hasattr(args, name)
+    })
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    upstream = context.Process(target=serve_upstreams, args=(config.model_dump(), ready), daemon=True)
+    upstream.start()
+    try:
+        upstream_url = f"http://127.0.0.1:{ready.get(timeout=60)}"
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            try:
+                results = asyncio.run(measure(args, upstream_url))
+            finally:
+                os.chdir(cwd)
+    finally:
+        upstream.terminate()
+        upstream.join()
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    results["upstreams"] = config.model_dump()
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SRC, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def lookup(results: dict, path: str):
+    for key in path.split("."):
+        if not isinstance(results, dict) or key not in results:
+            return None
+        results = results[key]
+    return results
+
+
+def compare(before: dict, after: dict, max_regression: float) -> list[str]:
+    """Prints before/after for the COMPARED metrics; returns the ones that regressed past the threshold."""
+    print(f"\nvs {before.get('commit', '?')}:")
+    changed = sorted(
+        key for key in set(before.get("config", {})) | set(after["config"])
+        if before.get("config", {}).get(key) != after["config"].get(key)
+    )
+    if changed:
+        print(f"  (runs differ in {', '.join(changed)}; the comparison may not be like for like)")
+    failures = []
+    for path, higher_is_better in COMPARED:
+        old, new = lookup(before, path), lookup(after, path)
+        if not old or new is None:
+            continue
+        change = (new - old) / old * 100
+        worse_by = -change if higher_is_better else change
+        print(f"  {path:<22}{old:>10}{new:>10}{change:>+9.1f}%")
+        if worse_by > max_regression:
+            failures.append(f"{path} {old} -> {new}")
+    return failures
+
+
+def main():
+    # Imports are resolved from src/ even after the run chdirs away
+    sys.path.insert(0, SRC)
+
+    parser = argparse.ArgumentParser(description="Offline end-to-end ingest benchmark")
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--urls-per-message", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=16, help="Messages handled at once")
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--mix", default="link=8,youtube=1,image=1", help="Relative weights of URL kinds")
+    parser.add_argument("--duplicate-rate", type=float, default=0.1, help="Share of URLs that repeat an earlier one")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gemini-latency-ms", type=float, default=400)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0, help="Share of Gemini calls answered with a 429")
+    parser.add_argument("--firecrawl-latency-ms", type=float, default=800)
+    parser.add_argument("--firecrawl-error-rate", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.25, help="Relative standard deviation of upstream latency")
+    parser.add_argument("--page-kb", type=int, default=8, help="Markdown per scraped page")
+    parser.add_argument("--dsn", help="Local Postgres to use instead of the SQLite shim")
+    parser.add_argument("--keep", action="store_true", help="Keep the --dsn schema afterwards")
+    parser.add_argument("--embedding", choices=["hash", "onnx"], default="hash")
+    parser.add_argument("--vector-backend", choices=["chroma", "numpy"], default="chroma")
+    parser.add_argument("--content-storage", choices=["inline", "compressed"], default="inline")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="Pace upstream calls as in production")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report the peak of Python allocations (slower)")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Results file of an earlier run to compare with")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="Percent a compared metric may worsen")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            key: value for key, value in vars(args).items() if key not in ("json", "compare", "max_regression")
+        },
+        **run(args),
+    }
+
+    outcomes = results["outcomes"]
+    print(
+        f"{args.messages} messages in {results['elapsed_s']}s: {results['messages_per_s']} msg/s, "
+        f"{results['urls_per_s']} URL/s ({outcomes['ok']} ok, {outcomes['failed']} failed, {outcomes['queued']} still queued)"
+    )
+    for name in ("url_latency_ms", "message_latency_ms"):
+        print(f"{name}: " + ", ".join(f"{q}={ms}" for q, ms in results[name].items()))
+    print(f"peak RSS {results['peak_rss_mb']} MB, {results['discord_calls']} Discord calls, "
+          f"{results['rows']} rows, {results['chunks']} chunks, vector flush {results['vector_flush_ms']}ms")
+    for stage, summary in results["stages"].items():
+        print(f"  {stage:<22}n={summary['count']:<6}p50={summary['p50_ms']:.0f}ms p95={summary['p95_ms']:.0f}ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            failures = compare(json.load(f), results, args.max_regression)
+        if failures:
+            print("FAIL: regressed more than " + f"{args.max_regression}%: " + "; ".join(failures))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
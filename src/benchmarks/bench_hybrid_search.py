@@ -0,0 +1,149 @@
+# src/benchmarks/bench_hybrid_search.py
+#
+# p50/p95 query latency and recall@k for full-text, vector and hybrid (RRF)
+# search over a synthetic corpus. Needs a local Postgres to seed; rows go into
+# a throwaway `bench_hybrid` schema, vectors into a temp Chroma directory.
+#
+#   cd src && python -m benchmarks.bench_hybrid_search \
+#       --dsn postgresql://postgres@localhost/postgres --rows 100000 --queries 500
+#
+# Each row carries one unique exact-match term (an error code or a handle)
+# mixed into topical filler; queries ask for that term plus a topic, and the
+# row that owns the term is the single relevant result.
+
+import argparse
+import functools
+import json
+import random
+import statistics
+import tempfile
+import time
+
+import chromadb
+import psycopg2
+from psycopg2.extras import execute_values
+
+from database import pg_database
+from database.pg_pool import PgPool
+from database.scripts.migrate_to_neon_db import MIGRATION_SQL
+from services.search import hybrid_search
+from utils.chunk_text import collapse_to_parents
+
+SCHEMA = "bench_hybrid"
+TOPICS = {
+    "databases": "postgres index vacuum query planner replication",
+    "frontend": "react component render state hooks css layout",
+    "ml": "model training gradient embedding dataset inference",
+    "devops": "kubernetes deploy container helm rollout cluster",
+    "networking": "socket tls handshake latency packet timeout",
+}
+
+
+def make_rows(count: int, rng: random.Random):
+    rows = []
+    for i in range(count):
+        topic = rng.choice(list(TOPICS))
+        term = f"ERR_{i:06d}" if i % 2 else f"@user{i:06d}"
+        words = TOPICS[topic].split()
+        summary = f"{term} " + " ".join(rng.choices(words, k=12))
+        rows.append((f"https://bench.example/{i}", topic, term, summary))
+    return rows
+
+
+def seed_postgres(dsn: str, rows):
+    conn = psycopg2.connect(dsn)
+    with conn, conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}; SET search_path TO {SCHEMA}")
+        cur.execute(MIGRATION_SQL)
+        execute_values(
+            cur,
+            "INSERT INTO scraped_content (url, summary, source) VALUES %s",
+            [(url, summary, "bench") for url, _, _, summary in rows],
+            page_size=5000,
+        )
+        cur.execute("ANALYZE scraped_content")
+    conn.close()
+
+
+def seed_chroma(collection, rows, batch: int = 1000):
+    for start in range(0, len(rows), batch):
+        chunk = rows[start:start + batch]
+        collection.add(
+            ids=[url for url, _, _, _ in chunk],
+            documents=[summary for _, _, _, summary in chunk],
+            metadatas=[{"url": url} for url, _, _, _ in chunk],
+        )
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def run(name: str, search, queries, k: int) -> dict:
+    latencies, found = [], 0
+    for query, relevant in queries:
+        start = time.perf_counter()
+        urls = search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found += relevant in urls
+    return {
+        "method": name,
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        f"recall@{k}": round(found / len(queries), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hybrid search latency and recall benchmark")
+    parser.add_argument("--dsn", required=True, help="Local Postgres connection string")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    rows = make_rows(args.rows, rng)
+    queries = [(f"{term} {TOPICS[topic].split()[0]}", url) for url, topic, term, _ in rng.sample(rows, args.queries)]
+
+    print(f"Seeding {args.rows} rows...")
+    seed_postgres(args.dsn, rows)
+    pg_database._pool = PgPool(
+        min_size=1, max_size=4,
+        connect_fn=functools.partial(psycopg2.connect, args.dsn, options=f"-c search_path={SCHEMA}"),
+    )
+
+    with tempfile.TemporaryDirectory() as path:
+        collection = chromadb.PersistentClient(path=path).get_or_create_collection("bench")
+        seed_chroma(collection, rows)
+
+        def vector_search(query, n):
+            return collapse_to_parents(collection.query(query_texts=[query], n_results=n), n)
+
+        def text_only(query, k):
+            return [url for url, _, _ in pg_database.search_full_text(query, limit=k)]
+
+        def vector_only(query, k):
+            return vector_search(query, k)["ids"][0]
+
+        def hybrid(query, k):
+            hits = hybrid_search(query, pg_database.search_full_text, vector_search, page=0, page_size=k)
+            return [hit.url for hit in hits]
+
+        results = [run(name, fn, queries, args.k) for name, fn in (
+            ("text", text_only), ("vector", vector_only), ("hybrid", hybrid),
+        )]
+
+    pg_database.close_pool()
+
+    for result in results:
+        print("  ".join(f"{key}={value}" for key, value in result.items()))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"rows": args.rows, "queries": args.queries, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# src/benchmarks/bench_image_hash.py
+#
+# Near-duplicate lookup latency over a large perceptual-hash index:
+# multi-index hashing against a vectorised NumPy linear scan.
+#
+#   cd src && python -m benchmarks.bench_image_hash --images 1000000 --queries 2000
+#
+# Stored hashes are uniformly random 64-bit values. Half the queries are
+# stored hashes with 0..max-distance bits flipped (reposts), half are fresh
+# random hashes (new images). Real dHashes cluster more than uniform ones,
+# which makes some buckets fuller; the index's memory and build time are
+# reported alongside latency.
+
+import argparse
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+
+from utils.image_hash import MultiIndexHash
+
+# Bit counts of every byte value, for the NumPy popcount
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def linear_nearest(hashes: np.ndarray, query: int, max_distance: int):
+    distances = POPCOUNT[(hashes ^ np.uint64(query)).view(np.uint8)].reshape(-1, 8).sum(axis=1)
+    best = int(distances.argmin())
+    return (int(hashes[best]), int(distances[best])) if distances[best] <= max_distance else None
+
+
+def run(name: str, lookup, queries) -> dict:
+    latencies, found = [], 0
+    for query, _ in queries:
+        start = time.perf_counter()
+        result = lookup(query)
+        latencies.append((time.perf_counter() - start) * 1e6)
+        found += result is not None
+    return {
+        "method": name,
+        "p50_us": round(statistics.median(latencies), 1),
+        "p99_us": round(percentile(latencies, 0.99), 1),
+        "matched": found,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perceptual hash lookup benchmark")
+    parser.add_argument("--images", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--max-distance", type=int, default=6)
+    parser.add_argument("--linear-queries", type=int, default=100, help="Queries to time the linear scan on")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    stored = [rng.getrandbits(64) for _ in range(args.images)]
+
+    queries = []
+    for i in range(args.queries):
+        if i % 2:
+            queries.append((rng.getrandbits(64), False))
+        else:
+            value = rng.choice(stored)
+            for bit in rng.sample(range(64), rng.randint(0, args.max_distance)):
+                value ^= 1 << bit
+            queries.append((value, True))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = MultiIndexHash(max_distance=args.max_distance)
+    for value in stored:
+        index.add(value)
+    build_s = time.perf_counter() - start
+    index_mb = tracemalloc.get_traced_memory()[0] / 1e6
+    tracemalloc.stop()
+
+    hashes = np.array(stored, dtype=np.uint64)
+    results = [
+        run("multi-index", index.nearest, queries),
+        run("numpy-linear", lambda q: linear_nearest(hashes, q, args.max_distance), queries[:args.linear_queries]),
+    ]
+
+    print(f"images={args.images} build={build_s:.1f}s index_memory={index_mb:.0f}MB")
+    for result in results:
+        print("  ".join(f"{key}={value}" for key, value in result.items()))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"images": args.images, "build_s": build_s, "index_mb": index_mb, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# src/benchmarks/bench_image_prep.py
+#
+# Latency, peak memory and payload size of getting an image ready for Gemini
+# vision: the old path (requests.get(...).content plus a base64 round-trip,
+# sent at full size) against streamed download + downscale/re-encode. Both
+# paths end with the base64 encoding google-genai applies to inline image
+# data, and report the vision tokens Gemini bills for the image they send.
+#
+#   cd src && python -m benchmarks.bench_image_prep --repeat 5
+#
+# Fixtures are generated into a temp directory and served over local HTTP:
+# a noisy 24MP JPEG photo, a 4K screenshot-style PNG and a large transparent
+# PNG. Each path runs in its own process so peak RSS is not shared.
+
+import argparse
+import base64
+import functools
+import io
+import json
+import math
+import multiprocessing
+import statistics
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+from PIL import Image, ImageDraw
+
+from utils.image_prep import download_image, prepare_for_vision
+
+
+def make_fixtures(directory: str) -> list[str]:
+    rng = np.random.default_rng(7)
+
+    # Camera photo: smooth gradient plus sensor noise, hard to compress
+    y, x = np.mgrid[0:4000, 0:6000]
+    photo = np.stack([x * 255 // 6000, y * 255 // 4000, (x + y) * 255 // 10000], axis=-1)
+    photo = np.clip(photo + rng.normal(0, 12, photo.shape), 0, 255).astype(np.uint8)
+    Image.fromarray(photo).save(f"{directory}/photo.jpg", quality=95)
+
+    # Screenshot: flat background with lots of small text-like strokes
+    shot = Image.new("RGB", (3840, 2160), "white")
+    draw = ImageDraw.Draw(shot)
+    for row in range(0, 2160, 18):
+        for col in range(0, 3840, 9):
+            if rng.random() < 0.6:
+                draw.line([(col, row), (col + 6, row + rng.integers(4, 12))], fill="black")
+    shot.save(f"{directory}/screenshot.png")
+
+    # Transparent diagram
+    diagram = Image.new("RGBA", (5000, 3000), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(diagram)
+    for _ in range(400):
+        x0, y0 = int(rng.integers(0, 4800)), int(rng.integers(0, 2800))
+        draw.rectangle([x0, y0, x0 + 200, y0 + 120], outline=(20, 90, 200, 255), width=4)
+    diagram.save(f"{directory}/diagram.png")
+
+    return ["photo.jpg", "screenshot.png", "diagram.png"]
+
+
+def peak_rss_mb() -> float:
+    # VmHWM belongs to this process's address space; ru_maxrss would include
+    # the parent's peak, which survives fork + exec
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def vision_tokens(data: bytes) -> int:
+    # Gemini 2.x: 258 tokens for images up to 384px a side, otherwise 258 per
+    # 768x768 tile
+    width, height = Image.open(io.BytesIO(data)).size
+    if max(width, height) <= 384:
+        return 258
+    return 258 * math.ceil(width / 768) * math.ceil(height / 768)
+
+
+def old_path(url: str) -> bytes:
+    response = requests.get(url)
+    response.raise_for_status()
+    image_bytes = response.content
+    return base64.b64decode(base64.b64encode(image_bytes).decode("utf-8"))
+
+
+def new_path(url: str) -> bytes:
+    prepared, _ = prepare_for_vision(download_image(url))
+    return prepared
+
+
+def measure(name: str, base: str, files: list[str], repeat: int, queue):
+    fn = old_path if name == "old" else new_path
+    baseline = peak_rss_mb()
+    results = {}
+    for file in files:
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            payload = fn(f"{base}/{file}")
+            request_body = base64.b64encode(payload)
+            latencies.append((time.perf_counter() - start) * 1000)
+            del request_body
+        results[file] = {
+            "p50_ms": round(statistics.median(latencies), 1),
+            "sent_bytes": len(payload),
+            "vision_tokens": vision_tokens(payload),
+        }
+    queue.put({"path": name, "peak_rss_growth_mb": round(peak_rss_mb() - baseline, 1), "images": results})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Image download and preparation benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = make_fixtures(directory)
+        sizes = {file: len(open(f"{directory}/{file}", "rb").read()) for file in files}
+        handler = functools.partial(QuietHandler, directory=directory)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+
+        ctx = multiprocessing.get_context("spawn")
+        results = []
+        for name in ("old", "new"):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=measure, args=(name, base, files, args.repeat, queue))
+            proc.start()
+            results.append(queue.get())
+            proc.join()
+        server.shutdown()
+
+    print("fixtures: " + "  ".join(f"{file}={size / 1e6:.1f}MB" for file, size in sizes.items()))
+    for result in results:
+        print(f"{result['path']}: peak_rss_growth={result['peak_rss_growth_mb']}MB")
+        for file, stats in result["images"].items():
+            print(
+                f"  {file}: p50={stats['p50_ms']}ms sent={stats['sent_bytes'] / 1e6:.2f}MB "
+                f"tokens={stats['vision_tokens']}"
+            )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"fixtures": sizes, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# src/benchmarks/bench_recent_entries.py
+#
+# Latency of the keyset "recent entries" page against the old OFFSET query,
+# on a seeded table in a throwaway schema, and a check that the page CTE is
+# answered by an index-only scan; it exits non-zero when it isn't.
+#
+#   cd src && python -m benchmarks.bench_recent_entries --dsn postgres://... --rows 2000000
+#
+# Rows are spread over 30 days, 50 guilds and 500 channels, with a 2 KB
+# content column so the heap is realistically wide. The schema is dropped
+# afterwards unless --keep is given.
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import psycopg2
+
+from database.pg_database import build_recent_entries_query
+from database.scripts.migrate_to_neon_db import MIGRATIONS, apply_migrations
+from models.database import EntryCursor
+
+SCHEMA = "bench_recent_entries"
+
+SEED_SQL = """
+INSERT INTO scraped_content (url, content, summary, source, created_at, guild_id, channel_id, submitter_id)
+SELECT
+    'https://example.com/' || g,
+    repeat(md5(g::text), 64),
+    'Summary of item ' || g,
+    'bench',
+    NOW() - (random() * INTERVAL '30 days'),
+    (g %% 50) + 1,
+    (g %% 500) + 1,
+    (g %% 5000) + 1
+FROM generate_series(1, %(rows)s) AS g
+"""
+
+# The query get_recent_entries ran before keyset pagination
+OFFSET_SQL = """
+    SELECT url, COALESCE(summary, LEFT(content, 500)), created_at
+    FROM scraped_content
+    WHERE created_at >= %(since)s
+    ORDER BY created_at DESC
+    LIMIT %(limit)s OFFSET %(offset)s
+"""
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def page_scan(cur, sql: str, params: dict) -> str:
+    """Node type of the scan that reads the page CTE (the join back uses the primary key)."""
+    cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    plan = cur.fetchone()[0][0]["Plan"]
+    for node in plan_nodes(plan):
+        if node["Node Type"].endswith("Scan") and node.get("Index Name", "").startswith("idx_scraped_"):
+            return node["Node Type"]
+    return "none"
+
+
+def timed(cur, sql: str, params: dict, runs: int) -> dict:
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        cur.execute(sql, params)
+        cur.fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": round(statistics.median(latencies), 2), "p99_ms": round(percentile(latencies, 0.99), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyset pagination benchmark")
+    parser.add_argument("--dsn", required=True)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=50, help="Depth to page to for the deep-page comparison")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded schema")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"SET search_path TO {SCHEMA}")
+
+    # Baseline first so the seed goes in before the keyset indexes are built
+    apply_migrations(conn, MIGRATIONS[:2])
+    start = time.perf_counter()
+    cur.execute(SEED_SQL, {"rows": args.rows})
+    seed_s = time.perf_counter() - start
+    start = time.perf_counter()
+    apply_migrations(conn)
+    index_s = time.perf_counter() - start
+    cur.execute("VACUUM ANALYZE scraped_content")
+
+    since = datetime.now(timezone.utc) - timedelta(hours=24)
+    rng = random.Random(3)
+    limit = 10
+    scopes = {
+        "all": {},
+        "guild": {"guild_id": rng.randint(1, 50)},
+        "channel": {"channel_id": rng.randint(1, 500)},
+    }
+
+    results = []
+    for scope, filters in scopes.items():
+        sql, params = build_recent_entries_query(limit, since=since, **filters)
+        results.append({"query": f"keyset-first-{scope}", "scan": page_scan(cur, sql, params), **timed(cur, sql, params, args.runs)})
+
+    # Walk --pages pages deep with the cursor, then time the next page both ways
+    cursor = None
+    for _ in range(args.pages):
+        sql, params = build_recent_entries_query(limit, before=cursor)
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        cursor = EntryCursor(created_at=rows[-1][3], id=rows[-1][0])
+    sql, params = build_recent_entries_query(limit, before=cursor)
+    results.append({"query": f"keyset-page-{args.pages}", "scan": page_scan(cur, sql, params), **timed(cur, sql, params, args.runs)})
+    offset_params = {"since": datetime.min.replace(tzinfo=timezone.utc), "limit": limit, "offset": limit * args.pages}
+    results.append({"query": f"offset-page-{args.pages}", "scan": "-", **timed(cur, OFFSET_SQL, offset_params, args.runs)})
+
+    print(f"rows={args.rows} seed={seed_s:.1f}s keyset_indexes={index_s:.1f}s")
+    for result in results:
+        print("  ".join(f"{key}={value}" for key, value in result.items()))
+    bad = [r["query"] for r in results if r["query"].startswith("keyset") and r["scan"] != "Index Only Scan"]
+
+    if not args.keep:
+        cur.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+    conn.close()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"rows": args.rows, "seed_s": seed_s, "index_s": index_s, "results": results}, f, indent=2)
+
+    if bad:
+        print(f"FAIL: page CTE not index-only for {', '.join(bad)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
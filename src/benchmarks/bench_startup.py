@@ -0,0 +1,135 @@
+# src/benchmarks/bench_startup.py
+#
+# Cold-start cost of the bot process: wall-clock to import the bot module
+# (everything before the gateway connects), the slowest imports from
+# `python -X importtime`, and what the background warm-up then spends per
+# service.
+#
+#   cd src && python -m benchmarks.bench_startup --runs 5
+#   cd src && python -m benchmarks.bench_startup --max-import-ms 1500   # fail if slower
+#   cd src && DISCORD_TOKEN=... python -m benchmarks.bench_startup --live
+#
+# Every run is a fresh interpreter in a temporary working directory, so the
+# SQLite queues and caches it opens start empty. Dummy API keys are set when
+# none are configured; nothing is called over the network unless --live or
+# --warm-up is given (warm-up of Chroma downloads the ONNX model on first use).
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_PROBE = """
+import json, time
+started = time.perf_counter()
+import discord.discord_bot
+imported = time.perf_counter() - started
+result = {"import_s": imported}
+if WARM_UP:
+    from utils.registry import services
+    result["warm_up_s"] = services.warm_up()
+print("RESULT " + json.dumps(result))
+"""
+
+LIVE_PROBE = """
+import asyncio, json, os, time
+started = time.perf_counter()
+import discord.discord_bot as bot_module
+imported = time.perf_counter() - started
+
+async def main():
+    bot = bot_module.bot
+    async def probe():
+        await bot.wait_until_ready()
+        print("RESULT " + json.dumps({"import_s": imported, "ready_s": time.perf_counter() - started}))
+        await bot.close()
+    async with bot:
+        asyncio.create_task(probe())
+        await bot.start(os.environ["DISCORD_TOKEN"])
+
+asyncio.run(main())
+"""
+
+
+def run_probe(code: str, importtime: bool = False) -> tuple[dict, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = SRC + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("GEMINI_API_KEY", "benchmark")
+    env.setdefault("FIRECRAWL_API_KEY", "benchmark")
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True, timeout=600)
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("RESULT ")]
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f"Probe failed ({proc.returncode}):\n{proc.stderr[-2000:]}")
+    return json.loads(lines[-1][len("RESULT "):]), proc.stderr
+
+
+def slowest_imports(stderr: str, top: int) -> list[dict]:
+    """Top-level packages by cumulative import time, from -X importtime output."""
+    totals = {}
+    # Lines look like "import time:  self |  cumulative |   <indent>name"
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:
+            totals[name.strip()] = max(totals.get(name.strip(), 0), int(cumulative_us))
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"module": module, "cumulative_ms": round(us / 1000, 1)} for module, us in ranked]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="Slowest imports to list")
+    parser.add_argument("--warm-up", action="store_true", help="Also time services.warm_up() after import")
+    parser.add_argument("--live", action="store_true", help="Connect with DISCORD_TOKEN and time until on_ready")
+    parser.add_argument("--max-import-ms", type=float, help="Exit non-zero if the median import is slower")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    probe = IMPORT_PROBE.replace("WARM_UP", str(args.warm_up))
+    runs = [run_probe(probe)[0] for _ in range(args.runs)]
+    import_ms = [run["import_s"] * 1000 for run in runs]
+    _, importtime = run_probe(IMPORT_PROBE.replace("WARM_UP", "False"), importtime=True)
+
+    results = {
+        "runs": args.runs,
+        "import_ms_median": round(statistics.median(import_ms), 1),
+        "import_ms_min": round(min(import_ms), 1),
+        "slowest_imports": slowest_imports(importtime, args.top),
+    }
+    if args.warm_up:
+        results["warm_up_ms"] = {
+            name: round(statistics.median(run["warm_up_s"].get(name, 0) for run in runs) * 1000, 1)
+            for name in runs[0]["warm_up_s"]
+        }
+    if args.live:
+        live, _ = run_probe(LIVE_PROBE)
+        results["ready_ms"] = round(live["ready_s"] * 1000, 1)
+
+    print(f"import: median={results['import_ms_median']}ms min={results['import_ms_min']}ms over {args.runs} run(s)")
+    for entry in results["slowest_imports"]:
+        print(f"  {entry['cumulative_ms']:>8}ms  {entry['module']}")
+    if "warm_up_ms" in results:
+        print("warm-up: " + ", ".join(f"{name}={ms}ms" for name, ms in results["warm_up_ms"].items()))
+    if "ready_ms" in results:
+        print(f"ready (gateway connected): {results['ready_ms']}ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.max_import_ms is not None and results["import_ms_median"] > args.max_import_ms:
+        print(f"FAIL: median import {results['import_ms_median']}ms > {args.max_import_ms}ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# src/benchmarks/bench_vector_store.py
+#
+# Query latency and memory of the vector backends at growing corpus sizes:
+# the NumPy store scanned exhaustively ("numpy"), the same store with an IVF
+# index ("ivf"), and optionally Chroma ("chroma", slow to fill at 1M).
+#
+#   cd src && python -m benchmarks.bench_vector_store
+#   cd src && python -m benchmarks.bench_vector_store --sizes 10000,100000 --backends numpy,ivf,chroma
+#   cd src && python -m benchmarks.bench_vector_store --sizes 1000000 --probes 16 --json vectors.json
+#
+# Vectors are synthetic: 384-dimensional (all-MiniLM-L6-v2's width) around
+# a few hundred cluster centres, with queries drawn near stored vectors.
+# Every store is filled in one fresh process and queried from another, so
+# the reported RSS is what a process serving queries holds (page-cache
+# pages of the memory map count once touched). IVF recall@10 is measured
+# against an exhaustive scan of the same store.
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import queue
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+DIM = 384
+CLUSTERS = 256
+INSERT_BATCH = 10_000
+
+
+def rss_mb() -> float:
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+
+
+def vectors(start: int, count: int, seed: int = 0) -> np.ndarray:
+    """Rows start..start+count of the synthetic corpus, reproducible in any process."""
+    centres = np.random.default_rng(seed).normal(size=(CLUSTERS, DIM)).astype(np.float32)
+    rng = np.random.default_rng(seed + 1 + start)
+    return centres[rng.integers(CLUSTERS, size=count)] + rng.normal(scale=0.6, size=(count, DIM)).astype(np.float32)
+
+
+def open_store(backend: str, path: str, probes: int):
+    if backend == "chroma":
+        import chromadb
+        from database.chroma_db import ChromaStore
+        client = chromadb.PersistentClient(path=path)
+        collection = client.get_or_create_collection("bench", metadata={"hnsw:space": "l2"})
+        return ChromaStore(collection, embedding_function=None, client=client)
+    from database.numpy_store import NumpyStore
+    return NumpyStore(path, probes=probes)
+
+
+def fill(backend: str, path: str, size: int, lists: int, results):
+    store = open_store(backend, path, probes=0)
+    started = time.perf_counter()
+    for start in range(0, size, INSERT_BATCH):
+        count = min(INSERT_BATCH, size - start)
+        ids = [f"chunk-{row}" for row in range(start, start + count)]
+        store.upsert_embeddings(ids, vectors(start, count), [""] * count, [{"row": row} for row in range(start, start + count)])
+    insert_s = time.perf_counter() - started
+    index_s = 0.0
+    if backend == "ivf":
+        started = time.perf_counter()
+        store.build_ivf(lists)
+        index_s = time.perf_counter() - started
+    store.close()
+    results.put({"insert_s": round(insert_s, 2), "index_s": round(index_s, 2)})
+
+
+def serve(backend: str, path: str, size: int, args, results):
+    baseline = rss_mb()
+    started = time.perf_counter()
+    store = open_store(backend, path, probes=args.probes)
+    open_ms = (time.perf_counter() - started) * 1000
+
+    rng = np.random.default_rng(7)
+    picked = rng.integers(size, size=args.queries)
+    queries = np.concatenate([vectors(int(row), 1) for row in picked])
+    queries += rng.normal(scale=0.3, size=queries.shape).astype(np.float32)
+
+    for query in queries[:5]:
+        store.query(query_embeddings=query[np.newaxis, :], n_results=10)
+    single = []
+    found = []
+    for query in queries:
+        started = time.perf_counter()
+        found.append(store.query(query_embeddings=query[np.newaxis, :], n_results=10)["ids"][0])
+        single.append((time.perf_counter() - started) * 1000)
+    batched = []
+    for start in range(0, len(queries), args.batch):
+        started = time.perf_counter()
+        store.query(query_embeddings=queries[start:start + args.batch], n_results=10)
+        batched.append((time.perf_counter() - started) * 1000)
+    result = {
+        "open_ms": round(open_ms, 1),
+        "query_p50_ms": round(statistics.median(single), 2),
+        "query_p95_ms": round(sorted(single)[int(0.95 * len(single))], 2),
+        f"batch{args.batch}_p50_ms": round(statistics.median(batched), 2),
+        "rss_mb": rss_mb(),
+        "rss_baseline_mb": baseline,
+    }
+
+    if backend == "ivf":
+        # After the RSS reading: an exhaustive scan touches every page
+        store.probes = 0
+        exact = store.query(query_embeddings=queries, n_results=10)["ids"]
+        result["recall_at_10"] = round(float(np.mean([len(set(a) & set(e)) / 10 for a, e in zip(found, exact)])), 3)
+    store.close()
+    results.put(result)
+
+
+def in_process(target, *args) -> dict:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=target, args=(*args, results))
+    process.start()
+    while True:
+        try:
+            result = results.get(timeout=1)
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                raise RuntimeError(f"{target.__name__} exited with code {process.exitcode}")
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector backend query latency and memory")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--backends", default="numpy,ivf")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=32, help="Queries per batched call")
+    parser.add_argument("--lists", type=int, help="IVF lists (default 4 * sqrt(size))")
+    parser.add_argument("--probes", type=int, default=16)
+    parser.add_argument("--dir", help="Where to build the stores (default: a temporary directory)")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    workdir = args.dir or tempfile.mkdtemp(prefix="bench_vectors_")
+    rows = []
+    try:
+        for size in [int(size) for size in args.sizes.split(",")]:
+            lists = args.lists or int(4 * math.sqrt(size))
+            for backend in args.backends.split(","):
+                path = os.path.join(workdir, f"{backend}-{size}")
+                shutil.rmtree(path, ignore_errors=True)
+                row = {"backend": backend, "size": size}
+                if backend == "ivf":
+                    row.update({"lists": lists, "probes": args.probes})
+                row.update(in_process(fill, backend, path, size, lists))
+                row.update(in_process(serve, backend, path, size, args))
+                rows.append(row)
+                print(
+                    f"{backend:<7}{size:>9}  insert {row['insert_s']}s"
+                    + (f" + index {row['index_s']}s" if row["index_s"] else "")
+                    + f"  query p50={row['query_p50_ms']}ms p95={row['query_p95_ms']}ms"
+                    + f"  batch{args.batch} p50={row[f'batch{args.batch}_p50_ms']}ms"
+                    + f"  RSS {row['rss_mb']}MB (baseline {row['rss_baseline_mb']}MB)"
+                    + (f"  recall@10={row['recall_at_10']}" if "recall_at_10" in row else "")
+                )
+                shutil.rmtree(path, ignore_errors=True)
+    finally:
+        if not args.dir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
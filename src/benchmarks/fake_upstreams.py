@@ -0,0 +1,227 @@
+# src/benchmarks/fake_upstreams.py
+#
+# Local stand-ins for the Gemini and Firecrawl HTTP APIs, for
+# bench_end_to_end. They speak just enough of each wire format for the real
+# google-genai and firecrawl-py clients: Gemini's generateContent and
+# streamGenerateContent (SSE), Firecrawl's /v1/scrape, plus /images/<n>.png
+# for the image adapter to download. Latency and error rates are
+# configurable; errors are 429s, so they exercise the rate limiters and the
+# job queue's retries.
+#
+#   cd src && python -m benchmarks.fake_upstreams --port 8765 --gemini-latency-ms 300
+
+import argparse
+import io
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from pydantic import BaseModel
+
+WORDS = (
+    "index vector latency shard queue embed cache retry batch stream token "
+    "summary channel gateway worker scrape persist chunk query digest"
+).split()
+
+
+class UpstreamConfig(BaseModel):
+    gemini_latency_ms: float = 400
+    gemini_error_rate: float = 0.0
+    firecrawl_latency_ms: float = 800
+    firecrawl_error_rate: float = 0.0
+    # Relative standard deviation of every latency
+    jitter: float = 0.25
+    # Size of the markdown Firecrawl returns per page
+    page_kb: int = 8
+    summary_words: int = 120
+    # Chunks a streamed Gemini response is split into
+    stream_chunks: int = 6
+    seed: int = 0
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+class _Upstreams:
+    def __init__(self, config: UpstreamConfig):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._images: dict[int, bytes] = {}
+        self.requests = {"gemini": 0, "firecrawl": 0, "images": 0}
+        self.errors = {"gemini": 0, "firecrawl": 0}
+
+    def draw(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def delay(self, mean_ms: float, share: float = 1.0):
+        with self._lock:
+            ms = self._rng.gauss(mean_ms, mean_ms * self.config.jitter)
+        time.sleep(max(ms, 0) * share / 1000)
+
+    def count(self, name: str, error: bool = False):
+        with self._lock:
+            self.requests[name] += 1
+            if error:
+                self.errors[name] += 1
+
+    def image(self, n: int) -> bytes:
+        # Noise seeded by n: distinct images hash apart, the same n is a repost
+        with self._lock:
+            if n not in self._images:
+                from PIL import Image
+                rng = random.Random(n)
+                pixels = bytes(rng.getrandbits(8) for _ in range(64 * 64 * 3))
+                out = io.BytesIO()
+                Image.frombytes("RGB", (64, 64), pixels).resize((512, 512)).save(out, format="PNG")
+                self._images[n] = out.getvalue()
+            return self._images[n]
+
+
+def _gemini_chunk(text: str, usage: Optional[dict] = None, final: bool = False) -> dict:
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+    if final:
+        candidate["finishReason"] = "STOP"
+    chunk = {"candidates": [candidate], "modelVersion": "fake-gemini"}
+    if usage:
+        chunk["usageMetadata"] = usage
+    return chunk
+
+
+def _make_handler(upstreams: _Upstreams):
+    config = upstreams.config
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, body: dict):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def do_GET(self):
+            match = re.fullmatch(r"/images/(\d+)\.png", self.path)
+            if not match:
+                self._send_json(404, {"error": "not found"})
+                return
+            upstreams.count("images")
+            data = upstreams.image(int(match.group(1)))
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            body = self._body()
+            if self.path.startswith("/v1/scrape"):
+                self._scrape(json.loads(body))
+            elif ":streamGenerateContent" in self.path:
+                self._generate(body, stream=True)
+            elif ":generateContent" in self.path:
+                self._generate(body, stream=False)
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def _scrape(self, request: dict):
+            upstreams.delay(config.firecrawl_latency_ms)
+            if upstreams.draw() < config.firecrawl_error_rate:
+                upstreams.count("firecrawl", error=True)
+                self._send_json(429, {"success": False, "error": "Rate limit exceeded"})
+                return
+            upstreams.count("firecrawl")
+            rng = random.Random(request["url"])
+            words = config.page_kb * 1024 // 7
+            markdown = f"# {_text(rng, 6)}\n\n" + "\n\n".join(
+                _text(rng, 80) for _ in range(max(words // 80, 1))
+            )
+            data = {"metadata": {"sourceURL": request["url"], "title": _text(rng, 6), "keywords": "bench,fake"}}
+            formats = request.get("formats", ["markdown"])
+            if "markdown" in formats:
+                data["markdown"] = markdown
+            if "html" in formats:
+                data["html"] = "<html><body>" + "".join(f"<p>{line}</p>" for line in markdown.split("\n\n")) + "</body></html>"
+            self._send_json(200, {"success": True, "data": data})
+
+        def _generate(self, body: bytes, stream: bool):
+            if upstreams.draw() < config.gemini_error_rate:
+                upstreams.delay(config.gemini_latency_ms, share=0.1)
+                upstreams.count("gemini", error=True)
+                self._send_json(429, {"error": {
+                    "code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED",
+                }})
+                return
+            upstreams.count("gemini")
+            rng = random.Random(body)
+            words = _text(rng, config.summary_words).split()
+            usage = {
+                "promptTokenCount": len(body) // 4,
+                "candidatesTokenCount": len(words),
+                "totalTokenCount": len(body) // 4 + len(words),
+            }
+            if not stream:
+                upstreams.delay(config.gemini_latency_ms)
+                self._send_json(200, _gemini_chunk("- " + " ".join(words), usage, final=True))
+                return
+
+            # First chunk after 40% of the latency, the rest spread evenly
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            chunks = max(config.stream_chunks, 1)
+            step = -(-len(words) // chunks)
+            for index in range(chunks):
+                upstreams.delay(config.gemini_latency_ms, share=0.4 if index == 0 else 0.6 / max(chunks - 1, 1))
+                text = ("- " if index == 0 else " ") + " ".join(words[index * step:(index + 1) * step])
+                final = index == chunks - 1
+                chunk = _gemini_chunk(text, usage if final else None, final=final)
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+
+    return Handler
+
+
+def serve_upstreams(config: dict, ready, port: int = 0):
+    """Serves until the process is terminated; puts the bound port on `ready`."""
+    upstreams = _Upstreams(UpstreamConfig(**config))
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(upstreams))
+    server.daemon_threads = True
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Gemini and Firecrawl servers")
+    parser.add_argument("--port", type=int, default=8765)
+    for name, field in UpstreamConfig.model_fields.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=field.annotation, default=field.default)
+    args = vars(parser.parse_args())
+    port = args.pop("port")
+
+    class Printer:
+        def put(self, bound):
+            print(f"Fake upstreams on http://127.0.0.1:{bound}")
+            print(f"  GEMINI_BASE_URL=http://127.0.0.1:{bound} FIRECRAWL_API_URL=http://127.0.0.1:{bound}")
+
+    serve_upstreams(args, Printer(), port)
+
+
+if __name__ == "__main__":
+    main()
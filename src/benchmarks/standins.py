@@ -0,0 +1,87 @@
+# src/benchmarks/standins.py
+#
+# In-process stand-ins for bench_end_to_end: a hashing embedding function
+# so the vector store needs no ONNX model download, and the few discord.py
+# objects on_message touches. The SQLite stand-in for Postgres is shared
+# with the tests and lives in tests/conftest.py.
+
+import hashlib
+import itertools
+from typing import Optional
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+
+class HashEmbedding(EmbeddingFunction[Documents]):
+    """Bag-of-words feature hashing; deterministic and fast, but meaningless for search quality."""
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = np.zeros((len(input), self.dimensions), dtype=np.float32)
+        for row, document in enumerate(input):
+            for word in document.lower().split():
+                digest = hashlib.blake2b(word.encode(), digest_size=4).digest()
+                vectors[row, int.from_bytes(digest, "little") % self.dimensions] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return list(vectors / np.maximum(norms, 1e-9))
+
+    @staticmethod
+    def name() -> str:
+        return "bench-hash"
+
+    def get_config(self) -> dict:
+        return {"dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "HashEmbedding":
+        return HashEmbedding(**config)
+
+
+_ids = itertools.count(1)
+
+
+class FakeUser:
+    def __init__(self, id: int, bot: bool = False):
+        self.id = id
+        self.bot = bot
+        self.name = f"user{id}"
+
+
+class FakeGuild:
+    def __init__(self, id: int):
+        self.id = id
+
+
+class FakeMessage:
+    def __init__(self, channel: "FakeChannel", content: str = "", author: Optional[FakeUser] = None, embeds=None):
+        self.id = next(_ids)
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.author = author or FakeUser(next(_ids))
+        self.attachments = []
+        self.embeds = list(embeds or [])
+
+    async def edit(self, content: Optional[str] = None, embeds=None, embed=None):
+        self.channel.calls += 1
+        if embeds is not None or embed is not None:
+            self.embeds = list(embeds) if embeds is not None else [embed]
+
+
+class FakeChannel:
+    """Records what the bot sends, and counts Discord API calls (sends and edits)."""
+
+    def __init__(self, id: int, guild: Optional[FakeGuild] = None):
+        self.id = id
+        self.guild = guild
+        self.calls = 0
+        self.sent: list[FakeMessage] = []
+
+    async def send(self, content: Optional[str] = None, embeds=None, embed=None) -> FakeMessage:
+        self.calls += 1
+        message = FakeMessage(self, content or "", FakeUser(0, bot=True), embeds if embeds is not None else [embed] if embed else [])
+        self.sent.append(message)
+        return message
@@ -0,0 +1,250 @@
+# database/chroma_buffer.py
+
+import json
+import logging
+import os
+import threading
+from typing import Optional
+
+from utils.telemetry import stage
+
+logger = logging.getLogger(__name__)
+
+# Documents queued before a flush is forced
+CHROMA_BATCH_SIZE = int(os.getenv("CHROMA_BATCH_SIZE", "64"))
+# Seconds a queued document may wait before the background flusher writes it
+CHROMA_FLUSH_INTERVAL = float(os.getenv("CHROMA_FLUSH_INTERVAL", "2.0"))
+# Write-ahead file holding queued documents until they reach Chroma
+CHROMA_WAL_PATH = os.getenv("CHROMA_WAL_PATH", "_data/chroma_wal.jsonl")
+# Failed writes of a single document before it is set aside
+CHROMA_MAX_ATTEMPTS = int(os.getenv("CHROMA_MAX_ATTEMPTS", "5"))
+# Where set-aside documents go, in the write-ahead file's format plus the
+# last error; append lines back to CHROMA_WAL_PATH to retry them
+CHROMA_DEAD_LETTER_PATH = os.getenv("CHROMA_DEAD_LETTER_PATH", "_data/chroma_dead_letter.jsonl")
+
+
+class ChromaWriteBuffer:
+    """
+    Collects documents and writes them to a vector store (a Chroma
+    collection or a NumpyStore) in batches.
+
+    Embedding runs once per batch inside `collection.upsert` instead of once
+    per ingested URL on the request path. Every queued document is appended
+    to a write-ahead file first and replayed on the next start, so a crash
+    between `add` and the flush doesn't lose it. Upsert keeps replays
+    idempotent.
+
+    A failed batch is split in halves until the failing documents are
+    isolated, so one bad document can't hold back the rest. Each isolated
+    failure counts as an attempt, except when nothing in the flush could be
+    written (the store is down); after `max_attempts` the document moves to
+    the dead-letter file.
+    """
+
+    def __init__(
+        self,
+        collection,
+        batch_size: int = CHROMA_BATCH_SIZE,
+        flush_interval: float = CHROMA_FLUSH_INTERVAL,
+        wal_path: Optional[str] = CHROMA_WAL_PATH,
+        max_attempts: int = CHROMA_MAX_ATTEMPTS,
+        dead_letter_path: Optional[str] = CHROMA_DEAD_LETTER_PATH,
+    ):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.wal_path = wal_path
+        self.max_attempts = max_attempts
+        self.dead_letter_path = dead_letter_path
+
+        self._pending: list[tuple[str, str, dict]] = []
+        # Failed attempts per document id, kept in the write-ahead file too
+        self._attempts: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.flushed_documents = 0
+        self.flushed_batches = 0
+        self.dead_lettered = 0
+
+        self._replay_wal()
+        if self._pending:
+            self._ensure_flusher()
+
+    def add(self, doc_id: str, content: str, metadata: dict):
+        self.add_many([(doc_id, content, metadata)])
+
+    def add_many(self, records: list[tuple[str, str, dict]]):
+        """Queues several documents with a single write-ahead append."""
+        if not records:
+            return
+        with self._lock:
+            self._append_wal(records)
+            self._pending.extend(records)
+            full = len(self._pending) >= self.batch_size
+        self._ensure_flusher()
+        if full:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """Writes everything queued so far. Returns the number of documents written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+
+            failed = []
+            for start in range(0, len(batch), self.batch_size):
+                failed.extend(self._write(batch[start:start + self.batch_size]))
+            written = len(batch) - len(failed)
+            self.flushed_documents += written
+
+            failed_ids = {record[0] for record, _ in failed}
+            for doc_id, _, _ in batch:
+                if doc_id not in failed_ids:
+                    self._attempts.pop(doc_id, None)
+            retry, dead = [], []
+            # Everything failing at once is the store, not the documents
+            unavailable = written == 0 and len(batch) > 1
+            for record, error in failed:
+                attempts = self._attempts.get(record[0], 0) + (0 if unavailable else 1)
+                self._attempts[record[0]] = attempts
+                if attempts >= self.max_attempts:
+                    dead.append((record, error))
+                else:
+                    retry.append(record)
+            if retry:
+                logger.error(f"ChromaDB write failed for {len(retry)} document(s), will retry: {failed[0][1]}")
+            if dead:
+                self._dead_letter(dead)
+
+            with self._lock:
+                self._pending = retry + self._pending
+                self._rewrite_wal(self._pending)
+
+            logger.info(f"ChromaDB: Flushed {written} document(s)")
+            return written
+
+    def _write(self, chunk: list[tuple[str, str, dict]]) -> list[tuple[tuple[str, str, dict], Exception]]:
+        """Upserts `chunk`, halving it on failure. Returns the documents that failed on their own."""
+        try:
+            # Embedding happens here, so this is the real Chroma cost
+            with stage("vector.flush", documents=len(chunk)):
+                self.collection.upsert(
+                    ids=[doc_id for doc_id, _, _ in chunk],
+                    documents=[content for _, content, _ in chunk],
+                    metadatas=[metadata for _, _, metadata in chunk],
+                )
+        except Exception as e:
+            if len(chunk) == 1:
+                return [(chunk[0], e)]
+            middle = len(chunk) // 2
+            return self._write(chunk[:middle]) + self._write(chunk[middle:])
+        self.flushed_batches += 1
+        return []
+
+    def _dead_letter(self, failed: list[tuple[tuple[str, str, dict], Exception]]):
+        for (doc_id, _, _), error in failed:
+            self._attempts.pop(doc_id, None)
+            logger.error(
+                f"ChromaDB: Giving up on {doc_id} after {self.max_attempts} failed write(s), "
+                f"moved to {self.dead_letter_path}: {error}"
+            )
+        self.dead_lettered += len(failed)
+        if not self.dead_letter_path:
+            return
+        directory = os.path.dirname(self.dead_letter_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            for (doc_id, content, metadata), error in failed:
+                f.write(json.dumps({"id": doc_id, "document": content, "metadata": metadata, "error": str(error)}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self):
+        """Stops the background flusher and writes whatever is still queued."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _ensure_flusher(self):
+        if self._thread is None and not self._stop.is_set():
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="chroma-flusher", daemon=True
+                    )
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"ChromaDB flusher error: {e}")
+
+    def _wal_line(self, record: tuple[str, str, dict]) -> str:
+        doc_id, content, metadata = record
+        entry = {"id": doc_id, "document": content, "metadata": metadata}
+        if self._attempts.get(doc_id):
+            entry["attempts"] = self._attempts[doc_id]
+        return json.dumps(entry) + "\n"
+
+    def _append_wal(self, records):
+        if not self.wal_path:
+            return
+        with open(self.wal_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(self._wal_line(record))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_wal(self, records):
+        if not self.wal_path:
+            return
+        tmp_path = f"{self.wal_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(self._wal_line(record))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.wal_path)
+
+    def _replay_wal(self):
+        if not self.wal_path:
+            return
+        directory = os.path.dirname(self.wal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(self.wal_path):
+            return
+
+        with open(self.wal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-append
+                    continue
+                self._pending.append((entry["id"], entry["document"], entry["metadata"]))
+                if entry.get("attempts"):
+                    self._attempts[entry["id"]] = entry["attempts"]
+
+        if self._pending:
+            logger.info(f"ChromaDB: Replaying {len(self._pending)} queued document(s) from {self.wal_path}")
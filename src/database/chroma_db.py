@@ -1,20 +1,77 @@
-import chromadb
-from chromadb.utils import embedding_functions
+import os
+from typing import Iterator, Optional
+from database.vector_store import EmbeddingFunction, QueryResult, VectorBatch, VectorStore, normalize
+from utils.registry import services
 
-default_ef = embedding_functions.DefaultEmbeddingFunction()
+# "local" opens the index in CHROMA_PATH inside this process. "http" talks to
+# a Chroma server (`chroma run --path _data/vector_data_chroma`), so several
+# bot processes can share one index without contending on its files.
+CHROMA_MODE = os.getenv("CHROMA_MODE", "local")
+CHROMA_PATH = os.getenv("CHROMA_PATH", "_data/vector_data_chroma")
+CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+COLLECTION_NAME = "scraped_content"
 
-# Initialize ChromaDB client with persistence
-client = chromadb.PersistentClient(path="_data/vector_data_chroma")
+def make_client():
+    # chromadb takes most of a second to import, so it loads on first use
+    import chromadb
+    if CHROMA_MODE == "http":
+        return chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
+    if CHROMA_MODE != "local":
+        raise ValueError(f"Unknown CHROMA_MODE {CHROMA_MODE!r}; use 'local' or 'http'")
+    return chromadb.PersistentClient(path=CHROMA_PATH)
 
-# Create or get collection
-collection = client.get_or_create_collection(name="scraped_content")
+services.register("chroma_client", make_client)
 
-def add_document(doc_id: str, content: str, metadata: dict):
-    try:
-        collection.add(documents=[content], metadatas=[metadata], ids=[doc_id])
-        print(f"ChromaDB: Added doc_id={doc_id}")
-    except Exception as e:
-        print(f"ChromaDB ERROR for doc_id={doc_id}: {e}")
+class ChromaStore(VectorStore):
+    """
+    VectorStore over a Chroma collection. Embeddings are computed here and
+    passed in, so Chroma's own embedding function is never called and both
+    backends embed the same way.
+    """
 
-def query_document(query_text: str, n_results: int = 4):
-    return collection.query(query_texts=[query_text], n_results=n_results)
+    def __init__(self, collection, embedding_function: EmbeddingFunction, client=None):
+        self.collection = collection
+        self.embedding_function = embedding_function
+        # The client `collection` came from; None is the registered one
+        self.client = client
+
+    @classmethod
+    def open(cls, embedding_function: EmbeddingFunction, name: str = COLLECTION_NAME) -> "ChromaStore":
+        client = services.get("chroma_client")
+        return cls(client.get_or_create_collection(name=name), embedding_function, client)
+
+    def upsert_embeddings(self, ids: list[str], embeddings, documents: list[str], metadatas: list[dict]):
+        embeddings = normalize(embeddings)
+        # Chroma refuses batches over its own limit (5461 rows by default)
+        limit = (self.client or services.get("chroma_client")).get_max_batch_size()
+        for start in range(0, len(ids), limit):
+            end = start + limit
+            self.collection.upsert(
+                ids=ids[start:end], embeddings=embeddings[start:end],
+                documents=documents[start:end], metadatas=metadatas[start:end],
+            )
+
+    def query(self, query_texts: Optional[list[str]] = None, query_embeddings=None, n_results: int = 10) -> QueryResult:
+        if query_embeddings is None:
+            query_embeddings = self.embed_queries(query_texts)
+        return self.collection.query(query_embeddings=normalize(query_embeddings), n_results=n_results)
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def export(self, batch_size: int = 1000) -> Iterator[VectorBatch]:
+        offset = 0
+        while True:
+            batch = self.collection.get(
+                include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset
+            )
+            if not batch["ids"]:
+                return
+            yield (
+                batch["ids"],
+                normalize(batch["embeddings"]),
+                batch["documents"],
+                [metadata or {} for metadata in batch["metadatas"]],
+            )
+            offset += len(batch["ids"])
@@ -0,0 +1,53 @@
+# database/content_store.py
+
+import hashlib
+import os
+from typing import Optional
+
+import zstandard
+
+from models.database import ContentBlob
+
+# "inline": page content is stored whole in scraped_content.content.
+# "compressed": only its first CONTENT_HOT_CHARS stay there, for previews;
+# the whole text goes zstd-compressed into content_blobs, once per distinct
+# body, and the row's search_vector is built from all of it. Needs
+# migrate_to_neon_db's migrations 4 and 5. Move existing rows with
+# database/scripts/compress_content.py.
+CONTENT_STORAGE = os.getenv("CONTENT_STORAGE", "inline")
+# Head kept inline in compressed mode; previews read up to 1001 characters
+CONTENT_HOT_CHARS = int(os.getenv("CONTENT_HOT_CHARS", "2000"))
+# 1-22; higher is smaller and slower to write, decompression speed barely changes
+CONTENT_ZSTD_LEVEL = int(os.getenv("CONTENT_ZSTD_LEVEL", "9"))
+
+
+def compress_content(content: str, level: int = CONTENT_ZSTD_LEVEL) -> ContentBlob:
+    data = content.encode("utf-8")
+    return ContentBlob(
+        hash=hashlib.sha256(data).hexdigest(),
+        codec="zstd",
+        size=len(data),
+        body=zstandard.ZstdCompressor(level=level).compress(data),
+    )
+
+
+def decompress_content(codec: str, body: bytes) -> str:
+    if codec != "zstd":
+        raise ValueError(f"Unknown content codec {codec!r}")
+    return zstandard.ZstdDecompressor().decompress(bytes(body)).decode("utf-8")
+
+
+def split_content(
+    content: Optional[str],
+    storage: str,
+    hot_chars: int = CONTENT_HOT_CHARS,
+) -> tuple[Optional[str], Optional[ContentBlob]]:
+    """
+    What to store for a row's content: the text kept in scraped_content and,
+    for long content in compressed mode, the blob holding all of it.
+    """
+    if storage not in ("inline", "compressed"):
+        raise ValueError(f"Unknown CONTENT_STORAGE {storage!r}; use 'inline' or 'compressed'")
+    if storage == "inline" or not content or len(content) <= hot_chars:
+        return content, None
+    return content[:hot_chars], compress_content(content)
@@ -0,0 +1,366 @@
+# database/numpy_store.py
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Iterator, Optional
+
+import numpy as np
+
+from database.vector_store import EmbeddingFunction, QueryResult, VectorBatch, VectorStore, normalize
+
+logger = logging.getLogger(__name__)
+
+# Directory holding vectors.f32, records.sqlite3 and (once built) ivf.npz
+NUMPY_STORE_PATH = os.getenv("NUMPY_STORE_PATH", "_data/vector_data_numpy")
+# Rows scored per matrix product in an exhaustive scan; bounds the
+# temporary score matrix to NUMPY_SCAN_BLOCK x queries floats
+NUMPY_SCAN_BLOCK = int(os.getenv("NUMPY_SCAN_BLOCK", "65536"))
+# IVF lists searched per query once an index is built; more is slower but
+# misses fewer neighbours, 0 ignores the index and scans everything
+NUMPY_IVF_PROBES = int(os.getenv("NUMPY_IVF_PROBES", "8"))
+
+# The SQLite side is the id -> row map plus what queries return; the rows'
+# vectors sit at the same index in vectors.f32
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    row INTEGER PRIMARY KEY,
+    id TEXT UNIQUE NOT NULL,
+    document TEXT,
+    metadata TEXT
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Most ids bound in one SQLite statement
+MAX_VARIABLES = 900
+
+
+class IvfIndex:
+    """
+    Inverted-file partitioning: rows grouped by their nearest of `lists`
+    centroids. A query scores the centroids, then only the rows of the
+    `probes` closest lists. Rows added after the build (row >= `rows`) are
+    always scanned, so nothing is missed until the next rebuild.
+    """
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray, rows: int):
+        self.centroids = centroids
+        self.order = order  # row numbers sorted by list
+        self.offsets = offsets  # list i is order[offsets[i]:offsets[i + 1]]
+        self.rows = rows
+
+    @classmethod
+    def load(cls, path: str) -> "IvfIndex":
+        with np.load(path) as data:
+            return cls(data["centroids"], data["order"], data["offsets"], int(data["rows"]))
+
+    def save(self, path: str):
+        # Written aside and renamed so readers in other processes never see half a file
+        temporary = path + ".tmp.npz"
+        np.savez(temporary, centroids=self.centroids, order=self.order, offsets=self.offsets, rows=self.rows)
+        os.replace(temporary, path)
+
+    def candidates(self, query: np.ndarray, probes: int, total_rows: int) -> np.ndarray:
+        probes = min(probes, len(self.centroids))
+        nearest = np.argpartition(-(self.centroids @ query), probes - 1)[:probes]
+        parts = [self.order[self.offsets[i]:self.offsets[i + 1]] for i in nearest]
+        if total_rows > self.rows:
+            parts.append(np.arange(self.rows, total_rows))
+        # Sorted, so the gather from the memory map reads forwards
+        return np.sort(np.concatenate(parts))
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, block: int) -> np.ndarray:
+    """Index of the nearest centroid for every row, a block at a time."""
+    assignment = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), block):
+        assignment[start:start + block] = np.argmax(np.asarray(vectors[start:start + block]) @ centroids.T, axis=1)
+    return assignment
+
+
+def _merge_top_k(best_rows, best_scores, rows: np.ndarray, scores: np.ndarray, k: int):
+    """Keeps the k highest-scoring of the running best and a new block, per query."""
+    if best_rows is not None:
+        rows = np.concatenate([best_rows, rows], axis=1)
+        scores = np.concatenate([best_scores, scores], axis=1)
+    if scores.shape[1] > k:
+        keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        rows = np.take_along_axis(rows, keep, axis=1)
+        scores = np.take_along_axis(scores, keep, axis=1)
+    return rows, scores
+
+
+class NumpyStore(VectorStore):
+    """
+    Normalized float32 embeddings in a memory-mapped file, one row per
+    chunk, searched with batched dot products.
+
+    Nothing is loaded up front: the OS pages the vectors in as queries touch
+    them, and documents and metadata are read from SQLite for the top hits
+    only. Writers take SQLite's write lock while they allocate rows and
+    write vectors, so several processes on one host can share a store;
+    readers notice new rows and a rebuilt IVF index on their next query.
+    """
+
+    def __init__(
+        self,
+        path: str = NUMPY_STORE_PATH,
+        embedding_function: Optional[EmbeddingFunction] = None,
+        probes: int = NUMPY_IVF_PROBES,
+        block: int = NUMPY_SCAN_BLOCK,
+    ):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.embedding_function = embedding_function
+        self.probes = probes
+        self.block = block
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._ivf_path = os.path.join(path, "ivf.npz")
+        # Autocommit; writes open their own BEGIN IMMEDIATE transaction
+        self._db = sqlite3.connect(
+            os.path.join(path, "records.sqlite3"), check_same_thread=False, timeout=60, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._vectors: Optional[np.memmap] = None
+        self._rows = 0
+        self.dim: Optional[int] = None
+        self._ivf: Optional[IvfIndex] = None
+        self._ivf_mtime = None
+        with self._lock:
+            self._refresh()
+
+    # --- reading -------------------------------------------------------
+
+    def _setting(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _map(self, rows: int):
+        """(Re)maps vectors.f32 if it no longer covers `rows` rows."""
+        if self._vectors is not None and len(self._vectors) >= rows:
+            return
+        capacity = os.path.getsize(self._vectors_path) // (4 * self.dim)
+        # Queries holding the old map keep it alive until they finish
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _refresh(self):
+        """Picks up rows and an IVF index written since the last look, possibly by another process."""
+        rows = self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM records").fetchone()[0]
+        if self.dim is None:
+            dim = self._setting("dim")
+            self.dim = int(dim) if dim else None
+        if rows and rows != self._rows:
+            self._map(rows)
+        self._rows = rows
+
+        mtime = os.stat(self._ivf_path).st_mtime_ns if os.path.exists(self._ivf_path) else None
+        if mtime != self._ivf_mtime:
+            self._ivf = IvfIndex.load(self._ivf_path) if mtime else None
+            self._ivf_mtime = mtime
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._rows
+
+    def _records(self, rows: list[int]) -> dict[int, tuple]:
+        records = {}
+        for start in range(0, len(rows), MAX_VARIABLES):
+            part = rows[start:start + MAX_VARIABLES]
+            # The connection is shared with writers, whose transactions hold the lock
+            with self._lock:
+                fetched = self._db.execute(
+                    f"SELECT row, id, document, metadata FROM records WHERE row IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+            for row, doc_id, document, metadata in fetched:
+                records[row] = (doc_id, document, json.loads(metadata) if metadata else {})
+        return records
+
+    def _scan(self, vectors: np.ndarray, queries: np.ndarray, k: int, rows: Optional[np.ndarray] = None):
+        """Exact top-k over `vectors` (or the subset `rows` of it) for every query."""
+        total = len(rows) if rows is not None else len(vectors)
+        best_rows = best_scores = None
+        for start in range(0, total, self.block):
+            if rows is not None:
+                block_rows = rows[start:start + self.block]
+                block = vectors[block_rows]
+            else:
+                block_rows = np.arange(start, min(start + self.block, total))
+                block = vectors[start:start + self.block]
+            scores = queries @ np.asarray(block).T
+            best_rows, best_scores = _merge_top_k(
+                best_rows, best_scores, np.broadcast_to(block_rows, scores.shape), scores, k
+            )
+        return best_rows, best_scores
+
+    def query(self, query_texts: Optional[list[str]] = None, query_embeddings=None, n_results: int = 10) -> QueryResult:
+        if query_embeddings is None:
+            query_embeddings = self.embed_queries(query_texts)
+        queries = normalize(query_embeddings)
+        with self._lock:
+            self._refresh()
+            vectors, total, ivf = self._vectors, self._rows, self._ivf
+
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if not total:
+            for key in results:
+                results[key] = [[] for _ in queries]
+            return results
+
+        k = min(n_results, total)
+        if ivf is None or not self.probes:
+            hits = list(zip(*self._scan(vectors[:total], queries, k)))
+        else:
+            hits = []
+            for query in queries:
+                candidates = ivf.candidates(query, self.probes, total)
+                if not len(candidates):
+                    hits.append((candidates, np.empty(0, dtype=np.float32)))
+                    continue
+                rows, scores = self._scan(vectors, query[np.newaxis, :], min(k, len(candidates)), candidates)
+                hits.append((rows[0], scores[0]))
+
+        records = self._records(sorted({int(row) for rows, _ in hits for row in rows}))
+        for rows, scores in hits:
+            order = np.argsort(-scores)
+            found = [(int(rows[i]), float(scores[i])) for i in order if int(rows[i]) in records]
+            results["ids"].append([records[row][0] for row, _ in found])
+            results["documents"].append([records[row][1] for row, _ in found])
+            results["metadatas"].append([records[row][2] for row, _ in found])
+            results["distances"].append([max(2.0 - 2.0 * score, 0.0) for _, score in found])
+        return results
+
+    def export(self, batch_size: int = 1000) -> Iterator[VectorBatch]:
+        total = self.count()
+        for start in range(0, total, batch_size):
+            with self._lock:
+                records = self._db.execute(
+                    "SELECT row, id, document, metadata FROM records WHERE row >= ? AND row < ? ORDER BY row",
+                    (start, start + batch_size),
+                ).fetchall()
+            rows = [row for row, _, _, _ in records]
+            yield (
+                [doc_id for _, doc_id, _, _ in records],
+                np.array(self._vectors[rows]),
+                [document for _, _, document, _ in records],
+                [json.loads(metadata) if metadata else {} for _, _, _, metadata in records],
+            )
+
+    # --- writing -------------------------------------------------------
+
+    def _ensure_capacity(self, rows: int):
+        """Grows vectors.f32 (at least doubling) until it holds `rows` rows."""
+        row_bytes = 4 * self.dim
+        size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        if size < rows * row_bytes:
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(max(rows, 2 * (size // row_bytes), 1024) * row_bytes)
+        self._map(rows)
+
+    def upsert_embeddings(self, ids: list[str], embeddings, documents: list[str], metadatas: list[dict]):
+        vectors = normalize(embeddings)
+        if len(vectors) != len(ids):
+            raise ValueError(f"Got {len(vectors)} embeddings for {len(ids)} ids")
+        with self._lock:
+            # Held across processes until COMMIT: one writer allocates rows at a time
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self.dim = self.dim or (int(self._setting("dim")) if self._setting("dim") else None)
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                    self._db.execute("INSERT INTO settings (key, value) VALUES ('dim', ?)", (str(self.dim),))
+                elif vectors.shape[1] != self.dim:
+                    raise ValueError(f"Embeddings have {vectors.shape[1]} dimensions, the store holds {self.dim}")
+
+                existing = {}
+                for start in range(0, len(ids), MAX_VARIABLES):
+                    part = list(ids[start:start + MAX_VARIABLES])
+                    existing.update(self._db.execute(
+                        f"SELECT id, row FROM records WHERE id IN ({','.join('?' * len(part))})", part
+                    ))
+                next_row = self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM records").fetchone()[0]
+                rows = []
+                for doc_id in ids:
+                    if doc_id not in existing:
+                        existing[doc_id] = next_row
+                        next_row += 1
+                    rows.append(existing[doc_id])
+
+                # Vectors first: a reader sees a row only once its record commits
+                self._ensure_capacity(next_row)
+                self._vectors[rows] = vectors
+                self._vectors.flush()
+                self._db.executemany(
+                    """
+                    INSERT INTO records (row, id, document, metadata) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET document = excluded.document, metadata = excluded.metadata
+                    """,
+                    [
+                        (row, doc_id, document, json.dumps(metadata) if metadata else None)
+                        for row, doc_id, document, metadata in zip(rows, ids, documents, metadatas)
+                    ],
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._rows = max(self._rows, next_row)
+
+    def build_ivf(self, lists: int, iterations: int = 10, sample: int = 100_000, seed: int = 0) -> IvfIndex:
+        """
+        Clusters the stored vectors into `lists` partitions (spherical
+        k-means on a sample of `sample` rows) and saves the index, which
+        queries in every process then use. Rebuild once many rows have been
+        added since, as those are scanned exhaustively.
+        """
+        with self._lock:
+            self._refresh()
+            vectors, total = self._vectors, self._rows
+        if total < lists:
+            raise ValueError(f"Need at least {lists} vectors to build {lists} lists, the store has {total}")
+
+        rng = np.random.default_rng(seed)
+        picked = np.sort(rng.choice(total, min(sample, total), replace=False))
+        data = np.asarray(vectors[picked])
+        centroids = data[rng.choice(len(data), lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = _assign(data, centroids, self.block)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, data)
+            sizes = np.bincount(assignment, minlength=lists)
+            # Lists that lost every member restart from a random sample row
+            empty = sizes == 0
+            sums[empty] = data[rng.choice(len(data), int(empty.sum()))]
+            centroids = normalize(sums)
+
+        assignment = _assign(vectors[:total], centroids, self.block)
+        order = np.argsort(assignment, kind="stable").astype(np.int64)
+        offsets = np.searchsorted(assignment[order], np.arange(lists + 1))
+        index = IvfIndex(centroids, order, offsets, total)
+        index.save(self._ivf_path)
+        with self._lock:
+            self._refresh()
+        logger.info(f"Built IVF index: {lists} lists over {total} vectors")
+        return index
+
+    def drop_ivf(self):
+        """Goes back to exhaustive scans."""
+        if os.path.exists(self._ivf_path):
+            os.remove(self._ivf_path)
+        with self._lock:
+            self._refresh()
+
+    def close(self):
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            self._vectors = None
+            self._db.close()
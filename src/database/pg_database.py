@@ -1,68 +1,335 @@
 import os
-import psycopg2
-from psycopg2.extras import Json
+import threading
+from datetime import datetime, timedelta, timezone
+from psycopg2.extras import Json, execute_values
 from typing import Optional
+from database.content_store import CONTENT_STORAGE, decompress_content, split_content
+from database.pg_pool import PgPool
+from utils.telemetry import traced
+from models.database import ContentBlob, SaveResult, Provenance, EntryCursor, EntryPage, RecentEntry, StoredEntry
 from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("NEON_DB_URL")
 
+_pool: Optional[PgPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> PgPool:
+    """Returns the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PgPool(DATABASE_URL)
+    return _pool
+
+def warm_up_pool():
+    get_pool().warm_up()
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+def search_vector_sql(summary: str, content: str) -> str:
+    """
+    SQL for a row's search_vector from the given summary and content
+    operands; the same weights as migration 1's generated column.
+    """
+    return (
+        f"setweight(to_tsvector('english', coalesce({summary}, '')), 'A') || "
+        f"setweight(to_tsvector('english', LEFT(coalesce({content}, ''), 200000)), 'B')"
+    )
+
+def _insert_columns() -> str:
+    columns = "url, content, summary, source, metadata, guild_id, channel_id, submitter_id"
+    # content_hash and a writable search_vector only exist from migrations 4
+    # and 5 on, so inline mode leaves them out
+    if CONTENT_STORAGE == "compressed":
+        return f"{columns}, content_hash, search_vector"
+    return columns
+
+def _insert_placeholders() -> str:
+    placeholders = ", ".join(["%s"] * 8)
+    if CONTENT_STORAGE == "compressed":
+        # Indexed from the whole text, not the head kept in the row
+        return f"{placeholders}, %s, {search_vector_sql('%s', '%s')}"
+    return placeholders
+
+def _row_values(
+    url: str,
+    content: Optional[str],
+    summary: Optional[str],
+    source: Optional[str],
+    metadata: Optional[dict],
+    provenance: Provenance,
+) -> tuple[tuple, Optional[ContentBlob]]:
+    """The values for `_insert_placeholders()`, plus the blob to store first if any."""
+    stored, blob = split_content(content, CONTENT_STORAGE)
+    values = (
+        url, stored, summary, source, Json(metadata) if metadata else None,
+        provenance.guild_id, provenance.channel_id, provenance.submitter_id,
+    )
+    if CONTENT_STORAGE == "compressed":
+        values += (blob.hash if blob else None, summary, content)
+    return values, blob
+
+@traced("postgres.save")
 def save_to_postgres(
     url: str,
     content: Optional[str] = None,
     summary: Optional[str] = None,
     source: Optional[str] = None,
-    metadata: Optional[dict] = None
-) -> str:
+    metadata: Optional[dict] = None,
+    provenance: Optional[Provenance] = None
+) -> SaveResult:
+    """
+    Inserts a row for `url` unless one already exists.
+
+    Dedup and insert happen in a single statement, so concurrent submissions of
+    the same URL can't race into a unique violation. With compressed storage a
+    long body is written to content_blobs first, in the same transaction.
+    """
     if not content and not summary:
         raise ValueError("At least one of content or summary must be provided.")
+    values, blob = _row_values(url, content, summary, source, metadata, provenance or Provenance())
 
-    conn = psycopg2.connect(DATABASE_URL)
-    cur = conn.cursor()
-
-    # Check if the URL already exists
-    cur.execute("SELECT 1 FROM scraped_content WHERE url = %s", (url,))
-    if cur.fetchone():
-        cur.close()
-        conn.close()
-        return "Already Indexed. Thanks for sending!"
-
-    # Insert the new data
-    cur.execute(
-        """
-        INSERT INTO scraped_content (url, content, summary, source, metadata)
-        VALUES (%s, %s, %s, %s, %s)
-        """,
-        (url, content, summary, source, Json(metadata) if metadata else None)
-    )
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            if blob is not None:
+                # An identical body stored for another URL is reused
+                cur.execute(
+                    """
+                    INSERT INTO content_blobs (hash, codec, size, body)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (hash) DO NOTHING
+                    """,
+                    (blob.hash, blob.codec, blob.size, blob.body),
+                )
+            cur.execute(
+                f"""
+                INSERT INTO scraped_content ({_insert_columns()})
+                VALUES ({_insert_placeholders()})
+                ON CONFLICT (url) DO NOTHING
+                RETURNING id
+                """,
+                values
+            )
+            row = cur.fetchone()
+
+    return SaveResult(id=row[0] if row else None, created=row is not None)
 
-    return "Indexed and saved to database ✅"
+@traced("postgres.save_many")
+def save_many_to_postgres(rows: list[dict], page_size: int = 500) -> set[str]:
+    """
+    Bulk version of `save_to_postgres` for backfills: each row holds its
+    keyword arguments. Rows go out `page_size` at a time through
+    execute_values, with the same ON CONFLICT dedup, and the URLs that were
+    actually inserted are returned.
+    """
+    values = []
+    blobs: dict[str, ContentBlob] = {}
+    for row in rows:
+        if not row.get("content") and not row.get("summary"):
+            raise ValueError(f"At least one of content or summary must be provided for {row.get('url')}.")
+        row_values, blob = _row_values(
+            row["url"], row.get("content"), row.get("summary"), row.get("source"),
+            row.get("metadata"), row.get("provenance") or Provenance(),
+        )
+        values.append(row_values)
+        if blob is not None:
+            blobs[blob.hash] = blob
+    if not values:
+        return set()
+
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            if blobs:
+                execute_values(
+                    cur,
+                    """
+                    INSERT INTO content_blobs (hash, codec, size, body)
+                    VALUES %s
+                    ON CONFLICT (hash) DO NOTHING
+                    """,
+                    [(blob.hash, blob.codec, blob.size, blob.body) for blob in blobs.values()],
+                    page_size=page_size,
+                )
+            created = execute_values(
+                cur,
+                f"""
+                INSERT INTO scraped_content ({_insert_columns()})
+                VALUES %s
+                ON CONFLICT (url) DO NOTHING
+                RETURNING url
+                """,
+                values,
+                template=f"({_insert_placeholders()})",
+                page_size=page_size,
+                fetch=True,
+            )
+    return {url for (url,) in created}
 
-def get_by_url(url: str):
-    conn = psycopg2.connect(DATABASE_URL)
-    try:
+def get_indexed_urls(urls: list[str]) -> set[str]:
+    """Returns which of `urls` are already stored, in one round trip."""
+    if not urls:
+        return set()
+    with get_pool().connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("SELECT * FROM scraped_content WHERE url = %s", (url,))
+            cur.execute("SELECT url FROM scraped_content WHERE url = ANY(%s)", (list(urls),))
+            return {url for (url,) in cur.fetchall()}
+
+def get_by_url(url: str) -> Optional[StoredEntry]:
+    """
+    Returns the stored row for `url`, or None. Compressed content stays in
+    content_blobs until the entry's `content` is first read.
+    """
+    content_hash = "content_hash" if CONTENT_STORAGE == "compressed" else "NULL"
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT id, url, summary, source, metadata, created_at,
+                       guild_id, channel_id, submitter_id, content, {content_hash}
+                FROM scraped_content WHERE url = %s
+                """,
+                (url,)
+            )
+            row = cur.fetchone()
+    if row is None:
+        return None
+    fields = ["id", "url", "summary", "source", "metadata", "created_at",
+              "guild_id", "channel_id", "submitter_id", "content_head", "content_hash"]
+    entry = StoredEntry(**dict(zip(fields, row)))
+    entry._load_content = get_content
+    return entry
+
+def get_content(content_hash: str) -> Optional[str]:
+    """The full text of a compressed page body, by its hash."""
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT codec, body FROM content_blobs WHERE hash = %s", (content_hash,))
             row = cur.fetchone()
-            return row
-    finally:
-        conn.close()
+    return decompress_content(*row) if row else None
+
+def get_indexed_entry(url: str):
+    """Returns (url, summary, content preview, metadata) for an indexed URL, or None."""
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT url, summary, LEFT(content, 1001), metadata FROM scraped_content WHERE url = %s",
+                (url,)
+            )
+            return cur.fetchone()
+
+def get_entries_by_url(urls: list[str]):
+    """Returns (url, summary, metadata) rows for the given URLs in one round trip."""
+    if not urls:
+        return []
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT url, summary, metadata FROM scraped_content WHERE url = ANY(%s)",
+                (list(urls),)
+            )
+            return cur.fetchall()
 
-def get_recent_entries(limit: int = 10):
-    conn = psycopg2.connect(DATABASE_URL)
-    try:
+def search_full_text(query: str, limit: int = 20, offset: int = 0):
+    """Returns (url, summary, rank) rows matching `query`, best match first."""
+    with get_pool().connection() as conn:
         with conn.cursor() as cur:
             cur.execute("""
-                SELECT url, summary, created_at
-                FROM scraped_content
-                WHERE created_at >= NOW() - INTERVAL '24 hours'
-                ORDER BY created_at DESC
-                LIMIT %s
-            """, (limit,))
+                SELECT url, summary, ts_rank_cd(search_vector, q) AS rank
+                FROM scraped_content, websearch_to_tsquery('english', %s) AS q
+                WHERE search_vector @@ q
+                ORDER BY rank DESC, id DESC
+                LIMIT %s OFFSET %s
+            """, (query, limit, offset))
+            return cur.fetchall()
+
+def build_recent_entries_query(
+    limit: int,
+    guild_id: Optional[int] = None,
+    channel_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    before: Optional[EntryCursor] = None,
+) -> tuple[str, dict]:
+    """
+    SQL and parameters for one keyset page of entries, newest first.
+
+    The `page` CTE only touches (guild_id | channel_id, created_at, id), so it
+    is answered by an index-only scan on idx_scraped_recent or the guild /
+    channel variant; the wide columns are then fetched for `limit` rows.
+    """
+    conditions, params = [], {"limit": limit}
+    if guild_id is not None:
+        conditions.append("guild_id = %(guild_id)s")
+        params["guild_id"] = guild_id
+    if channel_id is not None:
+        conditions.append("channel_id = %(channel_id)s")
+        params["channel_id"] = channel_id
+    if since is not None:
+        conditions.append("created_at >= %(since)s")
+        params["since"] = since
+    if before is not None:
+        conditions.append("(created_at, id) < (%(before_created_at)s, %(before_id)s)")
+        params["before_created_at"] = before.created_at
+        params["before_id"] = before.id
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    sql = f"""
+        WITH page AS (
+            SELECT id, created_at
+            FROM scraped_content
+            {where}
+            ORDER BY created_at DESC, id DESC
+            LIMIT %(limit)s
+        )
+        SELECT s.id, s.url, COALESCE(s.summary, LEFT(s.content, 500)), s.created_at,
+               s.guild_id, s.channel_id, s.submitter_id
+        FROM page JOIN scraped_content s ON s.id = page.id
+        ORDER BY page.created_at DESC, page.id DESC
+    """
+    return sql, params
+
+def get_recent_entries_page(
+    limit: int = 10,
+    guild_id: Optional[int] = None,
+    channel_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    before: Optional[EntryCursor] = None,
+) -> EntryPage:
+    """
+    Returns one page of entries, newest first, optionally limited to a
+    guild or channel and to rows created after `since`. Pass the returned
+    `next_cursor` as `before` to get the following page.
+    """
+    sql, params = build_recent_entries_query(limit, guild_id, channel_id, since, before)
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
             rows = cur.fetchall()
-            return rows
-    finally:
-        conn.close()
+
+    entries = [
+        RecentEntry(
+            id=row_id, url=url, summary=summary, created_at=created_at,
+            guild_id=row_guild_id, channel_id=row_channel_id, submitter_id=submitter_id,
+        )
+        for row_id, url, summary, created_at, row_guild_id, row_channel_id, submitter_id in rows
+    ]
+    next_cursor = None
+    if len(entries) == limit:
+        next_cursor = EntryCursor(created_at=entries[-1].created_at, id=entries[-1].id)
+    return EntryPage(entries=entries, next_cursor=next_cursor)
+
+def get_recent_entries(limit: int = 10, guild_id: Optional[int] = None, channel_id: Optional[int] = None):
+    """Returns (url, summary, created_at) rows from the last 24 hours, newest first.
+    Rows without a summary (images) fall back to the head of their content."""
+    page = get_recent_entries_page(
+        limit, guild_id=guild_id, channel_id=channel_id,
+        since=datetime.now(timezone.utc) - timedelta(hours=24),
+    )
+    return [(entry.url, entry.summary, entry.created_at) for entry in page.entries]
@@ -0,0 +1,187 @@
+# database/pg_pool.py
+
+import functools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+# Connections opened eagerly by warm_up()
+PG_POOL_MIN = int(os.getenv("PG_POOL_MIN", "2"))
+# Hard cap on open connections to Neon
+PG_POOL_MAX = int(os.getenv("PG_POOL_MAX", "10"))
+# Seconds a caller may wait for a free connection before giving up
+PG_POOL_TIMEOUT = float(os.getenv("PG_POOL_TIMEOUT", "30"))
+# Idle connections older than this are pinged before reuse; Neon suspends
+# idle computes and drops their sockets.
+PG_POOL_HEALTH_CHECK_AFTER = float(os.getenv("PG_POOL_HEALTH_CHECK_AFTER", "60"))
+
+
+class PoolTimeout(RuntimeError):
+    pass
+
+
+class PgPool:
+    """
+    Thread-safe, size-bounded pool of psycopg2 connections.
+
+    Callers block (up to `timeout` seconds) when all `max_size` connections are
+    checked out instead of opening new ones, so the number of connections to
+    Neon never exceeds the cap no matter how many ingestion threads run.
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        min_size: int = PG_POOL_MIN,
+        max_size: int = PG_POOL_MAX,
+        timeout: float = PG_POOL_TIMEOUT,
+        health_check_after: float = PG_POOL_HEALTH_CHECK_AFTER,
+        connect_fn: Optional[Callable] = None,
+    ):
+        if min_size > max_size:
+            raise ValueError("min_size cannot be larger than max_size.")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self._connect_fn = connect_fn or functools.partial(psycopg2.connect, dsn)
+
+        self._idle = deque()  # (conn, last_used) pairs, most recent on the right
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.open_connections = 0
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.connects = 0
+        self.health_check_failures = 0
+
+    def warm_up(self):
+        """Opens `min_size` connections up front so the first queries skip the handshake."""
+        with self._lock:
+            missing = self.min_size - len(self._idle)
+        conns = [self.getconn() for _ in range(max(missing, 0))]
+        for conn in conns:
+            self.putconn(conn)
+        logger.info(f"Postgres pool warmed up with {len(conns)} connection(s)")
+
+    def getconn(self):
+        if self._closed:
+            raise RuntimeError("Postgres pool is closed.")
+
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No Postgres connection available after {self.timeout}s")
+        waited = time.perf_counter() - start
+
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+        try:
+            while True:
+                with self._lock:
+                    item = self._idle.pop() if self._idle else None
+                if item is None:
+                    return self._connect()
+                conn, last_used = item
+                if self._is_healthy(conn, last_used):
+                    return conn
+                self._discard(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, discard: bool = False):
+        try:
+            if discard or conn.closed or self._closed:
+                self._discard(conn)
+                return
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Checks out a connection, commits on success and rolls back on error."""
+        conn = self.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            broken = bool(conn.closed)
+            if not broken:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            self.putconn(conn, discard=broken)
+            raise
+        else:
+            self.putconn(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open_connections": self.open_connections,
+                "idle_connections": len(self._idle),
+                "max_size": self.max_size,
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "health_check_failures": self.health_check_failures,
+                "wait_avg_ms": (self.wait_total / self.checkouts * 1000) if self.checkouts else 0.0,
+                "wait_max_ms": self.wait_max * 1000,
+            }
+
+    def closeall(self):
+        self._closed = True
+        with self._lock:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+        for conn in idle:
+            self._discard(conn)
+
+    def _connect(self):
+        conn = self._connect_fn()
+        with self._lock:
+            self.open_connections += 1
+            self.connects += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self.open_connections -= 1
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self._lock:
+                self.health_check_failures += 1
+            logger.warning("Discarding stale Postgres connection")
+            return False
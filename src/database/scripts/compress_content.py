@@ -0,0 +1,149 @@
+# database/scripts/compress_content.py
+#
+# Moves the page content of existing scraped_content rows into content_blobs,
+# for switching to CONTENT_STORAGE=compressed (apply migrate_to_neon_db's
+# migrations first). Only the head of each page stays in the row; its
+# search_vector is rebuilt from the whole text.
+#
+#   cd src && python -m database.scripts.compress_content
+#   cd src && python -m database.scripts.compress_content --batch-size 200
+#
+# Rows compressed before migration 5 were indexed from their head only;
+# --reindex rebuilds the search_vector of every compressed row instead.
+#
+#   cd src && python -m database.scripts.compress_content --reindex
+#
+# Each batch is its own transaction and done rows are skipped, so the script
+# can be stopped and run again. Postgres only hands the space freed in
+# scraped_content back after VACUUM FULL (or pg_repack).
+
+import argparse
+import time
+
+from psycopg2.extras import execute_values
+
+from database.content_store import CONTENT_HOT_CHARS, decompress_content, split_content
+from database.pg_database import close_pool, get_pool, search_vector_sql
+
+
+def compress_batch(after_id: int, batch_size: int, hot_chars: int = CONTENT_HOT_CHARS) -> tuple[int, int, int, int]:
+    """
+    Compresses the next `batch_size` long rows with an id above `after_id`.
+    Returns (last id seen, rows moved, bytes before, compressed bytes).
+    """
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, content FROM scraped_content
+                WHERE id > %s AND content_hash IS NULL AND length(content) > %s
+                ORDER BY id
+                LIMIT %s
+                """,
+                (after_id, hot_chars, batch_size),
+            )
+            rows = cur.fetchall()
+            if not rows:
+                return after_id, 0, 0, 0
+
+            updates, blobs = [], {}
+            for row_id, content in rows:
+                head, blob = split_content(content, "compressed", hot_chars)
+                updates.append((row_id, head, blob.hash, content))
+                blobs[blob.hash] = blob
+            execute_values(
+                cur,
+                "INSERT INTO content_blobs (hash, codec, size, body) VALUES %s ON CONFLICT (hash) DO NOTHING",
+                [(blob.hash, blob.codec, blob.size, blob.body) for blob in blobs.values()],
+            )
+            execute_values(
+                cur,
+                f"""
+                UPDATE scraped_content AS s
+                SET content = v.head, content_hash = v.hash, search_vector = {search_vector_sql("s.summary", "v.content")}
+                FROM (VALUES %s) AS v(id, head, hash, content)
+                WHERE s.id = v.id
+                """,
+                updates,
+            )
+    return (
+        rows[-1][0],
+        len(rows),
+        sum(blob.size for blob in blobs.values()),
+        sum(len(blob.body) for blob in blobs.values()),
+    )
+
+
+def reindex_batch(after_id: int, batch_size: int) -> tuple[int, int]:
+    """
+    Rebuilds the search_vector of the next `batch_size` compressed rows with
+    an id above `after_id` from their full text. Returns (last id seen, rows).
+    """
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT s.id, b.codec, b.body FROM scraped_content s
+                JOIN content_blobs b ON b.hash = s.content_hash
+                WHERE s.id > %s
+                ORDER BY s.id
+                LIMIT %s
+                """,
+                (after_id, batch_size),
+            )
+            rows = cur.fetchall()
+            if not rows:
+                return after_id, 0
+            execute_values(
+                cur,
+                f"""
+                UPDATE scraped_content AS s SET search_vector = {search_vector_sql("s.summary", "v.content")}
+                FROM (VALUES %s) AS v(id, content)
+                WHERE s.id = v.id
+                """,
+                [(row_id, decompress_content(codec, body)) for row_id, codec, body in rows],
+            )
+    return rows[-1][0], len(rows)
+
+
+def reindex(batch_size: int):
+    last_id, done = 0, 0
+    while True:
+        last_id, rows = reindex_batch(last_id, batch_size)
+        if not rows:
+            break
+        done += rows
+        print(f"  {done} row(s) reindexed, up to id {last_id}")
+    print(f"✅ Rebuilt the search vector of {done} compressed row(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move scraped page content into compressed content_blobs")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--reindex", action="store_true", help="rebuild full-text vectors of compressed rows")
+    args = parser.parse_args()
+
+    if args.reindex:
+        try:
+            reindex(args.batch_size)
+        finally:
+            close_pool()
+        return
+
+    last_id, moved, before, after = 0, 0, 0, 0
+    started = time.perf_counter()
+    try:
+        while True:
+            last_id, rows, raw, compressed = compress_batch(last_id, args.batch_size)
+            if not rows:
+                break
+            moved, before, after = moved + rows, before + raw, after + compressed
+            print(f"  {moved} row(s) compressed, up to id {last_id} ({moved / (time.perf_counter() - started):.0f}/s)")
+    finally:
+        close_pool()
+    ratio = f", {before / after:.1f}x smaller" if after else ""
+    print(f"✅ Compressed {moved} row(s): {before / 1e6:.1f} MB of distinct content stored as {after / 1e6:.1f} MB{ratio}")
+
+
+if __name__ == "__main__":
+    main()
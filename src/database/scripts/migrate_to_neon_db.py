@@ -2,6 +2,7 @@
 
 import os
 import psycopg2
+from pydantic import BaseModel
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -20,19 +21,157 @@ CREATE TABLE IF NOT EXISTS scraped_content (
 
 -- Index for sorting/filtering
 CREATE INDEX IF NOT EXISTS idx_scraped_created_at ON scraped_content(created_at);
+
+-- Full-text search over summaries and (the head of) page content, for exact
+-- terms that vector search misses: library names, error codes, handles.
+ALTER TABLE scraped_content ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(summary, '')), 'A') ||
+        setweight(to_tsvector('english', left(coalesce(content, ''), 200000)), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_scraped_search_vector ON scraped_content USING GIN (search_vector);
 """
 
+class Migration(BaseModel):
+    version: int
+    name: str
+    statements: list[str]
+    # CREATE/DROP INDEX CONCURRENTLY can't run inside a transaction, so
+    # non-transactional migrations run statement by statement in autocommit.
+    # If one fails midway, re-running it is safe: every statement is
+    # idempotent (an INVALID index left by a failed build must be dropped
+    # by hand first).
+    transactional: bool = True
+
+
+# Applied in order, each exactly once; applied versions are recorded in
+# schema_migrations. Never edit a released migration, append a new one.
+MIGRATIONS = [
+    Migration(version=1, name="baseline", statements=[MIGRATION_SQL]),
+    # Nullable columns without defaults are a catalog-only change, no rewrite
+    Migration(version=2, name="provenance columns", statements=["""
+        ALTER TABLE scraped_content
+            ADD COLUMN IF NOT EXISTS guild_id BIGINT,
+            ADD COLUMN IF NOT EXISTS channel_id BIGINT,
+            ADD COLUMN IF NOT EXISTS submitter_id BIGINT
+    """]),
+    # Keyset pagination walks (created_at, id) newest first, optionally
+    # within one guild or channel. The page itself is read with an
+    # index-only scan; url and summary are fetched for the page's rows only,
+    # since they are too large to INCLUDE in a btree.
+    Migration(version=3, name="keyset indexes", transactional=False, statements=[
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_scraped_recent ON scraped_content (created_at DESC, id DESC)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_scraped_guild_recent "
+        "ON scraped_content (guild_id, created_at DESC, id DESC) WHERE guild_id IS NOT NULL",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_scraped_channel_recent "
+        "ON scraped_content (channel_id, created_at DESC, id DESC) WHERE channel_id IS NOT NULL",
+        # Superseded by idx_scraped_recent
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_scraped_created_at",
+    ]),
+    # Full page bodies for CONTENT_STORAGE=compressed, one row per distinct
+    # text. They are zstd-compressed already, so EXTERNAL storage keeps
+    # Postgres from running them through pglz again.
+    Migration(version=4, name="compressed content blobs", statements=[
+        """
+        CREATE TABLE IF NOT EXISTS content_blobs (
+            hash TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            body BYTEA NOT NULL,
+            created_at TIMESTAMPTZ DEFAULT NOW()
+        )
+        """,
+        "ALTER TABLE content_blobs ALTER COLUMN body SET STORAGE EXTERNAL",
+        "ALTER TABLE scraped_content ADD COLUMN IF NOT EXISTS content_hash TEXT REFERENCES content_blobs(hash)",
+    ]),
+    # A generated search_vector can only see the head kept in the row, so
+    # compressed rows lost every term past CONTENT_HOT_CHARS. It becomes a
+    # plain column (values and GIN index kept): compressed-mode writes fill
+    # it from the whole text, and the trigger fills it as before otherwise,
+    # recomputing it when an inline row's summary or content changes. A
+    # compressed row's head isn't the whole text, so whoever rewrites one
+    # sets its search_vector too (see database/scripts/compress_content.py).
+    Migration(version=5, name="search vector over full content", statements=[
+        "ALTER TABLE scraped_content ALTER COLUMN search_vector DROP EXPRESSION IF EXISTS",
+        """
+        CREATE OR REPLACE FUNCTION scraped_content_search_vector() RETURNS trigger AS $$
+        BEGIN
+            IF (TG_OP = 'INSERT' AND NEW.search_vector IS NULL)
+                OR (TG_OP = 'UPDATE' AND NEW.content_hash IS NULL) THEN
+                NEW.search_vector :=
+                    setweight(to_tsvector('english', coalesce(NEW.summary, '')), 'A') ||
+                    setweight(to_tsvector('english', left(coalesce(NEW.content, ''), 200000)), 'B');
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS scraped_content_search_vector ON scraped_content",
+        """
+        CREATE TRIGGER scraped_content_search_vector
+        BEFORE INSERT OR UPDATE OF summary, content ON scraped_content
+        FOR EACH ROW EXECUTE FUNCTION scraped_content_search_vector()
+        """,
+    ]),
+]
+
+# Serializes concurrent migration runs (e.g. several bot processes starting)
+MIGRATION_LOCK_ID = 7_241_001
+
+
+def apply_migrations(conn, migrations: list[Migration] = MIGRATIONS) -> list[int]:
+    """Applies pending migrations on `conn` and returns the versions applied."""
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+    try:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMPTZ DEFAULT NOW()
+            )
+        """)
+        cur.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cur.fetchall()}
+
+        done = []
+        for migration in sorted(migrations, key=lambda m: m.version):
+            if migration.version in applied:
+                continue
+            if migration.transactional:
+                cur.execute("BEGIN")
+            try:
+                for statement in migration.statements:
+                    cur.execute(statement)
+                cur.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (migration.version, migration.name),
+                )
+                if migration.transactional:
+                    cur.execute("COMMIT")
+            except BaseException:
+                if migration.transactional:
+                    cur.execute("ROLLBACK")
+                raise
+            print(f"Applied migration {migration.version}: {migration.name}")
+            done.append(migration.version)
+        return done
+    finally:
+        cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+        cur.close()
+
+
 def run_migration():
     if not DATABASE_URL:
         raise EnvironmentError("❌ NEON_DB_URL is not set in environment variables.")
 
     conn = psycopg2.connect(DATABASE_URL)
-    cur = conn.cursor()
-    cur.execute(MIGRATION_SQL)
-    conn.commit()
-    cur.close()
-    conn.close()
-    print("✅ Migration complete: Table + indexes created in Neon.")
+    try:
+        applied = apply_migrations(conn)
+    finally:
+        conn.close()
+    print(f"✅ Migration complete: {len(applied)} migration(s) applied in Neon.")
 
 if __name__ == "__main__":
     run_migration()
\ No newline at end of file
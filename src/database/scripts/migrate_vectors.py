@@ -0,0 +1,89 @@
+# database/scripts/migrate_vectors.py
+#
+# Copies every chunk with its embedding from one vector backend to the
+# other (nothing is re-embedded), and builds the NumPy store's IVF index.
+#
+#   cd src && python -m database.scripts.migrate_vectors --from chroma --to numpy --verify 200
+#   cd src && python -m database.scripts.migrate_vectors --from numpy --to chroma
+#   cd src && python -m database.scripts.migrate_vectors --build-ivf 1024
+#
+# Stores are opened as the bot opens them (CHROMA_MODE / CHROMA_PATH,
+# NUMPY_STORE_PATH). Writes are upserts, so an interrupted copy can simply be
+# run again. Point VECTOR_BACKEND at the target once it is done.
+
+import argparse
+import time
+
+import numpy as np
+
+from database.vector_db import make_store
+from database.vector_store import VectorStore
+
+BACKENDS = ("chroma", "numpy")
+
+
+def migrate(source: VectorStore, target: VectorStore, batch_size: int = 1000) -> int:
+    """Copies all of `source` into `target`; returns the number of chunks copied."""
+    copied = 0
+    started = time.perf_counter()
+    for ids, embeddings, documents, metadatas in source.export(batch_size):
+        target.upsert_embeddings(ids, embeddings, documents, metadatas)
+        copied += len(ids)
+        print(f"  {copied} chunk(s) copied ({copied / (time.perf_counter() - started):.0f}/s)")
+    return copied
+
+
+def verify(source: VectorStore, target: VectorStore, samples: int, seed: int = 0) -> float:
+    """Share of sampled chunks that the target finds as their own nearest neighbour."""
+    total = source.count()
+    if not total:
+        return 1.0
+    wanted = set(np.random.default_rng(seed).choice(total, min(samples, total), replace=False).tolist())
+    sampled_ids, sampled_embeddings = [], []
+    position = 0
+    for ids, embeddings, _, _ in source.export(1000):
+        for offset, doc_id in enumerate(ids):
+            if position + offset in wanted:
+                sampled_ids.append(doc_id)
+                sampled_embeddings.append(embeddings[offset])
+        position += len(ids)
+    results = target.query(query_embeddings=np.array(sampled_embeddings), n_results=1)
+    found = sum(1 for doc_id, hits in zip(sampled_ids, results["ids"]) if hits and hits[0] == doc_id)
+    return found / len(sampled_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move chunk embeddings between vector backends")
+    parser.add_argument("--from", dest="source", choices=BACKENDS)
+    parser.add_argument("--to", dest="target", choices=BACKENDS)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--verify", type=int, default=0, help="Check this many sampled chunks find themselves afterwards")
+    parser.add_argument("--build-ivf", type=int, metavar="LISTS", help="Partition the NumPy store into LISTS lists")
+    args = parser.parse_args()
+    if bool(args.source) != bool(args.target):
+        parser.error("--from and --to go together")
+    if args.source and args.source == args.target:
+        parser.error("--from and --to must differ")
+    if not args.source and not args.build_ivf:
+        parser.error("nothing to do: pass --from/--to and/or --build-ivf")
+
+    if args.source:
+        source, target = make_store(args.source), make_store(args.target)
+        before = target.count()
+        copied = migrate(source, target, args.batch_size)
+        print(f"✅ Copied {copied} chunk(s) from {args.source} to {args.target} ({before} were already there, {target.count()} now)")
+        if args.verify:
+            print(f"Verify: {verify(source, target, args.verify):.1%} of {args.verify} sampled chunks are their own top hit")
+        source.close()
+        target.close()
+
+    if args.build_ivf:
+        store = make_store("numpy")
+        started = time.perf_counter()
+        store.build_ivf(args.build_ivf)
+        print(f"✅ Built {args.build_ivf} IVF lists over {store.count()} vectors in {time.perf_counter() - started:.1f}s")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
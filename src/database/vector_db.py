@@ -0,0 +1,77 @@
+# database/vector_db.py
+
+import logging
+import os
+from database.chroma_buffer import ChromaWriteBuffer
+from database.vector_store import VectorStore
+from services.embed.embedder import OnnxEmbedder, make_embedding_service
+from utils.chunk_text import collapse_to_parents
+from utils.registry import services
+from utils.telemetry import stage
+
+logger = logging.getLogger(__name__)
+
+# "chroma": chunks live in a Chroma collection (see CHROMA_MODE).
+# "numpy": a memory-mapped array under NUMPY_STORE_PATH, lighter than
+# Chroma and shareable by several processes on one host.
+# Move existing chunks across with database/scripts/migrate_vectors.py.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+
+def make_store(backend: str = VECTOR_BACKEND) -> VectorStore:
+    embedding_function = services.get("embedding_function")
+    if backend == "chroma":
+        from database.chroma_db import ChromaStore
+        return ChromaStore.open(embedding_function)
+    if backend == "numpy":
+        from database.numpy_store import NUMPY_STORE_PATH, NumpyStore
+        return NumpyStore(NUMPY_STORE_PATH, embedding_function)
+    raise ValueError(f"Unknown VECTOR_BACKEND {backend!r}; use 'chroma' or 'numpy'")
+
+def _warm_store(store: VectorStore):
+    # The first query opens the collection or maps the vector file
+    store.query(query_texts=["warm up"], n_results=1)
+
+# The ONNX model is only loaded once a text misses the embedding caches
+services.register("embedder", OnnxEmbedder.load, warm=lambda embedder: embedder(["warm up"]))
+services.register("embedding_function", make_embedding_service)
+services.register("vector_store", make_store, warm=_warm_store)
+# Writes are queued and embedded in batches by a background flusher; creating
+# it replays documents left in the write-ahead file by the last run
+services.register("vector_writer", lambda: ChromaWriteBuffer(services.get("vector_store")))
+
+def get_store() -> VectorStore:
+    return services.get("vector_store")
+
+# Writes are eventually consistent: a queued document shows up in queries
+# once the flusher has written it. Queueing failures (the write-ahead file
+# can't be written, say) raise, so the caller can retry the whole URL.
+
+def add_document(doc_id: str, content: str, metadata: dict):
+    with stage("vector.add"):
+        services.get("vector_writer").add(doc_id, content, metadata)
+    logger.debug(f"Vector store: Queued doc_id={doc_id}")
+
+def add_documents(records: list[tuple[str, str, dict]]):
+    """Queues (doc_id, content, metadata) records in one go, e.g. for a backfill batch."""
+    services.get("vector_writer").add_many(records)
+    logger.info(f"Vector store: Queued {len(records)} document(s)")
+
+def flush_documents():
+    """
+    Writes queued documents now and stops the flusher; called on shutdown,
+    or by one-off scripts before they query what they just wrote.
+    """
+    if services.ready("vector_writer"):
+        services.get("vector_writer").close()
+
+# Chunks fetched per requested result, so several chunks of one page don't
+# crowd out other pages once they are collapsed to their parent URL
+QUERY_OVERSAMPLE = 4
+
+def query_document(query_text: str, n_results: int = 4):
+    results = get_store().query(query_texts=[query_text], n_results=n_results * QUERY_OVERSAMPLE)
+    return collapse_to_parents(results, n_results)
+
+def query_chunks(query_text: str, n_results: int = 8):
+    """Returns raw chunk-level hits, without collapsing them to parent URLs."""
+    return get_store().query(query_texts=[query_text], n_results=n_results)
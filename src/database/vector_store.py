@@ -0,0 +1,72 @@
+# database/vector_store.py
+
+from abc import ABC, abstractmethod
+from typing import Callable, Iterator, Optional, Sequence
+
+import numpy as np
+
+# Turns documents (or queries) into vectors, one per input
+EmbeddingFunction = Callable[[list[str]], Sequence]
+
+# Chroma's query() shape, which every backend returns: one inner list per
+# query of ids, documents, metadatas and distances (squared L2 between
+# normalized vectors, i.e. 2 - 2 * cosine similarity)
+QueryResult = dict[str, list[list]]
+
+# (ids, float32 embeddings of shape (n, dim), documents, metadatas)
+VectorBatch = tuple[list[str], np.ndarray, list[str], list[dict]]
+
+
+class VectorStore(ABC):
+    """
+    Where chunk embeddings live. `upsert` and `query` keep Chroma's keyword
+    names, so ChromaWriteBuffer and the result helpers in utils/chunk_text
+    work against any backend.
+    """
+
+    embedding_function: EmbeddingFunction
+
+    def upsert(self, ids: list[str], documents: list[str], metadatas: list[dict]):
+        """Embeds `documents` and inserts or replaces them under `ids`."""
+        self.upsert_embeddings(ids, self.embedding_function(list(documents)), documents, metadatas)
+
+    def embed_queries(self, query_texts: list[str]):
+        """Embeds query texts, through the embedding service's query cache when there is one."""
+        embed = getattr(self.embedding_function, "embed_queries", self.embedding_function)
+        return embed(list(query_texts))
+
+    @abstractmethod
+    def upsert_embeddings(self, ids: list[str], embeddings, documents: list[str], metadatas: list[dict]):
+        """Stores precomputed embeddings, e.g. when migrating between backends."""
+        pass
+
+    @abstractmethod
+    def query(
+        self,
+        query_texts: Optional[list[str]] = None,
+        query_embeddings=None,
+        n_results: int = 10,
+    ) -> QueryResult:
+        """Nearest `n_results` chunks for each query text (or embedding)."""
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        pass
+
+    @abstractmethod
+    def export(self, batch_size: int = 1000) -> Iterator[VectorBatch]:
+        """Every stored chunk with its embedding, `batch_size` at a time."""
+        pass
+
+    def close(self):
+        pass
+
+
+def normalize(vectors) -> np.ndarray:
+    """Rows scaled to unit length as float32, so a dot product is the cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[np.newaxis, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
@@ -4,18 +4,45 @@ import os
 from discord.ext import tasks
 from datetime import time
 import pytz
-from services.daily_briefing import generate_briefing
+from services.daily_briefing import generate_briefing, digest_for, all_digests, render_entries, DIGEST_SIZE
 from services.scrape.scrape_links import scrape
 from utils.detect_link_type import detect_scraper_type
-import re
+from utils.canonical_url import canonicalize_url
+from utils.extract_urls import extract_urls
+from time import perf_counter
+import asyncio
 import logging
-from services.persist.persist_to_db import persist_to_db
-from database.pg_database import get_recent_entries
-from services.llm.summarizer import summarize_entries
+from typing import Optional
+from services.persist.persist_to_db import persist_to_db, find_indexed, ALREADY_INDEXED
+from database.pg_database import warm_up_pool, close_pool
+from database.vector_db import flush_documents, query_chunks, query_document
+from database.pg_database import get_entries_by_url, search_full_text, get_recent_entries_page
+from models.database import EntryCursor
+from services.search import hybrid_search, SEARCH_PAGE_SIZE
+from services.ask import ASK_TOP_K, MAX_MESSAGE_CHARS, group_chunks, build_context, format_answer
+from services.llm.gemini import stream_answer
+from services.ingest.pipeline import IngestPipeline, IngestResult
+from services.ingest.dedup import KnownUrlCache
+from services.ingest.job_queue import JobQueue, JobWorkers, JobWatcher, Job
+from services.topology import GATEWAY, is_primary, process_role, shard_options
+from utils.debounce import Debouncer
+from utils.registry import services
+from utils.telemetry import format_stats, setup_telemetry, shutdown_telemetry, stats
 
 # --- Constants ---
 BRIEFING_TIME = time(hour=18, minute=30, tzinfo=pytz.utc)
 BRIEFING_CHANNEL_ID = 1377194701551173662
+MAX_EMBEDS_PER_MESSAGE = 10  # Discord's per-message embed limit
+STREAM_EDIT_INTERVAL = 1.0  # Seconds between edits of a streaming reply; Discord allows ~5 edits per 5s per channel
+STREAM_PREVIEW_CHARS = 1000  # Characters of a streaming summary shown in its placeholder embed
+JOB_REPLY_TIMEOUT = 60  # Seconds on_message waits before replying; later results are posted on their own
+DIGEST_REFRESH_INTERVAL = 30  # Seconds between background checks for new entries to fold into the digest
+BRIEF_HEADER = "**Here's a quick summary of what I've learned recently:**\n\n"
+OLDER_HEADER = "**Earlier:**\n\n"
+OLDER_VIEW_TIMEOUT = 600  # Seconds the "Older" button on /brief stays usable
+# Build the Gemini, Chroma and Firecrawl clients in the background once connected,
+# instead of on the first message that needs them
+WARM_UP_SERVICES = os.getenv("WARM_UP_SERVICES", "true").lower() != "false"
 
 # Configure logging
 logging.basicConfig(
@@ -28,56 +55,271 @@ intents = discord.Intents.default()
 intents.messages = True
 intents.message_content = True
 
-class MyClient(discord.Client):
-    def __init__(self, *, intents: discord.Intents):
-        super().__init__(intents=intents)
+class MyClient(discord.AutoShardedClient):
+    def __init__(self, *, intents: discord.Intents, **shard_options):
+        super().__init__(intents=intents, **shard_options)
         self.tree = app_commands.CommandTree(self)
 
     async def setup_hook(self):
-        await self.tree.sync()
+        if is_primary():
+            await self.tree.sync()
+        try:
+            await pipeline.run_blocking(warm_up_pool)
+        except Exception as e:
+            logger.error(f"Could not warm up Postgres pool: {str(e)}")
+
+    async def close(self):
+        await workers.stop()
+        await super().close()
+        pipeline.shutdown(wait=False)
+        job_queue.close()
+        flush_documents()
+        close_pool()
+        shutdown_telemetry()
+
+# Shards come from SHARD_COUNT / SHARD_IDS; without them Discord picks the count
+bot = MyClient(intents=intents, **shard_options())
+
+# Blocking scrape/persist work runs on the pipeline's thread pool so a slow
+# page never stalls the gateway heartbeat.
+pipeline = IngestPipeline(
+    scrape_fn=scrape,
+    persist_fn=persist_to_db,
+    detect_fn=detect_scraper_type,
+    known_urls=KnownUrlCache(lookup_fn=find_indexed),
+)
+
+async def deliver_job_result(job: Job, outcome):
+    """Posts the result of a job nobody is waiting on, e.g. a retry or one resumed after a restart."""
+    channel = bot.get_channel(job.payload.get("channel_id"))
+    if channel is None:
+        logger.warning(f"No channel to report job {job.id} for {job.url}")
+        return
+    if isinstance(outcome, Exception):
+        await channel.send(embed=build_error_embed(job.url, outcome))
+    else:
+        await channel.send(embed=build_result_embed(outcome))
+
+# Ingestion goes through a durable queue so rate limits and timeouts are
+# retried with backoff and a restart resumes unfinished work.
+# In a split deployment, ingest processes run the jobs and this process only
+# waits for them.
+job_queue = JobQueue()
+if process_role() == GATEWAY:
+    workers = JobWatcher(job_queue, pipeline, on_finished=deliver_job_result)
+else:
+    workers = JobWorkers(job_queue, pipeline, on_finished=deliver_job_result)
+
+def build_result_embed(result: IngestResult) -> discord.Embed:
+    data = result.data
+    embed = discord.Embed(
+        title=data.title or f"{result.scraper_type.capitalize()} content",
+        description=(data.summary if data.summary else (data.content[:1000] + ("..." if data.content and len(data.content) > 1000 else "")) if data.content else "No description."),
+        url=data.url,
+        color=0x3DFFCE
+    )
+
+    embed.set_footer(text=f"{data.metadata.get('source', 'Unknown source')} • {result.persist_result or ALREADY_INDEXED}")
+
+    if result.scraper_type == "image":
+        embed.set_image(url=data.url)
 
-bot = MyClient(intents=intents)
+    return embed
 
-def extract_urls(text: str) -> list[str]:
-    return re.findall(r'https?://[^\s]+', text)
+def build_error_embed(url: str, error: Exception) -> discord.Embed:
+    return discord.Embed(
+        title="❌ Failed to process",
+        description=f"`{url}`\n```{str(error)[:1000]}```",
+        color=0xFF4D4D
+    )
+
+def build_progress_embed(url: str, text: str = "") -> discord.Embed:
+    if text:
+        description = text[:STREAM_PREVIEW_CHARS] + ("..." if len(text) > STREAM_PREVIEW_CHARS else "") + " ▌"
+    else:
+        description = f"`{url}`"
+    return discord.Embed(title="⏳ Processing...", description=description, url=url, color=0x8C8C8C)
+
+def build_queued_embed(url: str) -> discord.Embed:
+    return discord.Embed(
+        title="⏳ Still working on it",
+        description=f"`{url}` is queued for retry. I'll post the result here when it's done.",
+        color=0xFFC34D
+    )
 
 @tasks.loop(time=BRIEFING_TIME)
 async def send_daily_briefing():
     """Sends the daily briefing to the specified channel."""
     channel = bot.get_channel(BRIEFING_CHANNEL_ID)
     if channel:
-        briefing = generate_briefing()
-        await channel.send(briefing)
-    else:
+        # Summarize the server the briefing channel belongs to
+        guild_id = channel.guild.id if getattr(channel, "guild", None) else None
+        briefing = await pipeline.run_blocking(generate_briefing, guild_id)
+        await channel.send(briefing[:MAX_MESSAGE_CHARS])
+    elif process_role() != GATEWAY:
+        # A gateway only sees the channels on its own shards
         logger.error(f"Could not find channel with ID {BRIEFING_CHANNEL_ID}")
 
+@tasks.loop(seconds=DIGEST_REFRESH_INTERVAL)
+async def refresh_digest():
+    """Folds newly persisted entries into the digests so /brief never waits on Gemini."""
+    for digest in all_digests():
+        if digest.is_stale():
+            try:
+                await pipeline.run_blocking(digest.refresh)
+            except Exception as e:
+                logger.error(f"Could not refresh digest: {str(e)}")
+
+warm_up_task: Optional[asyncio.Task] = None
+
 @bot.event
 async def on_ready():
+    global warm_up_task
     logger.info(f"Bot logged in as {bot.user}")
+    workers.start()
     send_daily_briefing.start()
+    refresh_digest.start()
+    # on_ready fires again after a reconnect; warm up once
+    if WARM_UP_SERVICES and warm_up_task is None:
+        warm_up_task = asyncio.create_task(pipeline.run_blocking(services.warm_up))
+
+class OlderEntriesView(discord.ui.View):
+    """An "Older" button that pages back through entries with a keyset cursor."""
+
+    def __init__(self, cursor: EntryCursor, guild_id: Optional[int], channel_id: Optional[int]):
+        super().__init__(timeout=OLDER_VIEW_TIMEOUT)
+        self.cursor = cursor
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+
+    @discord.ui.button(label="Older", style=discord.ButtonStyle.secondary)
+    async def older(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.defer(ephemeral=True)
+        try:
+            page = await pipeline.run_blocking(
+                get_recent_entries_page, DIGEST_SIZE,
+                guild_id=self.guild_id, channel_id=self.channel_id, before=self.cursor,
+            )
+            if not page.entries:
+                await interaction.followup.send("That's everything.", ephemeral=True)
+                return
+            view = OlderEntriesView(page.next_cursor, self.guild_id, self.channel_id) if page.next_cursor else None
+            kwargs = {"view": view} if view else {}
+            await interaction.followup.send(
+                render_entries(page.entries, OLDER_HEADER)[:MAX_MESSAGE_CHARS], ephemeral=True, **kwargs
+            )
+        except Exception as e:
+            logger.error(f"Error paging older entries: {str(e)}", exc_info=True)
+            await interaction.followup.send("❌ An error occurred while loading older entries.", ephemeral=True)
 
 @bot.tree.command(name="brief", description="Get a real-time summary of the latest knowledge.")
-async def brief(interaction: discord.Interaction):
-    """Generates an on-demand summary of recent entries."""
+@app_commands.describe(scope="Whose links to summarize")
+@app_commands.choices(scope=[
+    app_commands.Choice(name="This server", value="server"),
+    app_commands.Choice(name="This channel", value="channel"),
+    app_commands.Choice(name="Everywhere", value="all"),
+])
+async def brief(interaction: discord.Interaction, scope: str = "server"):
+    """Answers from the rolling digest; only entries new since its last refresh go to Gemini."""
     logger.info(f"Brief command invoked by {interaction.user.name} ({interaction.user.id})")
+    started = perf_counter()
     await interaction.response.defer(ephemeral=True)
     try:
-        logger.info("Fetching recent entries for brief command...")
-        entries = get_recent_entries(limit=10)
-        logger.info(f"Fetched {len(entries)} entries for brief command.")
-        if not entries:
-            await interaction.followup.send("No new knowledge captured in the last 24 hours.")
-            logger.info("No entries found for brief command.")
-            return
-
-        logger.info("Summarizing entries for brief command...")
-        summary = summarize_entries(entries)
-        logger.info("Summary generated for brief command. Sending response.")
-        await interaction.followup.send(f"**Here's a quick summary of what I've learned recently:**\n\n{summary}")
+        guild_id = interaction.guild_id if scope in ("server", "channel") else None
+        channel_id = interaction.channel_id if scope == "channel" else None
+        digest = digest_for(guild_id, channel_id)
+        cached = not digest.is_stale()
+        briefing = await pipeline.run_blocking(digest.render, BRIEF_HEADER)
+        cursor = digest.next_cursor()
+        kwargs = {"view": OlderEntriesView(cursor, guild_id, channel_id)} if cursor else {}
+        await interaction.followup.send(briefing[:MAX_MESSAGE_CHARS], **kwargs)
+        logger.info(f"Brief timings: scope={scope}, cached={cached}, total={(perf_counter() - started) * 1000:.0f}ms")
     except Exception as e:
         logger.error(f"Error generating brief: {str(e)}", exc_info=True)
         await interaction.followup.send("❌ An error occurred while generating the summary.")
 
+@bot.tree.command(name="stats", description="Latency and token use per pipeline stage in this process.")
+@app_commands.default_permissions(administrator=True)
+async def stats_command(interaction: discord.Interaction):
+    summaries = stats.snapshot()
+    if not summaries:
+        await interaction.response.send_message("No stages recorded yet.", ephemeral=True)
+        return
+    # Leave room for the code fence
+    table = format_stats(summaries)[:MAX_MESSAGE_CHARS - 8]
+    await interaction.response.send_message(f"```\n{table}\n```", ephemeral=True)
+
+@bot.tree.command(name="ask", description="Ask a question about everything I've learned.")
+@app_commands.describe(question="What do you want to know?")
+async def ask(interaction: discord.Interaction, question: str):
+    """Answers a question from the knowledge base, streaming the reply."""
+    logger.info(f"Ask command invoked by {interaction.user.name} ({interaction.user.id})")
+    timings = {}
+    started = perf_counter()
+    try:
+        # Acknowledge the interaction while Chroma is searched
+        _, results = await asyncio.gather(
+            interaction.response.defer(),
+            pipeline.run_blocking(query_chunks, question, ASK_TOP_K),
+        )
+        timings["retrieve"] = perf_counter() - started
+
+        chunks_by_url = group_chunks(results)
+        rows = await pipeline.run_blocking(get_entries_by_url, list(chunks_by_url))
+        summaries = {url: summary for url, summary, _ in rows}
+        timings["fetch_rows"] = perf_counter() - started - timings["retrieve"]
+
+        context, sources = build_context(chunks_by_url, summaries)
+        if not sources:
+            await interaction.followup.send("I couldn't find anything about that yet.")
+            return
+
+        reply = await interaction.followup.send("🔎 Thinking...", wait=True)
+        generation_started = perf_counter()
+        answer = ""
+        editor = Debouncer(lambda: reply.edit(content=format_answer(answer, sources)), STREAM_EDIT_INTERVAL, clock=perf_counter)
+        async for piece in pipeline.stream_blocking(stream_answer, question, context):
+            if not answer:
+                timings["first_token"] = perf_counter() - generation_started
+            answer += piece
+            editor.touch()
+        await editor.close()
+        timings["generate"] = perf_counter() - generation_started
+        if editor.first_flush_at:
+            timings["first_text"] = editor.first_flush_at - started
+
+        await reply.edit(content=format_answer(answer or "No answer was generated.", sources))
+    except Exception as e:
+        logger.error(f"Error answering question: {str(e)}", exc_info=True)
+        await interaction.followup.send("❌ An error occurred while answering your question.")
+    finally:
+        timings["total"] = perf_counter() - started
+        logger.info("Ask timings: " + ", ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in timings.items()))
+
+@bot.tree.command(name="search", description="Search everything I've indexed by keyword or meaning.")
+@app_commands.describe(query="Words, names or error codes to look for", page="Results page")
+async def search(interaction: discord.Interaction, query: str, page: app_commands.Range[int, 1, 20] = 1):
+    """Hybrid full-text + vector search over the knowledge base."""
+    logger.info(f"Search command invoked by {interaction.user.name} ({interaction.user.id})")
+    await interaction.response.defer()
+    try:
+        hits = await pipeline.run_blocking(
+            hybrid_search, query, search_full_text, query_document, page=page - 1
+        )
+        if not hits:
+            await interaction.followup.send("No results." if page == 1 else "No more results.")
+            return
+
+        embed = discord.Embed(title=f"Results for “{query[:200]}”", color=0x3DFFCE)
+        for i, hit in enumerate(hits, start=(page - 1) * SEARCH_PAGE_SIZE + 1):
+            snippet = (hit.snippet or "No description.")[:300]
+            embed.add_field(name=f"{i}. {hit.url[:240]}", value=snippet, inline=False)
+        embed.set_footer(text=f"Page {page} • use page:{page + 1} for more")
+        await interaction.followup.send(embed=embed)
+    except Exception as e:
+        logger.error(f"Error searching: {str(e)}", exc_info=True)
+        await interaction.followup.send("❌ An error occurred while searching.")
+
 @bot.event
 async def on_message(message: discord.Message):
     if message.author.bot:
@@ -93,38 +335,71 @@ async def on_message(message: discord.Message):
         await message.channel.send("Please provide at least one link or image.")
         return
 
+    # Drop repeats of the same link while keeping the order it was posted in
+    unique_urls = {}
     for url in urls:
-        try:
-            logger.info(f"Processing URL: {url}")
-            scraper_type = detect_scraper_type(url)
-            logger.info(f"Detected scraper type: {scraper_type}")
-            
-            data = scrape(scraper_type, url)
-            logger.info(f"Successfully scraped data from {url}")
-
-            # Persist to DB and send result message
-            persist_result = persist_to_db(data)
-            await message.channel.send(f"Persistence: {persist_result}")
-
-            embed = discord.Embed(
-                title=data.title or f"{scraper_type.capitalize()} content",
-                description=(data.summary if data.summary else (data.content[:1000] + ("..." if data.content and len(data.content) > 1000 else "")) if data.content else "No description."),
-                url=data.url,
-                color=0x3DFFCE
-            )
+        unique_urls.setdefault(canonicalize_url(url), url)
+    urls = list(unique_urls.values())
 
-            embed.set_footer(text=data.metadata.get("source", "Unknown source"))
+    # Placeholders go out before any work starts and are edited as summaries
+    # stream in; one message per batch of embeds instead of two sends per URL
+    started = perf_counter()
+    embeds = [build_progress_embed(url) for url in urls]
+    batches = range(0, len(embeds), MAX_EMBEDS_PER_MESSAGE)
+    replies = [await message.channel.send(embeds=embeds[i:i + MAX_EMBEDS_PER_MESSAGE]) for i in batches]
+    changed = set()
 
-            if scraper_type == "image":
-                embed.set_image(url=data.url)
+    async def refresh():
+        edits = [
+            replies[batch].edit(embeds=embeds[batch * MAX_EMBEDS_PER_MESSAGE:(batch + 1) * MAX_EMBEDS_PER_MESSAGE])
+            for batch in sorted(changed)
+        ]
+        changed.clear()
+        await asyncio.gather(*edits)
 
-            await message.channel.send(embed=embed)
+    editor = Debouncer(refresh, STREAM_EDIT_INTERVAL, clock=perf_counter)
 
-        except Exception as e:
-            logger.error(f"Error processing {url}: {str(e)}", exc_info=True)
-            await message.channel.send(
-                f"❌ Failed to process `{url}`\n```{str(e)}```"
-            )
+    def show(index: int, embed: discord.Embed):
+        embeds[index] = embed
+        changed.add(index // MAX_EMBEDS_PER_MESSAGE)
+        editor.touch()
+
+    def outcome_embed(url: str, future: asyncio.Future) -> discord.Embed:
+        if future.exception() is not None:
+            return build_error_embed(url, future.exception())
+        return build_result_embed(future.result())
+
+    futures = []
+    for i, url in enumerate(urls):
+        future = await workers.submit(
+            url, {
+                "guild_id": message.guild.id if message.guild else None,
+                "channel_id": message.channel.id,
+                "submitter_id": message.author.id,
+            },
+            on_progress=lambda text, i=i, url=url: show(i, build_progress_embed(url, text)),
+        )
+        # Finished URLs are shown right away rather than when the slowest one is done
+        future.add_done_callback(lambda f, i=i, url=url: None if f.cancelled() else show(i, outcome_embed(url, f)))
+        futures.append(future)
+    await asyncio.wait(futures, timeout=JOB_REPLY_TIMEOUT)
+    await editor.close()
+
+    for i, (url, future) in enumerate(zip(urls, futures)):
+        if not future.done():
+            # Still retrying; deliver_job_result posts it when it finishes
+            future.cancel()
+            embeds[i] = build_queued_embed(url)
+        else:
+            if future.exception() is not None:
+                error = future.exception()
+                logger.error(f"Error processing {url}: {str(error)}", exc_info=error)
+            embeds[i] = outcome_embed(url, future)
+
+    changed.update(range(len(replies)))
+    await refresh()
+    first_text = f"{(editor.first_flush_at - started) * 1000:.0f}ms" if editor.first_flush_at else "n/a"
+    logger.info(f"Message timings: urls={len(urls)}, first_text={first_text}, total={(perf_counter() - started) * 1000:.0f}ms")
 
 def run_discord_bot():
     from dotenv import load_dotenv
@@ -135,4 +410,5 @@ def run_discord_bot():
         print("❌ Set DISCORD_TOKEN in your .env")
     else:
         logger.info("Starting Discord bot...")
+        setup_telemetry()
         bot.run(token)
@@ -1,7 +1,14 @@
 # main.py
 
-from discord.discord_bot import run_discord_bot
+from services.topology import Topology, launch
 
 if __name__ == "__main__":
-    print("🚀 Starting Discord bot...")
-    run_discord_bot()
+    topology = Topology.from_env()
+    topology.check()
+    if topology.mode == "single":
+        from discord.discord_bot import run_discord_bot
+        print("🚀 Starting Discord bot...")
+        run_discord_bot()
+    else:
+        print(f"🚀 Starting {topology.gateway_processes} gateway and {topology.ingest_processes} ingest process(es)...")
+        launch(topology)
@@ -1,12 +1,18 @@
 # models/adapter.py
 from abc import ABC, abstractmethod
+from typing import Callable, Optional
 from models.database import ExtractedContent
 
+# Receives the text generated so far while an adapter streams its summary
+ProgressCallback = Callable[[str], None]
+
 class ContentAdapter(ABC):
     @classmethod
     @abstractmethod
-    def extract(cls, input_data: str) -> ExtractedContent:
+    def extract(cls, input_data: str, on_progress: Optional[ProgressCallback] = None) -> ExtractedContent:
         """
         Extract structured content and return it as an ExtractedContent object.
+        When `on_progress` is given, the summary is streamed and reported as
+        it is written.
         """
         pass
@@ -1,6 +1,7 @@
 # models/database.py
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, PrivateAttr
+from datetime import datetime
+from typing import Callable, Optional, List
 
 class ExtractedContent(BaseModel):
     url: str
@@ -10,3 +11,74 @@ class ExtractedContent(BaseModel):
     tags: Optional[List[str]] = []
     media_type: str                # "link", "youtube", "image"
     metadata: dict                 # additional info specific to source
+
+class SaveResult(BaseModel):
+    id: Optional[int]              # scraped_content.id, None if the URL was already stored
+    created: bool                  # False when the URL was already indexed
+
+class ContentBlob(BaseModel):
+    """A page body compressed for content_blobs, keyed by the hash of its text."""
+    hash: str                      # sha256 of the UTF-8 text, hex
+    codec: str                     # "zstd"
+    size: int                      # uncompressed bytes
+    body: bytes
+
+class StoredEntry(BaseModel):
+    """
+    A scraped_content row. When the page was stored compressed only its
+    head is read with the row; `content` fetches and decompresses the full
+    text on first access.
+    """
+    id: int
+    url: str
+    summary: Optional[str]
+    source: Optional[str]
+    metadata: Optional[dict]
+    created_at: datetime
+    guild_id: Optional[int] = None
+    channel_id: Optional[int] = None
+    submitter_id: Optional[int] = None
+    content_head: Optional[str] = None   # the whole content unless content_hash is set
+    content_hash: Optional[str] = None   # key into content_blobs
+    _load_content: Optional[Callable[[str], Optional[str]]] = PrivateAttr(default=None)
+    _content: Optional[str] = PrivateAttr(default=None)
+
+    @property
+    def content(self) -> Optional[str]:
+        if self.content_hash is None:
+            return self.content_head
+        if self._content is None:
+            self._content = self._load_content(self.content_hash)
+        return self._content
+
+class Provenance(BaseModel):
+    """Where a link was posted; all None for rows ingested outside Discord."""
+    guild_id: Optional[int] = None
+    channel_id: Optional[int] = None
+    submitter_id: Optional[int] = None
+
+class EntryCursor(BaseModel):
+    """Keyset position: the (created_at, id) of the last row on a page."""
+    created_at: datetime
+    id: int
+
+    def encode(self) -> str:
+        return f"{self.created_at.isoformat()}|{self.id}"
+
+    @classmethod
+    def decode(cls, value: str) -> "EntryCursor":
+        created_at, _, row_id = value.rpartition("|")
+        return cls(created_at=datetime.fromisoformat(created_at), id=int(row_id))
+
+class RecentEntry(BaseModel):
+    id: int
+    url: str
+    summary: Optional[str]         # falls back to the head of content for images
+    created_at: datetime
+    guild_id: Optional[int] = None
+    channel_id: Optional[int] = None
+    submitter_id: Optional[int] = None
+
+class EntryPage(BaseModel):
+    entries: List[RecentEntry]
+    next_cursor: Optional[EntryCursor] = None   # None on the last page
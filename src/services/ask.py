@@ -0,0 +1,63 @@
+import os
+from typing import Optional
+
+# Chunks retrieved from Chroma per question
+ASK_TOP_K = int(os.getenv("ASK_TOP_K", "8"))
+# Approximate tokens (words) of source material sent to Gemini
+ASK_CONTEXT_TOKENS = int(os.getenv("ASK_CONTEXT_TOKENS", "3000"))
+# Discord's message length limit
+MAX_MESSAGE_CHARS = 2000
+
+
+def group_chunks(results: dict) -> dict[str, list[str]]:
+    """Groups chunk-level Chroma hits by parent URL, best-ranked parent first."""
+    grouped: dict[str, list[str]] = {}
+    ids = results.get("ids", [[]])[0]
+    documents = (results.get("documents") or [[""] * len(ids)])[0]
+    metadatas = (results.get("metadatas") or [[{}] * len(ids)])[0]
+
+    for doc_id, document, metadata in zip(ids, documents, metadatas):
+        metadata = metadata or {}
+        parent = metadata.get("parent_url") or metadata.get("url") or doc_id
+        grouped.setdefault(parent, []).append(document or "")
+    return grouped
+
+
+def build_context(
+    chunks_by_url: dict[str, list[str]],
+    summaries: dict[str, Optional[str]],
+    token_budget: int = ASK_CONTEXT_TOKENS,
+) -> tuple[str, list[str]]:
+    """
+    Builds the numbered source block for the answer prompt.
+
+    Sources are added in rank order until `token_budget` words are used; the
+    last one is truncated to fit. Returns the context and the cited URLs,
+    where URL i is cited as [i + 1].
+    """
+    blocks, sources = [], []
+    remaining = token_budget
+
+    for url, chunks in chunks_by_url.items():
+        if remaining <= 0:
+            break
+        summary = summaries.get(url)
+        text = (f"Summary: {summary}\n" if summary else "") + "Excerpts: " + " ... ".join(chunks)
+        words = text.split()
+        if len(words) > remaining:
+            words = words[:remaining]
+        remaining -= len(words)
+        sources.append(url)
+        blocks.append(f"[{len(sources)}] {url}\n{' '.join(words)}")
+
+    return "\n\n".join(blocks), sources
+
+
+def format_answer(answer: str, sources: list[str], limit: int = MAX_MESSAGE_CHARS) -> str:
+    """Renders the answer with its source list, trimmed to fit one Discord message."""
+    footer = "\n\n**Sources:**\n" + "\n".join(f"[{i}] <{url}>" for i, url in enumerate(sources, start=1))
+    footer = footer[:limit // 2]
+    room = limit - len(footer)
+    if len(answer) > room:
+        answer = answer[:room - 3] + "..."
+    return answer + footer
@@ -1,16 +1,193 @@
-from database.pg_database import get_recent_entries
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
 
-def generate_briefing():
-    """Fetches recent entries and formats them into a briefing."""
-    entries = get_recent_entries(limit=10)
-    if not entries:
-        return "No new knowledge captured in the last 24 hours."
+from pydantic import BaseModel
 
-    briefing = "**Elio's Memo: Daily Briefing**\n\n"
-    briefing += "Here's a summary of what I've learned in the last 24 hours:\n\n"
+from database.pg_database import get_recent_entries_page
+from models.database import EntryCursor, EntryPage, Provenance, RecentEntry
 
-    for entry in entries:
-        url, summary, created_at = entry
-        briefing += f"- **{summary}** ({url})\n"
+logger = logging.getLogger(__name__)
 
-    return briefing
+# Entries shown in the digest
+DIGEST_SIZE = int(os.getenv("DIGEST_SIZE", "10"))
+# Seconds before the digest re-reads Postgres even without local writes, to
+# pick up rows persisted by other processes and let old ones age out
+DIGEST_MAX_AGE = float(os.getenv("DIGEST_MAX_AGE", "300"))
+DIGEST_WINDOW = timedelta(hours=24)
+# Scopes (server, channel) with a digest in memory; the least recently used
+# one is dropped past this and rebuilt if it is asked for again
+DIGEST_MAX_SCOPES = int(os.getenv("DIGEST_MAX_SCOPES", "256"))
+
+BRIEFING_HEADER = (
+    "**Elio's Memo: Daily Briefing**\n\n"
+    "Here's a summary of what I've learned in the last 24 hours:\n\n"
+)
+EMPTY_BRIEFING = "No new knowledge captured in the last 24 hours."
+
+
+class DigestItem(BaseModel):
+    id: int
+    url: str
+    created_at: datetime
+    takeaway: str
+
+
+def load_window(limit: int, guild_id: Optional[int] = None, channel_id: Optional[int] = None) -> EntryPage:
+    """First keyset page of the last 24 hours, optionally for one guild or channel."""
+    return get_recent_entries_page(
+        limit, guild_id=guild_id, channel_id=channel_id,
+        since=datetime.now(timezone.utc) - DIGEST_WINDOW,
+    )
+
+
+def _summarize_takeaways(entries: list[tuple[str, Optional[str]]]) -> list[Optional[str]]:
+    # Imported on first use so the digest can be built without Gemini credentials
+    from services.llm.summarizer import summarize_entry_bullets
+    return summarize_entry_bullets(entries)
+
+
+def fallback_takeaway(summary: Optional[str]) -> str:
+    """First line of a stored summary, without its bullet marker."""
+    for line in (summary or "").splitlines():
+        line = re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line).strip()
+        if line:
+            return line[:300]
+    return "No summary available."
+
+
+class RollingDigest:
+    """
+    The last 24 hours of knowledge, summarized once and shared.
+
+    Each entry's one-sentence takeaway is written once and kept while the
+    entry stays in the window, so a refresh only sends newly persisted
+    entries to Gemini. Persisting an item calls `invalidate()`; the next
+    reader (or the bot's background refresh) folds the new rows in, and
+    concurrent readers wait for that one refresh instead of each calling
+    the LLM. A fresh digest is served straight from memory.
+    """
+
+    def __init__(
+        self,
+        load_fn: Callable[[int], EntryPage] = load_window,
+        summarize_fn: Callable[[list[tuple[str, Optional[str]]]], list[Optional[str]]] = _summarize_takeaways,
+        size: int = DIGEST_SIZE,
+        max_age: float = DIGEST_MAX_AGE,
+        clock: Callable[[], float] = time.monotonic,
+        now: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ):
+        self.load_fn = load_fn
+        self.summarize_fn = summarize_fn
+        self.size = size
+        self.max_age = max_age
+        self.clock = clock
+        self.now = now
+        self._items: list[DigestItem] = []
+        self._next_cursor: Optional[EntryCursor] = None
+        self._version = 0
+        self._built_version = -1
+        self._built_at = float("-inf")
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.summarized = 0
+
+    def invalidate(self):
+        """Marks the digest stale; called whenever a new item is persisted."""
+        self._version += 1
+
+    def is_stale(self) -> bool:
+        return self._built_version != self._version or self.clock() - self._built_at > self.max_age
+
+    def next_cursor(self) -> Optional[EntryCursor]:
+        """Where older entries continue after the digest, or None if it holds them all."""
+        return self._next_cursor
+
+    def get(self) -> list[DigestItem]:
+        """Current digest items, newest first, refreshing first if stale."""
+        if self.is_stale():
+            self.refresh()
+        cutoff = self.now() - DIGEST_WINDOW
+        return [item for item in self._items if item.created_at >= cutoff]
+
+    def refresh(self):
+        with self._lock:
+            # Another thread may have refreshed while this one waited
+            if not self.is_stale():
+                return
+            version = self._version
+            page = self.load_fn(self.size)
+
+            known = {item.url: item.takeaway for item in self._items}
+            new = [(entry.url, entry.summary) for entry in page.entries if entry.url not in known]
+            if new:
+                try:
+                    takeaways = self.summarize_fn(new)
+                except Exception as e:
+                    logger.error(f"Could not summarize {len(new)} digest entries: {e}")
+                    takeaways = [None] * len(new)
+                for (url, summary), takeaway in zip(new, takeaways):
+                    known[url] = takeaway or fallback_takeaway(summary)
+                self.summarized += len(new)
+
+            self._items = [
+                DigestItem(id=entry.id, url=entry.url, created_at=entry.created_at, takeaway=known[entry.url])
+                for entry in page.entries
+            ]
+            self._next_cursor = page.next_cursor
+            self._built_version = version
+            self._built_at = self.clock()
+            self.refreshes += 1
+
+    def render(self, header: str = BRIEFING_HEADER) -> str:
+        items = self.get()
+        if not items:
+            return EMPTY_BRIEFING
+        return header + "".join(f"- **{item.takeaway}** (<{item.url}>)\n" for item in items)
+
+
+def render_entries(entries: list[RecentEntry], header: str) -> str:
+    """Formats entries beyond the digest from their stored summaries, without Gemini."""
+    return header + "".join(f"- **{fallback_takeaway(entry.summary)}** (<{entry.url}>)\n" for entry in entries)
+
+
+# One digest per scope, keyed by (guild_id, channel_id); (None, None) is
+# everything. Shared by /brief, the scheduled briefing and persist_to_db.
+_digests: OrderedDict[tuple[Optional[int], Optional[int]], RollingDigest] = OrderedDict()
+_digests_lock = threading.Lock()
+
+
+def digest_for(guild_id: Optional[int] = None, channel_id: Optional[int] = None) -> RollingDigest:
+    key = (guild_id, channel_id)
+    with _digests_lock:
+        if key not in _digests:
+            _digests[key] = RollingDigest(
+                load_fn=lambda limit: load_window(limit, guild_id=guild_id, channel_id=channel_id)
+            )
+            while len(_digests) > DIGEST_MAX_SCOPES:
+                _digests.popitem(last=False)
+        _digests.move_to_end(key)
+        return _digests[key]
+
+
+def all_digests() -> list[RollingDigest]:
+    with _digests_lock:
+        return list(_digests.values())
+
+
+def invalidate_digests(provenance: Optional[Provenance] = None):
+    """Marks every digest a newly persisted row belongs in as stale."""
+    with _digests_lock:
+        for (guild_id, channel_id), digest in _digests.items():
+            if provenance is None or (guild_id in (None, provenance.guild_id) and channel_id in (None, provenance.channel_id)):
+                digest.invalidate()
+
+
+def generate_briefing(guild_id: Optional[int] = None):
+    """Formats the rolling digest as the daily briefing."""
+    return digest_for(guild_id).render()
@@ -0,0 +1,159 @@
+# services/embed/cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "_data/embedding_cache.sqlite3")
+# Embeddings kept on disk before the least recently used ones are evicted
+# (about 1.5KB each at 384 dimensions)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+# Set to "1" to always run the model
+EMBEDDING_CACHE_DISABLED = os.getenv("EMBEDDING_CACHE_DISABLED", "0") == "1"
+
+# Keys per statement, below SQLite's default limit of 999 variables
+MAX_VARIABLES = 900
+
+
+class EmbeddingCache:
+    """
+    Persistent embeddings keyed by model name and a hash of the text, so a
+    re-ingested page or a repeated question is only embedded once. Vectors
+    are stored as float32 blobs in SQLite, with least-recently-used eviction
+    once `max_entries` is exceeded. Works in batches, as embedding does.
+    """
+
+    def __init__(
+        self,
+        path: str = EMBEDDING_CACHE_PATH,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        digest = hashlib.sha256()
+        for part in (model.encode("utf-8"), text.encode("utf-8")):
+            digest.update(len(part).to_bytes(8, "big"))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def get_many(self, keys: list[str]) -> dict[str, np.ndarray]:
+        """The cached vectors among `keys`; missing keys are simply absent."""
+        found = {}
+        now = self.clock()
+        with self._lock:
+            conn = self._connect()
+            for start in range(0, len(keys), MAX_VARIABLES):
+                chunk = keys[start:start + MAX_VARIABLES]
+                placeholders = ",".join("?" * len(chunk))
+                for key, value in conn.execute(
+                    f"SELECT key, value FROM embedding_cache WHERE key IN ({placeholders})", chunk
+                ):
+                    found[key] = np.frombuffer(value, dtype=np.float32)
+            if found:
+                conn.executemany(
+                    "UPDATE embedding_cache SET accessed_at = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                conn.commit()
+        self.hits += len(found)
+        self.misses += len(set(keys)) - len(found)
+        return found
+
+    def set_many(self, vectors: dict[str, np.ndarray]):
+        if not vectors:
+            return
+        now = self.clock()
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (key, value, accessed_at) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in vectors.items()],
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    """
+                    DELETE FROM embedding_cache WHERE key IN (
+                        SELECT key FROM embedding_cache ORDER BY accessed_at ASC LIMIT ?
+                    )
+                    """,
+                    (count - self.max_entries,),
+                )
+            conn.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embedding_cache_accessed_at ON embedding_cache(accessed_at)"
+            )
+            self._conn.commit()
+        return self._conn
+
+
+class LRUCache:
+    """A small in-memory least-recently-used map, safe to share between threads."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
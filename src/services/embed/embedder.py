@@ -0,0 +1,196 @@
+# services/embed/embedder.py
+
+import logging
+import os
+from typing import Callable, Optional
+
+import numpy as np
+
+from services.embed.cache import EMBEDDING_CACHE_DISABLED, EmbeddingCache, LRUCache
+from utils.registry import services
+from utils.telemetry import stage
+
+logger = logging.getLogger(__name__)
+
+# Name the cached vectors are filed under; change it along with the model,
+# and re-embed the vector store (see database/scripts/migrate_vectors.py)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# Directory holding model.onnx and tokenizer.json. Empty downloads them from
+# EMBEDDING_MODEL_REPO on first use (into the Hugging Face cache).
+EMBEDDING_MODEL_DIR = os.getenv("EMBEDDING_MODEL_DIR", "")
+# Hugging Face repo with an onnx/model.onnx export and its tokenizer.json
+EMBEDDING_MODEL_REPO = os.getenv("EMBEDDING_MODEL_REPO", "sentence-transformers/all-MiniLM-L6-v2")
+# ONNX Runtime threads per inference; the bot runs other work next to it
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "2"))
+# Texts per forward pass
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+# Tokens kept per text; all-MiniLM-L6-v2 was trained with 256
+EMBEDDING_MAX_TOKENS = int(os.getenv("EMBEDDING_MAX_TOKENS", "256"))
+# "mean" over the tokens (sentence-transformers models) or "cls"
+EMBEDDING_POOLING = os.getenv("EMBEDDING_POOLING", "mean")
+# Recent query embeddings kept in memory
+EMBEDDING_QUERY_CACHE_SIZE = int(os.getenv("EMBEDDING_QUERY_CACHE_SIZE", "1024"))
+
+
+class OnnxEmbedder:
+    """
+    A local ONNX sentence-embedding model. Returns unit-length float32 rows.
+
+    Texts are sorted by length and each batch is padded only to its longest
+    text, not to the maximum length, so short queries and titles cost a
+    fraction of a full 256-token pass. Padding is masked out of the pooling,
+    so a batch gives the same vectors as embedding each text on its own.
+    """
+
+    def __init__(self, session, tokenizer, batch_size: int = EMBEDDING_BATCH_SIZE, pooling: str = EMBEDDING_POOLING):
+        if pooling not in ("mean", "cls"):
+            raise ValueError(f"Unknown EMBEDDING_POOLING {pooling!r}; use 'mean' or 'cls'")
+        self.session = session
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.pooling = pooling
+        self._inputs = {model_input.name for model_input in session.get_inputs()}
+
+    @classmethod
+    def load(
+        cls,
+        model_dir: str = EMBEDDING_MODEL_DIR,
+        threads: int = EMBEDDING_THREADS,
+        max_tokens: int = EMBEDDING_MAX_TOKENS,
+        repo: str = EMBEDDING_MODEL_REPO,
+        **kwargs,
+    ) -> "OnnxEmbedder":
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        if model_dir:
+            model_path = os.path.join(model_dir, "model.onnx")
+            tokenizer_path = os.path.join(model_dir, "tokenizer.json")
+        else:
+            from huggingface_hub import hf_hub_download
+            model_path = hf_hub_download(repo, "onnx/model.onnx")
+            tokenizer_path = hf_hub_download(repo, "tokenizer.json")
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.log_severity_level = 3
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session = onnxruntime.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+        tokenizer = Tokenizer.from_file(tokenizer_path)
+        tokenizer.enable_truncation(max_length=max_tokens)
+        # Each batch is padded to its own longest text in _forward()
+        tokenizer.no_padding()
+        logger.info(f"Loaded embedding model {model_path} ({threads} thread(s))")
+        return cls(session, tokenizer, **kwargs)
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """One embedding row per text, in input order."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        encodings = self.tokenizer.encode_batch(list(texts))
+        order = sorted(range(len(texts)), key=lambda i: len(encodings[i].ids))
+        rows: list[Optional[np.ndarray]] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, row in zip(batch, self._forward([encodings[i] for i in batch])):
+                rows[i] = row
+        return np.stack(rows)
+
+    __call__ = embed
+
+    def _forward(self, encodings) -> np.ndarray:
+        length = max(len(encoding.ids) for encoding in encodings)
+        input_ids = np.zeros((len(encodings), length), dtype=np.int64)
+        attention_mask = np.zeros_like(input_ids)
+        token_type_ids = np.zeros_like(input_ids)
+        for row, encoding in enumerate(encodings):
+            size = len(encoding.ids)
+            input_ids[row, :size] = encoding.ids
+            attention_mask[row, :size] = encoding.attention_mask
+            token_type_ids[row, :size] = encoding.type_ids
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask, "token_type_ids": token_type_ids}
+
+        hidden = self.session.run(None, {name: value for name, value in feed.items() if name in self._inputs})[0]
+        if hidden.ndim == 2:
+            # Exported with pooling built in
+            pooled = hidden
+        elif self.pooling == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = attention_mask[:, :, np.newaxis].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        pooled = pooled.astype(np.float32)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+
+class EmbeddingService:
+    """
+    The one way text becomes vectors, for ingestion and retrieval alike.
+
+    `embed` takes a batch, looks every text up in the disk cache by content
+    hash, runs the model once on the texts it hasn't seen (each distinct
+    text once) and stores the results. `embed_queries` puts an in-memory
+    LRU in front of that, so a repeated question costs a dict lookup. The
+    model is only loaded once something misses both caches.
+
+    Stores call the service like any embedding function.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[list[str]], np.ndarray],
+        model: str = EMBEDDING_MODEL,
+        cache: Optional[EmbeddingCache] = None,
+        query_cache_size: int = EMBEDDING_QUERY_CACHE_SIZE,
+    ):
+        self.embed_batch = embed_batch
+        self.model = model
+        self.cache = cache
+        self.query_cache = LRUCache(query_cache_size)
+        self.inferred = 0
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        texts = list(texts)
+        keys = [EmbeddingCache.make_key(self.model, text) for text in texts]
+        found = self.cache.get_many(keys) if self.cache is not None else {}
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            with stage("embed.infer", texts=len(missing)):
+                vectors = np.asarray(self.embed_batch(list(missing.values())), dtype=np.float32)
+            self.inferred += len(missing)
+            computed = dict(zip(missing, vectors))
+            if self.cache is not None:
+                self.cache.set_many(computed)
+            found.update(computed)
+        return np.stack([found[key] for key in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+
+    __call__ = embed
+
+    def embed_queries(self, texts: list[str]) -> np.ndarray:
+        texts = list(texts)
+        rows = [self.query_cache.get(text) for text in texts]
+        missing = [text for text, row in zip(texts, rows) if row is None]
+        if missing:
+            computed = dict(zip(missing, self.embed(missing)))
+            for text, vector in computed.items():
+                self.query_cache.put(text, vector)
+            rows = [computed[text] if row is None else row for text, row in zip(texts, rows)]
+        return np.stack(rows) if rows else np.zeros((0, 0), dtype=np.float32)
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "inferred": self.inferred,
+            "disk": self.cache.stats() if self.cache is not None else None,
+            "queries": {"hits": self.query_cache.hits, "misses": self.query_cache.misses},
+        }
+
+
+def make_embedding_service() -> EmbeddingService:
+    cache = None if EMBEDDING_CACHE_DISABLED else EmbeddingCache()
+    # The "embedder" service is looked up per call, so a fully cached batch
+    # never loads the model
+    return EmbeddingService(lambda texts: services.get("embedder")(texts), cache=cache)
@@ -0,0 +1,336 @@
+# services/ingest/backfill.py
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import AsyncIterator, Callable, Optional, Union
+
+from pydantic import BaseModel
+
+from models.database import ExtractedContent, Provenance
+from services.ingest.job_queue import PERMANENT_ERRORS, retry_delay
+from services.ingest.pipeline import IngestPipeline
+from services.persist.persist_to_db import ALREADY_INDEXED, PERSISTED
+from utils.canonical_url import canonicalize_url
+from utils.extract_urls import extract_urls
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHECKPOINT_PATH = os.getenv("BACKFILL_CHECKPOINT_PATH", "_data/backfill.sqlite3")
+# URLs scraped at the same time
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "8"))
+# Messages read per batch; each batch is persisted in one go and checkpointed
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "200"))
+# Tries per batch write before its URLs are marked failed; permanent errors
+# (see job_queue.PERMANENT_ERRORS) are not retried
+BACKFILL_PERSIST_ATTEMPTS = int(os.getenv("BACKFILL_PERSIST_ATTEMPTS", "3"))
+
+DONE, FAILED = "done", "failed"
+
+
+class HistoryMessage(BaseModel):
+    id: int
+    channel_id: int
+    guild_id: Optional[int] = None
+    author_id: Optional[int] = None
+    content: str
+
+
+# (channel_id, after message id) -> that channel's messages, oldest first
+HistorySource = Callable[[int, Optional[int]], AsyncIterator[HistoryMessage]]
+
+
+class BackfillStats(BaseModel):
+    channels: int = 0
+    messages: int = 0
+    urls_found: int = 0
+    duplicates: int = 0         # seen earlier in this run or in a previous one
+    already_indexed: int = 0    # already in Postgres, not scraped
+    scraped: int = 0
+    persisted: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        elapsed = max(self.elapsed, 1e-9)
+        return (
+            f"{self.messages} messages ({self.messages / elapsed:.1f}/s), "
+            f"{self.urls_found} URLs: {self.scraped} scraped ({self.scraped / elapsed:.2f}/s), "
+            f"{self.persisted} persisted, {self.already_indexed} already indexed, "
+            f"{self.duplicates} duplicates, {self.failed} failed in {self.elapsed:.1f}s"
+        )
+
+
+class BackfillCheckpoint:
+    """
+    Where each channel's backfill got to, and which URLs are finished.
+
+    A channel's cursor only moves past a batch once every URL in it has been
+    persisted or recorded as failed, so a crash re-reads at most one batch;
+    URLs already marked done in that batch are not scraped again.
+    """
+
+    def __init__(self, path: str = BACKFILL_CHECKPOINT_PATH):
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS backfill_channels (
+                channel_id INTEGER PRIMARY KEY,
+                last_message_id INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS backfill_urls (
+                url_key TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                error TEXT,
+                updated_at REAL NOT NULL
+            );
+            """
+        )
+        # The URL as posted, which is what gets scraped again on a retry
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(backfill_urls)")}
+        if "url" not in columns:
+            self._conn.execute("ALTER TABLE backfill_urls ADD COLUMN url TEXT")
+
+    def cursor(self, channel_id: int) -> Optional[int]:
+        """Id of the last message fully processed in the channel, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_message_id FROM backfill_channels WHERE channel_id = ?", (channel_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def advance(self, channel_id: int, message_id: int):
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO backfill_channels (channel_id, last_message_id, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT (channel_id) DO UPDATE SET
+                    last_message_id = MAX(last_message_id, excluded.last_message_id),
+                    updated_at = excluded.updated_at
+                """,
+                (channel_id, message_id, time.time()),
+            )
+
+    def finished(self, keys: list[str]) -> set[str]:
+        """Which of the canonical URLs are already done."""
+        if not keys:
+            return set()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT url_key FROM backfill_urls WHERE status = ? AND url_key IN ({','.join('?' * len(keys))})",
+                (DONE, *keys),
+            ).fetchall()
+        return {key for (key,) in rows}
+
+    def mark(self, urls: dict[str, str], status: str, error: Optional[str] = None):
+        """Records the status of canonical URL -> posted URL pairs."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO backfill_urls (url_key, url, status, error, updated_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (url_key) DO UPDATE SET
+                    url = excluded.url, status = excluded.status, error = excluded.error,
+                    updated_at = excluded.updated_at
+                """,
+                [(key, url, status, error, now) for key, url in urls.items()],
+            )
+
+    def failed(self) -> dict[str, str]:
+        """Canonical URL -> posted URL of every failed URL."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url_key, COALESCE(url, url_key) FROM backfill_urls WHERE status = ?", (FAILED,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class Backfiller:
+    """
+    Ingests the links in existing channel history.
+
+    Messages are read oldest first in batches. Each batch's URLs are
+    canonicalized and deduplicated, checked against Postgres in one query,
+    scraped by up to `workers` pool threads at once, then written with a
+    single `persist_many_fn` call (execute_values + one Chroma enqueue)
+    before the channel's checkpoint moves past the batch. A batch write that
+    fails transiently is retried; its URLs are only marked failed, with the
+    error, once that gives up.
+    """
+
+    def __init__(
+        self,
+        pipeline: IngestPipeline,
+        persist_many_fn: Callable[
+            [list[tuple[ExtractedContent, Optional[Provenance]]]], list[Union[str, Exception]]
+        ],
+        checkpoint: BackfillCheckpoint,
+        known_fn: Optional[Callable[[list[str]], set[str]]] = None,
+        workers: int = BACKFILL_WORKERS,
+        batch_size: int = BACKFILL_BATCH_SIZE,
+        persist_attempts: int = BACKFILL_PERSIST_ATTEMPTS,
+        delay_fn: Callable[[int], float] = retry_delay,
+        clock: Callable[[], float] = time.monotonic,
+        on_batch: Optional[Callable[[BackfillStats], None]] = None,
+    ):
+        self.pipeline = pipeline
+        self.persist_many_fn = persist_many_fn
+        self.checkpoint = checkpoint
+        self.known_fn = known_fn
+        self.workers = workers
+        self.batch_size = batch_size
+        self.persist_attempts = persist_attempts
+        self.delay_fn = delay_fn
+        self.clock = clock
+        self.on_batch = on_batch
+        self.stats = BackfillStats()
+        self._seen: set[str] = set()
+        self._started: Optional[float] = None
+
+    async def run(self, source: HistorySource, channel_ids: list[int]) -> BackfillStats:
+        self._started = self.clock()
+        for channel_id in channel_ids:
+            await self.backfill_channel(source, channel_id)
+        return self.stats
+
+    async def backfill_channel(self, source: HistorySource, channel_id: int):
+        after = self.checkpoint.cursor(channel_id)
+        if self._started is None:
+            self._started = self.clock()
+        logger.info(f"Backfilling channel {channel_id} after message {after}")
+
+        batch: list[HistoryMessage] = []
+        async for message in source(channel_id, after):
+            batch.append(message)
+            if len(batch) >= self.batch_size:
+                await self._process_batch(channel_id, batch)
+                batch = []
+        if batch:
+            await self._process_batch(channel_id, batch)
+        self.stats.channels += 1
+
+    async def retry_failed(self) -> BackfillStats:
+        """Scrapes the URLs earlier runs gave up on once more, without provenance."""
+        if self._started is None:
+            self._started = self.clock()
+        failed = list(self.checkpoint.failed().items())
+        for start in range(0, len(failed), self.batch_size):
+            await self._ingest({key: (url, None) for key, url in failed[start:start + self.batch_size]})
+        return self.stats
+
+    async def _process_batch(self, channel_id: int, messages: list[HistoryMessage]):
+        # Canonical URL -> (URL as posted, provenance); the canonical form is
+        # only used to dedupe and checkpoint, see IngestPipeline._ingest
+        pending: dict[str, tuple[str, Optional[Provenance]]] = {}
+        for message in messages:
+            for url in extract_urls(message.content):
+                self.stats.urls_found += 1
+                key = canonicalize_url(url)
+                if key in self._seen or key in pending:
+                    self.stats.duplicates += 1
+                    continue
+                pending[key] = (url, Provenance(
+                    guild_id=message.guild_id, channel_id=message.channel_id, submitter_id=message.author_id
+                ))
+
+        finished = await self.pipeline.run_blocking(self.checkpoint.finished, list(pending))
+        self.stats.duplicates += len(finished)
+        self._seen.update(pending)
+        await self._ingest({key: item for key, item in pending.items() if key not in finished})
+
+        await self.pipeline.run_blocking(self.checkpoint.advance, channel_id, messages[-1].id)
+        self.stats.messages += len(messages)
+        self._report()
+
+    async def _ingest(self, pending: dict[str, tuple[str, Optional[Provenance]]]):
+        if not pending:
+            return
+        if self.known_fn is not None:
+            known = await self.pipeline.run_blocking(self.known_fn, list(pending))
+            if known:
+                self.stats.already_indexed += len(known)
+                await self.pipeline.run_blocking(self.checkpoint.mark, {key: pending[key][0] for key in known}, DONE)
+                pending = {key: item for key, item in pending.items() if key not in known}
+
+        limit = asyncio.Semaphore(self.workers)
+
+        async def scrape(key: str) -> ExtractedContent:
+            url = pending[key][0]
+            async with limit:
+                data = await self.pipeline.run_blocking(self.pipeline.scrape_fn, self.pipeline.detect_fn(url), url)
+            # Stored under the key, like IngestPipeline does
+            return data.model_copy(update={"url": key}) if data.url == url else data
+
+        keys = list(pending)
+        outcomes = await asyncio.gather(*(scrape(key) for key in keys), return_exceptions=True)
+
+        scraped: list[tuple[str, ExtractedContent]] = []
+        for key, outcome in zip(keys, outcomes):
+            if isinstance(outcome, BaseException) and not isinstance(outcome, Exception):
+                raise outcome
+            if isinstance(outcome, Exception):
+                logger.warning(f"Backfill could not scrape {key}: {outcome}")
+                self.stats.failed += 1
+                await self.pipeline.run_blocking(self.checkpoint.mark, {key: pending[key][0]}, FAILED, str(outcome))
+            else:
+                scraped.append((key, outcome))
+        self.stats.scraped += len(scraped)
+        if not scraped:
+            return
+
+        try:
+            results = await self._persist([(data, pending[key][1]) for key, data in scraped])
+        except Exception as e:
+            self.stats.failed += len(scraped)
+            await self.pipeline.run_blocking(
+                self.checkpoint.mark, {key: pending[key][0] for key, _ in scraped}, FAILED, f"persist failed: {e}"
+            )
+            return
+
+        done: list[str] = []
+        for (key, _), result in zip(scraped, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Backfill could not persist {key}: {result}")
+                self.stats.failed += 1
+                await self.pipeline.run_blocking(self.checkpoint.mark, {key: pending[key][0]}, FAILED, str(result))
+                continue
+            done.append(key)
+            if result == ALREADY_INDEXED:
+                self.stats.already_indexed += 1
+            elif result == PERSISTED:
+                self.stats.persisted += 1
+        await self.pipeline.run_blocking(self.checkpoint.mark, {key: pending[key][0] for key in done}, DONE)
+
+    async def _persist(self, items: list[tuple[ExtractedContent, Optional[Provenance]]]) -> list[Union[str, Exception]]:
+        """Writes a batch, retrying transient errors such as a dropped database connection."""
+        attempt = 1
+        while True:
+            try:
+                return await self.pipeline.run_blocking(self.persist_many_fn, items)
+            except Exception as e:
+                if isinstance(e, PERMANENT_ERRORS) or attempt >= self.persist_attempts:
+                    logger.error(f"Backfill could not persist a batch of {len(items)} URL(s): {e!r}")
+                    raise
+                delay = self.delay_fn(attempt)
+                logger.warning(f"Backfill batch write failed (attempt {attempt}), retrying in {delay:.0f}s: {e!r}")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def _report(self):
+        self.stats.elapsed = self.clock() - self._started
+        logger.info(f"Backfill progress: {self.stats.summary()}")
+        if self.on_batch is not None:
+            self.on_batch(self.stats)
@@ -0,0 +1,62 @@
+# services/ingest/dedup.py
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from models.database import ExtractedContent
+
+# Canonical URLs remembered in memory before falling back to Postgres
+KNOWN_URL_CACHE_SIZE = int(os.getenv("KNOWN_URL_CACHE_SIZE", "10000"))
+# Content kept per cached entry; only needed to render the reply embed
+PREVIEW_CHARS = 1000
+
+
+class KnownUrlCache:
+    """
+    Answers "is this canonical URL already indexed?" before any scraping.
+
+    Hits are served from an in-memory LRU; misses fall through to `lookup_fn`,
+    which queries the `scraped_content.url` unique index. Only positive answers
+    are cached, since a URL that is new now will be indexed a moment later.
+    """
+
+    def __init__(
+        self,
+        lookup_fn: Callable[[str], Optional[ExtractedContent]],
+        capacity: int = KNOWN_URL_CACHE_SIZE,
+    ):
+        self.lookup_fn = lookup_fn
+        self.capacity = capacity
+        self._entries: OrderedDict[str, ExtractedContent] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def get(self, url: str) -> Optional[ExtractedContent]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+                self.hits += 1
+                return entry
+
+        entry = self.lookup_fn(url)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.db_hits += 1
+        self.remember(url, entry)
+        return entry
+
+    def remember(self, url: str, content: ExtractedContent):
+        if content.content and len(content.content) > PREVIEW_CHARS:
+            content = content.model_copy(update={"content": content.content[:PREVIEW_CHARS] + "..."})
+        with self._lock:
+            self._entries[url] = content
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
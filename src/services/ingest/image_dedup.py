@@ -0,0 +1,124 @@
+# services/ingest/image_dedup.py
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from pydantic import BaseModel
+
+from utils.image_hash import MultiIndexHash
+
+logger = logging.getLogger(__name__)
+
+IMAGE_HASH_PATH = os.getenv("IMAGE_HASH_PATH", "_data/image_hashes.sqlite3")
+# Differing dHash bits still treated as the same image. Re-encoded or
+# rescaled copies usually land within 0-3 bits; unrelated images around 32.
+IMAGE_HASH_MAX_DISTANCE = int(os.getenv("IMAGE_HASH_MAX_DISTANCE", "6"))
+
+
+class ImageMatch(BaseModel):
+    url: str
+    description: str
+    distance: int
+
+
+def _to_signed(value: int) -> int:
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class ImageHashIndex:
+    """
+    Remembers the description of every image sent to Gemini, keyed by its
+    perceptual hash, so the same screenshot cross-posted under another CDN
+    URL is recognised and described only once.
+
+    Hashes and descriptions live in SQLite; a multi-index hash table over
+    all of them is loaded on first use and kept in memory for lookups.
+    """
+
+    def __init__(self, path: str = IMAGE_HASH_PATH, max_distance: int = IMAGE_HASH_MAX_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self._index: Optional[MultiIndexHash] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def find(self, image_hash: int) -> Optional[ImageMatch]:
+        """Returns the stored description of the closest near-duplicate, if any."""
+        with self._lock:
+            match = self._load().nearest(image_hash)
+            if match is None:
+                self.misses += 1
+                return None
+            stored_hash, distance = match
+            row = self._conn.execute(
+                "SELECT url, description FROM image_hashes WHERE hash = ?", (_to_signed(stored_hash),)
+            ).fetchone()
+            self.hits += 1
+        return ImageMatch(url=row[0], description=row[1], distance=distance)
+
+    def add(self, image_hash: int, url: str, description: str):
+        with self._lock:
+            index = self._load()
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO image_hashes (hash, url, description, created_at) VALUES (?, ?, ?, ?)",
+                (_to_signed(image_hash), url, description, time.time()),
+            )
+            self._conn.commit()
+            if cursor.rowcount:
+                index.add(image_hash)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "images": len(self._index) if self._index is not None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._index = None
+
+    def _load(self) -> MultiIndexHash:
+        if self._index is not None:
+            return self._index
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS image_hashes (
+                hash INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                description TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+        start = time.perf_counter()
+        index = MultiIndexHash(max_distance=self.max_distance)
+        for (value,) in self._conn.execute("SELECT hash FROM image_hashes"):
+            index.add(_to_unsigned(value))
+        logger.info(f"Loaded {len(index)} image hash(es) in {time.perf_counter() - start:.2f}s")
+        self._index = index
+        return index
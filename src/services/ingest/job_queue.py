@@ -0,0 +1,539 @@
+# services/ingest/job_queue.py
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+import backoff
+from pydantic import BaseModel
+
+from models.database import Provenance
+from services.ingest.dedup import PREVIEW_CHARS
+from services.ingest.pipeline import IngestResult
+from utils.canonical_url import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "_data/ingest_jobs.sqlite3")
+# Attempts before a job is dead-lettered
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "6"))
+# Exponential backoff between attempts: initial delay and cap, in seconds
+JOB_BACKOFF_INITIAL = float(os.getenv("JOB_BACKOFF_INITIAL", "5"))
+JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", "600"))
+# Seconds a claimed job stays reserved; running jobs renew it every third of
+# that, so only a crashed worker's jobs are picked up again once it runs out
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+# Worker coroutines pulling from the queue
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Seconds an idle worker waits before polling for due retries
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+
+PENDING, RUNNING, DONE, DEAD = "pending", "running", "done", "dead"
+
+# Errors that retrying can't fix: bad input or a bug
+PERMANENT_ERRORS = (ValueError, TypeError, KeyError)
+
+
+class Job(BaseModel):
+    id: int
+    job_key: str
+    url: str
+    payload: dict
+    status: str
+    attempts: int
+    last_error: Optional[str] = None
+    result: Optional[IngestResult] = None
+    lease_owner: Optional[str] = None   # token of the claim holding the job
+
+
+class JobFailed(RuntimeError):
+    """A dead-lettered job, as seen by a process other than the one that ran it."""
+
+
+def retry_delay(attempt: int) -> float:
+    """Seconds to wait before retry number `attempt` (1-based), with jitter."""
+    delays = backoff.expo(factor=JOB_BACKOFF_INITIAL, max_value=JOB_BACKOFF_MAX)
+    next(delays)  # prime the generator
+    delay = JOB_BACKOFF_INITIAL
+    for _ in range(attempt):
+        delay = next(delays)
+    return delay / 2 + backoff.full_jitter(delay / 2)
+
+
+class JobQueue:
+    """
+    Durable scrape → summarize → persist queue in SQLite.
+
+    Jobs are keyed by canonical URL, so re-posting a link while it is queued
+    or running joins the existing job instead of adding another. Finished and
+    dead-lettered jobs are re-armed when the link is posted again. Claims are
+    leases: work held by a process that died becomes claimable again once the
+    lease expires, so a restart resumes everything that was in flight. Each
+    claim gets its own token, and only its holder can renew, complete or fail
+    the job. Reclaiming an expired lease counts as an attempt, so a job that
+    keeps crashing its worker is dead-lettered too.
+    """
+
+    def __init__(
+        self,
+        path: str = JOB_QUEUE_PATH,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        delay_fn: Callable[[int], float] = retry_delay,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.delay_fn = delay_fn
+        self.clock = clock
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS ingest_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_key TEXT UNIQUE NOT NULL,
+                url TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_run_at REAL NOT NULL,
+                lease_until REAL,
+                lease_owner TEXT,
+                last_error TEXT,
+                result TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_ingest_jobs_due ON ingest_jobs(status, next_run_at);
+            """
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(ingest_jobs)")}
+        for column in ("result", "lease_owner"):
+            if column not in columns:
+                try:
+                    self._conn.execute(f"ALTER TABLE ingest_jobs ADD COLUMN {column} TEXT")
+                except sqlite3.OperationalError:
+                    pass  # another process added it first
+
+    def enqueue(self, url: str, payload: Optional[dict] = None) -> Job:
+        """Adds a job for `url`, or returns the active job already queued for it."""
+        key = canonicalize_url(url)
+        now = self.clock()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO ingest_jobs (job_key, url, payload, status, next_run_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (job_key) DO UPDATE SET
+                    url = excluded.url, payload = excluded.payload, status = excluded.status,
+                    attempts = 0, next_run_at = excluded.next_run_at, last_error = NULL,
+                    result = NULL, updated_at = excluded.updated_at
+                WHERE ingest_jobs.status IN (?, ?)
+                """,
+                (key, url, json.dumps(payload or {}), PENDING, now, now, now, DONE, DEAD),
+            )
+            row = self._conn.execute("SELECT * FROM ingest_jobs WHERE job_key = ?", (key,)).fetchone()
+        return self._to_job(row)
+
+    def claim(self) -> Optional[Job]:
+        """
+        Leases the next due job, including ones whose previous lease expired.
+        Those are charged an attempt, and dead-lettered when out of attempts.
+        """
+        now = self.clock()
+        owner = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = self._conn.execute(
+                        """
+                        SELECT * FROM ingest_jobs
+                        WHERE (status = ? AND next_run_at <= ?) OR (status = ? AND lease_until <= ?)
+                        ORDER BY next_run_at, id
+                        LIMIT 1
+                        """,
+                        (PENDING, now, RUNNING, now),
+                    ).fetchone()
+                    if row is None:
+                        self._conn.execute("COMMIT")
+                        return None
+                    attempts = row["attempts"]
+                    if row["status"] == RUNNING:
+                        # The worker holding it died or hung mid-job
+                        attempts += 1
+                        if attempts >= self.max_attempts:
+                            self._conn.execute(
+                                """
+                                UPDATE ingest_jobs
+                                SET status = ?, attempts = ?, lease_until = NULL, lease_owner = NULL,
+                                    last_error = ?, updated_at = ?
+                                WHERE id = ?
+                                """,
+                                (DEAD, attempts, "Lease expired before the job finished", now, row["id"]),
+                            )
+                            logger.error(f"Job {row['id']} for {row['url']} dead-lettered after {attempts} lost lease(s)")
+                            continue
+                    self._conn.execute(
+                        """
+                        UPDATE ingest_jobs SET status = ?, attempts = ?, lease_until = ?, lease_owner = ?, updated_at = ?
+                        WHERE id = ?
+                        """,
+                        (RUNNING, attempts, now + self.lease_seconds, owner, now, row["id"]),
+                    )
+                    self._conn.execute("COMMIT")
+                    break
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        job = self._to_job(row)
+        job.status, job.attempts, job.lease_owner = RUNNING, attempts, owner
+        return job
+
+    def extend_lease(self, job: Job) -> bool:
+        """Renews the lease on a running job. False if the claim was lost to another worker."""
+        now = self.clock()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE ingest_jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                (now + self.lease_seconds, now, job.id, RUNNING, job.lease_owner),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job: Job, result: Optional[IngestResult] = None) -> bool:
+        """
+        Marks a job done, keeping a preview of its result for other processes.
+        False, and nothing changes, if the claim was lost to another worker.
+        """
+        now = self.clock()
+        stored = None
+        if result is not None:
+            data = result.data
+            if data.content and len(data.content) > PREVIEW_CHARS:
+                data = data.model_copy(update={"content": data.content[:PREVIEW_CHARS] + "..."})
+            stored = result.model_copy(update={"data": data}).model_dump_json()
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                UPDATE ingest_jobs
+                SET status = ?, lease_until = NULL, lease_owner = NULL, last_error = NULL, result = ?, updated_at = ?
+                WHERE id = ? AND status = ? AND lease_owner = ?
+                """,
+                (DONE, stored, now, job.id, RUNNING, job.lease_owner),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job: Job, error: str, permanent: bool = False) -> Optional[Job]:
+        """
+        Schedules a retry with backoff, or dead-letters the job when out of
+        attempts. None, and nothing changes, if the claim was lost to another worker.
+        """
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts FROM ingest_jobs WHERE id = ? AND status = ? AND lease_owner = ?",
+                (job.id, RUNNING, job.lease_owner),
+            ).fetchone()
+            if row is None:
+                return None
+            attempts = row["attempts"] + 1
+            if permanent or attempts >= self.max_attempts:
+                status, next_run_at = DEAD, now
+            else:
+                status, next_run_at = PENDING, now + self.delay_fn(attempts)
+            self._conn.execute(
+                """
+                UPDATE ingest_jobs
+                SET status = ?, attempts = ?, next_run_at = ?, lease_until = NULL, lease_owner = NULL,
+                    last_error = ?, updated_at = ?
+                WHERE id = ? AND lease_owner = ?
+                """,
+                (status, attempts, next_run_at, error[:2000], now, job.id, job.lease_owner),
+            )
+            row = self._conn.execute("SELECT * FROM ingest_jobs WHERE id = ?", (job.id,)).fetchone()
+        return self._to_job(row)
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM ingest_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def get_many(self, job_ids: list[int]) -> list[Job]:
+        if not job_ids:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM ingest_jobs WHERE id IN ({','.join('?' * len(job_ids))})", job_ids
+            ).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM ingest_jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the next pending job is due, or None when nothing is pending."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_run_at) FROM ingest_jobs WHERE status = ?", (PENDING,)
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(row[0] - self.clock(), 0.0)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_job(row) -> Job:
+        return Job(
+            id=row["id"],
+            job_key=row["job_key"],
+            url=row["url"],
+            payload=json.loads(row["payload"]),
+            status=row["status"],
+            attempts=row["attempts"],
+            last_error=row["last_error"],
+            result=IngestResult.model_validate_json(row["result"]) if row["result"] else None,
+            lease_owner=row["lease_owner"],
+        )
+
+
+class JobWorkers:
+    """
+    Worker coroutines that drain a JobQueue through an IngestPipeline.
+
+    `submit` enqueues a URL and returns a future that resolves with the
+    IngestResult once the job is done, or with the last error once it is
+    dead-lettered, and can register a callback for the summary as it is
+    streamed. Jobs with no waiter in this process, e.g. ones resumed after a
+    restart, are reported through `on_finished` instead.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        pipeline,
+        on_finished: Optional[Callable[[Job, object], Awaitable[None]]] = None,
+        workers: int = JOB_WORKERS,
+        poll_interval: float = JOB_POLL_INTERVAL,
+    ):
+        self.queue = queue
+        self.pipeline = pipeline
+        self.on_finished = on_finished
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._waiters: dict[str, list[asyncio.Future]] = {}
+        self._listeners: dict[str, list[Callable[[str], None]]] = {}
+        self._wake = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work(i)) for i in range(self.workers)]
+            logger.info(f"Started {self.workers} ingestion worker(s); queue: {self.queue.counts()}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(
+        self,
+        url: str,
+        payload: Optional[dict] = None,
+        on_progress: Optional[Callable[[str], None]] = None,
+    ) -> asyncio.Future:
+        """
+        Enqueues `url` and returns a future for its outcome. Cancelling the
+        future hands the eventual result over to `on_finished`.
+        `on_progress` is called on the event loop with the partial summary.
+        """
+        future = asyncio.get_running_loop().create_future()
+        key = canonicalize_url(url)
+        # Register before enqueueing so a fast worker can't finish first
+        self._waiters.setdefault(key, []).append(future)
+        if on_progress is not None:
+            self._listeners.setdefault(key, []).append(on_progress)
+        await self.pipeline.run_blocking(self.queue.enqueue, url, payload)
+        self._wake.set()
+        return future
+
+    async def _work(self, index: int):
+        while True:
+            job = await self.pipeline.run_blocking(self.queue.claim)
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            on_progress = None
+            if job.job_key in self._listeners:
+                on_progress = self._progress_reporter(job.job_key)
+            heartbeat = asyncio.create_task(self._keep_leased(job))
+            try:
+                # The payload carries guild/channel/submitter ids when posted from Discord
+                result = await self.pipeline.ingest(
+                    job.url, on_progress=on_progress, provenance=Provenance.model_validate(job.payload)
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Scrape and persist failures alike: persist_to_db raises
+                # rather than returning an error, so nothing unsaved is DONE
+                permanent = isinstance(e, PERMANENT_ERRORS)
+                failed = await self.pipeline.run_blocking(self.queue.fail, job, str(e), permanent)
+                if failed is None:
+                    logger.warning(f"Job {job.id} for {job.url} failed after its lease was lost: {e}")
+                    continue
+                job = failed
+                if job.status == DEAD:
+                    logger.error(f"Job {job.id} for {job.url} dead-lettered after {job.attempts} attempt(s): {e}")
+                    await self._finish(job, e)
+                else:
+                    logger.warning(f"Job {job.id} for {job.url} failed (attempt {job.attempts}), will retry: {e}")
+                continue
+            finally:
+                heartbeat.cancel()
+
+            if not await self.pipeline.run_blocking(self.queue.complete, job, result):
+                # Whoever reclaimed it reports the outcome
+                logger.warning(f"Job {job.id} for {job.url} finished after its lease was lost")
+                continue
+            job.status = DONE
+            await self._finish(job, result)
+
+    async def _keep_leased(self, job: Job):
+        """Renews `job`'s lease while it runs, so a long scrape isn't reclaimed and run twice."""
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                if not await self.pipeline.run_blocking(self.queue.extend_lease, job):
+                    logger.warning(f"Lost the lease on job {job.id} for {job.url}")
+                    return
+            except Exception as e:
+                logger.warning(f"Could not renew the lease on job {job.id}: {e}")
+
+    def _progress_reporter(self, key: str) -> Callable[[str], None]:
+        """Returns a thread-safe callback that relays progress to the listeners of `key`."""
+        loop = asyncio.get_running_loop()
+
+        def relay(text: str):
+            for listener in self._listeners.get(key, []):
+                try:
+                    listener(text)
+                except Exception as e:
+                    logger.warning(f"Progress listener failed for {key}: {e}")
+
+        return lambda text: loop.call_soon_threadsafe(relay, text)
+
+    async def _finish(self, job: Job, outcome):
+        self._listeners.pop(job.job_key, None)
+        waiters = [f for f in self._waiters.pop(job.job_key, []) if not f.done()]
+        for future in waiters:
+            if isinstance(outcome, BaseException):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+        if not waiters and self.on_finished is not None:
+            try:
+                await self.on_finished(job, outcome)
+            except Exception as e:
+                logger.error(f"on_finished failed for job {job.id}: {e}", exc_info=True)
+
+
+class JobWatcher:
+    """
+    Gateway side of a split deployment, with the same interface as JobWorkers.
+
+    `submit` only enqueues; ingest processes run the job, and the outcome is
+    picked up by polling the shared queue. Streaming progress doesn't cross
+    processes, so `on_progress` is accepted and ignored. Jobs submitted here
+    whose waiter gave up are reported through `on_finished` when they end.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        pipeline,
+        on_finished: Optional[Callable[[Job, object], Awaitable[None]]] = None,
+        poll_interval: float = JOB_POLL_INTERVAL,
+    ):
+        self.queue = queue
+        self.pipeline = pipeline
+        self.on_finished = on_finished
+        self.poll_interval = poll_interval
+        self._waiters: dict[int, list[asyncio.Future]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+            logger.info(f"Watching the job queue for ingest processes; queue: {self.queue.counts()}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def submit(
+        self,
+        url: str,
+        payload: Optional[dict] = None,
+        on_progress: Optional[Callable[[str], None]] = None,
+    ) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        job = await self.pipeline.run_blocking(self.queue.enqueue, url, payload)
+        self._waiters.setdefault(job.id, []).append(future)
+        return future
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not self._waiters:
+                continue
+            try:
+                jobs = await self.pipeline.run_blocking(self.queue.get_many, list(self._waiters))
+            except Exception as e:
+                logger.error(f"Could not poll the job queue: {e}")
+                continue
+            for job in jobs:
+                if job.status == DONE and job.result is not None:
+                    await self._finish(job, job.result)
+                elif job.status == DONE:
+                    await self._finish(job, JobFailed("Finished, but no result was recorded"))
+                elif job.status == DEAD:
+                    await self._finish(job, JobFailed(job.last_error or "Job failed"))
+
+    async def _finish(self, job: Job, outcome):
+        waiters = [f for f in self._waiters.pop(job.id, []) if not f.done()]
+        for future in waiters:
+            if isinstance(outcome, BaseException):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+        if not waiters and self.on_finished is not None:
+            try:
+                await self.on_finished(job, outcome)
+            except Exception as e:
+                logger.error(f"on_finished failed for job {job.id}: {e}", exc_info=True)
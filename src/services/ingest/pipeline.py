@@ -0,0 +1,163 @@
+# services/ingest/pipeline.py
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterable, Optional
+
+from pydantic import BaseModel
+
+from models.database import ExtractedContent, Provenance
+from services.ingest.dedup import KnownUrlCache
+from utils.canonical_url import canonicalize_url
+from utils.telemetry import stage
+
+logger = logging.getLogger(__name__)
+
+# Threads available for blocking adapter / persistence calls.
+MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "8"))
+# URLs allowed through scrape → persist at the same time in this process.
+MAX_CONCURRENCY = int(os.getenv("INGEST_MAX_CONCURRENCY", "4"))
+
+
+class IngestResult(BaseModel):
+    url: str
+    scraper_type: str
+    data: ExtractedContent
+    persist_result: Optional[str] = None
+    already_indexed: bool = False       # short-circuited before scraping
+
+
+class IngestPipeline:
+    """
+    Runs the detect → scrape → persist chain without blocking the event loop.
+
+    Firecrawl, requests, Gemini, psycopg2 and ChromaDB are all synchronous, so
+    every adapter and persistence call is pushed onto a bounded thread pool and
+    the number of URLs in flight is capped by a per-process semaphore.
+    """
+
+    def __init__(
+        self,
+        scrape_fn: Callable,
+        persist_fn: Callable,
+        detect_fn: Callable[[str], str],
+        known_urls: Optional[KnownUrlCache] = None,
+        max_workers: int = MAX_WORKERS,
+        max_concurrency: int = MAX_CONCURRENCY,
+    ):
+        self.scrape_fn = scrape_fn
+        self.persist_fn = persist_fn
+        self.detect_fn = detect_fn
+        self.known_urls = known_urls
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_blocking(self, fn: Callable, *args, **kwargs):
+        """Runs a blocking callable on the ingestion thread pool."""
+        loop = asyncio.get_running_loop()
+        # Carry the current span over so work on the pool nests under it
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, context.run, functools.partial(fn, *args, **kwargs))
+
+    async def stream_blocking(self, fn: Callable[..., Iterable], *args, **kwargs) -> AsyncIterator:
+        """
+        Consumes a blocking iterator (e.g. a streaming Gemini response) on the
+        thread pool and yields its items on the event loop as they arrive.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for item in fn(*args, **kwargs):
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+            except BaseException as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        producer = loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            await producer
+
+    async def ingest(
+        self,
+        url: str,
+        on_progress: Optional[Callable[[str], None]] = None,
+        provenance: Optional[Provenance] = None,
+    ) -> IngestResult:
+        """
+        Scrapes and persists a single URL. Exceptions propagate to the caller.
+
+        `on_progress` is handed to the scraper, which calls it from a pool
+        thread with the summary written so far. `provenance` records where
+        the link was posted and is stored with the row.
+        """
+        key = canonicalize_url(url)
+        with stage("ingest", url=key):
+            return await self._ingest(url, key, on_progress, provenance)
+
+    async def _ingest(
+        self,
+        url: str,
+        key: str,
+        on_progress: Optional[Callable[[str], None]],
+        provenance: Optional[Provenance],
+    ) -> IngestResult:
+        with stage("detect"):
+            scraper_type = self.detect_fn(key)
+
+        if self.known_urls is not None:
+            known = await self.run_blocking(self.known_urls.get, key)
+            if known is not None:
+                logger.info(f"Already indexed, skipping scrape: {key}")
+                return IngestResult(url=url, scraper_type=scraper_type, data=known, already_indexed=True)
+
+        async with self.semaphore:
+            logger.info(f"Processing URL: {key}")
+            logger.info(f"Detected scraper type: {scraper_type}")
+
+            # The canonical form is only a dedup key: it drops tracking
+            # parameters and re-encodes the query, so fetch what was posted
+            with stage("scrape", scraper_type=scraper_type):
+                if on_progress is None:
+                    data = await self.run_blocking(self.scrape_fn, scraper_type, url)
+                else:
+                    data = await self.run_blocking(self.scrape_fn, scraper_type, url, on_progress=on_progress)
+            logger.info(f"Successfully scraped data from {url}")
+            if data.url == url:
+                # Stored under the key, so a re-post in another form is found
+                data = data.model_copy(update={"url": key})
+
+            # Raises on failure, so only stored URLs are remembered below
+            with stage("persist"):
+                if provenance is None:
+                    persist_result = await self.run_blocking(self.persist_fn, data)
+                else:
+                    persist_result = await self.run_blocking(self.persist_fn, data, provenance=provenance)
+
+            if self.known_urls is not None:
+                self.known_urls.remember(key, data)
+
+            return IngestResult(
+                url=url,
+                scraper_type=scraper_type,
+                data=data,
+                persist_result=persist_result,
+            )
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,64 @@
+# services/ingest/worker_process.py
+
+import asyncio
+import logging
+import signal
+
+from database.vector_db import flush_documents
+from database.pg_database import close_pool, warm_up_pool
+from services.ingest.dedup import KnownUrlCache
+from services.ingest.job_queue import JobQueue, JobWorkers
+from services.ingest.pipeline import IngestPipeline
+from services.persist.persist_to_db import find_indexed, persist_to_db
+from services.scrape.scrape_links import scrape
+from utils.detect_link_type import detect_scraper_type
+from utils.registry import services
+from utils.telemetry import setup_telemetry, shutdown_telemetry
+
+logger = logging.getLogger(__name__)
+
+
+async def serve():
+    """Drains the shared job queue until SIGINT/SIGTERM; no Discord connection."""
+    pipeline = IngestPipeline(
+        scrape_fn=scrape,
+        persist_fn=persist_to_db,
+        detect_fn=detect_scraper_type,
+        known_urls=KnownUrlCache(lookup_fn=find_indexed),
+    )
+    queue = JobQueue()
+    # Results are stored on the job for the gateway that is waiting on it
+    workers = JobWorkers(queue, pipeline)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    try:
+        await pipeline.run_blocking(warm_up_pool)
+    except Exception as e:
+        logger.error(f"Could not warm up Postgres pool: {str(e)}")
+
+    workers.start()
+    warm_up = asyncio.create_task(pipeline.run_blocking(services.warm_up))
+    await stop.wait()
+    await warm_up
+    logger.info("Stopping ingest worker...")
+    await workers.stop()
+    pipeline.shutdown(wait=False)
+    queue.close()
+
+
+def run_ingest_worker():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    setup_telemetry()
+    try:
+        asyncio.run(serve())
+    finally:
+        flush_documents()
+        close_pool()
+        shutdown_telemetry()
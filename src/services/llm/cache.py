@@ -0,0 +1,177 @@
+# services/llm/cache.py
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "_data/llm_cache.sqlite3")
+# Seconds a cached response stays valid
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+# Entries kept before the least recently used ones are evicted
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+# Set to "1" to always call the API
+LLM_CACHE_DISABLED = os.getenv("LLM_CACHE_DISABLED", "0") == "1"
+
+
+class LLMCache:
+    """
+    Persistent, content-addressed cache for LLM responses.
+
+    Entries are keyed by model name, prompt and a hash of the input text or
+    bytes, so the same image under a new CDN URL or the same article under a
+    different link is only sent to Gemini once. Stored in SQLite with a TTL
+    and least-recently-used eviction once `max_entries` is exceeded.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        ttl: float = LLM_CACHE_TTL,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        disabled: bool = LLM_CACHE_DISABLED,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.disabled = disabled
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, prompt: str, payload: Union[str, bytes]) -> str:
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        digest = hashlib.sha256()
+        for part in (model.encode("utf-8"), prompt.encode("utf-8"), payload):
+            digest.update(len(part).to_bytes(8, "big"))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = self.clock()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    conn.commit()
+                self.misses += 1
+                return None
+            conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = self.clock()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    """
+                    DELETE FROM llm_cache WHERE key IN (
+                        SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?
+                    )
+                    """,
+                    (count - self.max_entries,),
+                )
+            conn.commit()
+
+    def get_or_compute(
+        self,
+        model: str,
+        prompt: str,
+        payload: Union[str, bytes],
+        compute: Callable[[], str],
+        bypass: bool = False,
+    ) -> str:
+        """Returns the cached response, or calls `compute` and stores its result."""
+        if bypass or self.disabled:
+            return compute()
+
+        key = self.make_key(model, prompt, payload)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        value = compute()
+        self.set(key, value)
+        return value
+
+    def get_or_stream(
+        self,
+        model: str,
+        prompt: str,
+        payload: Union[str, bytes],
+        stream: Callable[[], Iterable[str]],
+        bypass: bool = False,
+    ) -> Iterator[str]:
+        """
+        Streaming counterpart of `get_or_compute`: yields the cached response
+        in one piece, or the fragments of `stream()` as they arrive. A stream
+        is only stored once it has been read to the end.
+        """
+        if bypass or self.disabled:
+            yield from stream()
+            return
+
+        key = self.make_key(model, prompt, payload)
+        cached = self.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        pieces = []
+        for piece in stream():
+            pieces.append(piece)
+            yield piece
+        self.set(key, "".join(pieces).strip())
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed_at ON llm_cache(accessed_at)"
+            )
+            self._conn.commit()
+        return self._conn
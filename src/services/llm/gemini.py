@@ -1,29 +1,68 @@
 # services/llm/gemini.py
 
 import os
-from google import genai
-from google.genai import types
-from services.llm.prompts import SUMMARY_PROMPT, IMAGE_DESCRIPTION_PROMPT, LINK_SUMMARY_PROMPT
-import base64
+from typing import Callable, Iterator, Optional
+from services.llm.prompts import SUMMARY_PROMPT, IMAGE_DESCRIPTION_PROMPT, LINK_SUMMARY_PROMPT, ASK_PROMPT
+from services.llm.cache import LLMCache
+from utils.rate_limiter import get_limiter, is_throttle_error
+from utils.registry import services
+from utils.telemetry import record_usage, stage
 from dotenv import load_dotenv
 load_dotenv()
 
-# Initialize the Gemini client
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+def _make_client():
+    # google.genai takes about a second to import, so it is only loaded
+    # when the client is first needed
+    from google import genai
+    from google.genai import types
+    # GEMINI_BASE_URL points the client at a proxy or a local stand-in
+    # (see benchmarks/bench_end_to_end.py) instead of the public endpoint
+    base_url = os.getenv("GEMINI_BASE_URL")
+    http_options = types.HttpOptions(base_url=base_url) if base_url else None
+    return genai.Client(api_key=os.getenv("GEMINI_API_KEY"), http_options=http_options)
+
+services.register("genai", _make_client)
 model_name = "gemini-2.5-flash-preview-05-20"
 
+# Responses are cached by model, prompt and input hash; pass use_cache=False to
+# force a fresh call.
+llm_cache = LLMCache()
+
+# Adaptive pacing per quota; slows down on 429s and ramps back up on success
+text_limiter = get_limiter("gemini_text")
+vision_limiter = get_limiter("gemini_vision")
 
-def summarize_youtube_video(video_url: str) -> str:
+
+def summarize_youtube_video(video_url: str, use_cache: bool = True) -> str:
     """
     Summarizes a YouTube video using the Gemini API.
 
     Args:
         video_url (str): The URL of the YouTube video.
+        use_cache (bool): Reuse a cached summary for the same video.
 
     Returns:
         str: The summarized content.
     """
-    contents = [
+    return llm_cache.get_or_compute(
+        model_name, SUMMARY_PROMPT, video_url,
+        lambda: _summarize_youtube_video(video_url),
+        bypass=not use_cache,
+    )
+
+
+def stream_youtube_summary(video_url: str, use_cache: bool = True) -> Iterator[str]:
+    """Streaming variant of summarize_youtube_video; yields text as Gemini writes it."""
+    return llm_cache.get_or_stream(
+        model_name, SUMMARY_PROMPT, video_url,
+        lambda: _stream(vision_limiter, _youtube_contents(video_url), "gemini.youtube", error="Failed to summarize video"),
+        bypass=not use_cache,
+    )
+
+
+def _youtube_contents(video_url: str) -> list:
+    from google.genai import types
+    return [
         types.Content(
             role="user",
             parts=[
@@ -38,12 +77,17 @@ def summarize_youtube_video(video_url: str) -> str:
         ),
     ]
 
+
+def _summarize_youtube_video(video_url: str) -> str:
     try:
         # Generate content using the non-streaming method
-        response = client.models.generate_content(
-            model=model_name,
-            contents=contents,
-        )
+        with stage("gemini.youtube") as span:
+            response = vision_limiter.call(
+                services.get("genai").models.generate_content,
+                model=model_name,
+                contents=_youtube_contents(video_url),
+            )
+            record_usage(span, "gemini.youtube", model_name, response.usage_metadata)
 
         # Extract and return the text from the response
         return response.text.strip()
@@ -51,34 +95,73 @@ def summarize_youtube_video(video_url: str) -> str:
         raise RuntimeError(f"Failed to summarize video: {e}")
 
 
-def describe_image(image_bytes: bytes) -> str:
-    base64_image = base64.b64encode(image_bytes).decode("utf-8")
+def describe_image(image_bytes: bytes, mime_type: str = "image/png", use_cache: bool = True) -> str:
+    return llm_cache.get_or_compute(
+        model_name, IMAGE_DESCRIPTION_PROMPT, image_bytes,
+        lambda: _describe_image(image_bytes, mime_type),
+        bypass=not use_cache,
+    )
+
 
-    contents = [
+def stream_image_description(image_bytes: bytes, mime_type: str = "image/png", use_cache: bool = True) -> Iterator[str]:
+    """Streaming variant of describe_image."""
+    return llm_cache.get_or_stream(
+        model_name, IMAGE_DESCRIPTION_PROMPT, image_bytes,
+        lambda: _stream(vision_limiter, _image_contents(image_bytes, mime_type), "gemini.image", error="Gemini image description failed"),
+        bypass=not use_cache,
+    )
+
+
+def _image_contents(image_bytes: bytes, mime_type: str) -> list:
+    from google.genai import types
+    return [
         types.Content(
             role="user",
             parts=[
                 types.Part.from_bytes(
-                    mime_type="image/png",
-                    data=base64.b64decode(base64_image),
+                    mime_type=mime_type,
+                    data=image_bytes,
                 ),
                 types.Part.from_text(text=IMAGE_DESCRIPTION_PROMPT),
             ],
         ),
     ]
 
-    response = client.models.generate_content(
-        model=model_name,
-        contents=contents,
-        config=types.GenerateContentConfig(response_mime_type="text/plain")
-    )
+
+def _describe_image(image_bytes: bytes, mime_type: str) -> str:
+    from google.genai import types
+    with stage("gemini.image") as span:
+        response = vision_limiter.call(
+            services.get("genai").models.generate_content,
+            model=model_name,
+            contents=_image_contents(image_bytes, mime_type),
+            config=types.GenerateContentConfig(response_mime_type="text/plain")
+        )
+        record_usage(span, "gemini.image", model_name, response.usage_metadata)
 
     return response.text.strip()
 
 
+def summarize_text(text: str, use_cache: bool = True) -> str:
+    return llm_cache.get_or_compute(
+        model_name, LINK_SUMMARY_PROMPT, text,
+        lambda: _summarize_text(text),
+        bypass=not use_cache,
+    )
 
-def summarize_text(text: str) -> str:
-    contents = [
+
+def stream_text_summary(text: str, use_cache: bool = True) -> Iterator[str]:
+    """Streaming variant of summarize_text."""
+    return llm_cache.get_or_stream(
+        model_name, LINK_SUMMARY_PROMPT, text,
+        lambda: _stream(text_limiter, _text_contents(text), "gemini.text", error="Gemini text summary failed"),
+        bypass=not use_cache,
+    )
+
+
+def _text_contents(text: str) -> list:
+    from google.genai import types
+    return [
         types.Content(
             role="user",
             parts=[
@@ -88,12 +171,108 @@ def summarize_text(text: str) -> str:
         )
     ]
 
+
+def _summarize_text(text: str) -> str:
+    from google.genai import types
     try:
-        response = client.models.generate_content(
-            model=model_name,
-            contents=contents,
-            config=types.GenerateContentConfig(response_mime_type="text/plain")
-        )
+        with stage("gemini.text") as span:
+            response = text_limiter.call(
+                services.get("genai").models.generate_content,
+                model=model_name,
+                contents=_text_contents(text),
+                config=types.GenerateContentConfig(response_mime_type="text/plain")
+            )
+            record_usage(span, "gemini.text", model_name, response.usage_metadata)
         return response.text.strip()
     except Exception as e:
         raise RuntimeError(f"Gemini text summary failed: {e}")
+
+
+def generate_text(prompt: str, use_cache: bool = True) -> str:
+    """Runs a self-contained text prompt, e.g. one that carries its own instructions."""
+    return llm_cache.get_or_compute(
+        model_name, "", prompt,
+        lambda: _generate_text(prompt),
+        bypass=not use_cache,
+    )
+
+
+def _generate_text(prompt: str) -> str:
+    from google.genai import types
+    try:
+        with stage("gemini.generate") as span:
+            response = text_limiter.call(
+                services.get("genai").models.generate_content,
+                model=model_name,
+                contents=[types.Content(role="user", parts=[types.Part.from_text(text=prompt)])],
+                config=types.GenerateContentConfig(response_mime_type="text/plain")
+            )
+            record_usage(span, "gemini.generate", model_name, response.usage_metadata)
+        return response.text.strip()
+    except Exception as e:
+        raise RuntimeError(f"Gemini text generation failed: {e}")
+
+
+def stream_answer(question: str, context: str) -> Iterator[str]:
+    """
+    Streams a cited answer to `question` grounded in `context`.
+
+    Yields text fragments as Gemini produces them.
+    """
+    from google.genai import types
+    contents = [
+        types.Content(
+            role="user",
+            parts=[
+                types.Part.from_text(text=f"{ASK_PROMPT}\n\nSources:\n{context}\n\nQuestion: {question}")
+            ],
+        )
+    ]
+    return _stream(text_limiter, contents, "gemini.answer", error="Gemini answer failed")
+
+
+def _stream(limiter, contents: list, name: str, error: str) -> Iterator[str]:
+    """
+    Yields text fragments from generate_content_stream under `limiter`.
+
+    A 429 before the first fragment is retried like limiter.call does; once
+    text has been yielded the stream can't be replayed, so errors propagate.
+    The whole stream, retries included, is timed as stage `name`.
+    """
+    from google.genai import types
+    with stage(name, attach=False) as span:
+        for attempt in range(limiter.max_retries + 1):
+            limiter.acquire()
+            issued_at = limiter.clock()
+            started = False
+            usage = None
+            try:
+                for chunk in services.get("genai").models.generate_content_stream(
+                    model=model_name,
+                    contents=contents,
+                    config=types.GenerateContentConfig(response_mime_type="text/plain")
+                ):
+                    # Totals arrive on the last chunks
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    if chunk.text:
+                        started = True
+                        yield chunk.text
+            except Exception as e:
+                if is_throttle_error(e):
+                    limiter.on_throttle(issued_at)
+                    if not started and attempt < limiter.max_retries:
+                        continue
+                raise RuntimeError(f"{error}: {e}")
+            limiter.on_success()
+            record_usage(span, name, model_name, usage)
+            return
+
+
+def collect_stream(pieces: Iterator[str], on_progress: Optional[Callable[[str], None]] = None) -> str:
+    """Drains a streaming response, reporting the text so far after each fragment."""
+    text = ""
+    for piece in pieces:
+        text += piece
+        if on_progress is not None:
+            on_progress(text)
+    return text.strip()
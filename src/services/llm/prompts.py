@@ -16,3 +16,14 @@ LINK_SUMMARY_PROMPT = (
     "Summarize the following web page content in 5–7 concise bullet points. "
     "Make it easy to skim and focus on key ideas or takeaways only."
 )
+
+DIGEST_ITEM_PROMPT = (
+    "For each numbered entry below, write exactly one sentence capturing its key takeaway. "
+    "Reply with one line per entry in the form `N. sentence`, in the same order, and nothing else."
+)
+
+ASK_PROMPT = (
+    "Answer the question using only the numbered sources below. "
+    "Cite the sources you rely on inline as [1], [2], etc. "
+    "If the sources don't contain the answer, say so briefly instead of guessing."
+)
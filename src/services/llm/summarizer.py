@@ -1,19 +1,21 @@
-from .gemini import summarize_text
+import re
+from typing import Optional
+from .gemini import generate_text
+from .prompts import DIGEST_ITEM_PROMPT
 
-def summarize_entries(entries: list[tuple]) -> str:
-    """Summarizes a list of database entries into a single, readable summary."""
-    if not entries:
-        return "No entries to summarize."
+NUMBERED_LINE_RE = re.compile(r"^\s*(\d+)[.)]\s*(.+?)\s*$", re.MULTILINE)
 
-    # Prepare the content for the prompt
-    content_to_summarize = ""
-    for entry in entries:
-        url, summary, _ = entry
-        content_to_summarize += f"- {summary} ({url})\n"
+def summarize_entry_bullets(entries: list[tuple[str, Optional[str]]]) -> list[Optional[str]]:
+    """
+    Writes a one-sentence takeaway for each (url, summary) entry in a single
+    Gemini call. Returns one sentence per entry, in order; None where the
+    model skipped an entry.
+    """
+    if not entries:
+        return []
 
-    # Create the prompt for Gemini
-    prompt = f"Please summarize the following entries into a concise list of bullet points. Each bullet point should represent one entry and be a single sentence:\n\n{content_to_summarize}"
+    numbered = "\n".join(f"{i}. {summary} ({url})" for i, (url, summary) in enumerate(entries, start=1))
+    reply = generate_text(f"{DIGEST_ITEM_PROMPT}\n\n{numbered}")
 
-    # Generate the summary
-    summarized_text = summarize_text(prompt)
-    return summarized_text
+    sentences = {int(number): text for number, text in NUMBERED_LINE_RE.findall(reply)}
+    return [sentences.get(i) for i in range(1, len(entries) + 1)]
@@ -1,35 +1,111 @@
-from database.pg_database import save_to_postgres
-from database.chroma_db import add_document
-from models.database import ExtractedContent
+from typing import Optional, Union
+from database.pg_database import save_to_postgres, save_many_to_postgres, get_indexed_entry
+from database.vector_db import add_document, add_documents
+from services.daily_briefing import invalidate_digests
+from models.database import ExtractedContent, Provenance
+from utils.detect_link_type import detect_scraper_type
+from utils.chunk_text import chunk_text, chunk_id
 
-def persist_to_db(content: ExtractedContent):
+ALREADY_INDEXED = "Already Indexed. Thanks for sending!"
+PERSISTED = "Persisted to database ✅"
 
+def _row(content: ExtractedContent, provenance: Optional[Provenance]) -> dict:
+    return dict(
+        url=content.url,
+        content=content.content,
+        summary=content.summary,
+        source=content.metadata.get("source") if content.metadata else None,
+        metadata=content.metadata,
+        provenance=provenance
+    )
+
+def _chunk_records(content: ExtractedContent) -> list[tuple[str, str, dict]]:
+    """(doc_id, chunk, metadata) records to embed for `content`."""
+    # Determine text to embed
+    text_to_embed = content.content or content.summary
+    if not text_to_embed:
+        return []
+    chunks = chunk_text(text_to_embed)
+    metadata = {
+        "url": content.url or "",
+        "parent_url": content.url or "",
+        "title": content.title or "",
+        "media_type": content.media_type or "",
+        "tags": ",".join(content.tags) if content.tags else "",
+        "chunk_count": len(chunks),
+    }
+    return [
+        (chunk_id(content.url, index), chunk, {**metadata, "chunk_index": index})
+        for index, chunk in enumerate(chunks)
+    ]
+
+def persist_to_db(content: ExtractedContent, provenance: Optional[Provenance] = None):
+    """
+    Saves `content` to Postgres and its chunks to ChromaDB. Returns
+    PERSISTED or ALREADY_INDEXED; failures are logged and re-raised so the
+    caller doesn't treat the URL as stored and the job queue retries it.
+    """
     try:
         # Save to Neon database
-        result = save_to_postgres(
-            url=content.url,
-            content=content.content,
-            summary=content.summary,
-            source=content.metadata.get("source") if content.metadata else None,
-            metadata=content.metadata
-        )
-        if result == "Already Indexed. Thanks for sending!":
-            return result
-
-        # Determine text to embed
-        text_to_embed = content.content or content.summary
-        if text_to_embed:
-            metadata = {
-                "url": content.url or "",
-                "title": content.title or "",
-                "media_type": content.media_type or "",
-                "tags": ",".join(content.tags) if content.tags else "",
-            }
-            print("Adding to ChromaDB")
-            add_document(doc_id=content.url, content=text_to_embed, metadata=metadata)
+        result = save_to_postgres(**_row(content, provenance))
+        if not result.created:
+            return ALREADY_INDEXED
+        invalidate_digests(provenance)
+
+        records = _chunk_records(content)
+        if records:
+            print(f"Adding {len(records)} chunk(s) to ChromaDB")
+            for doc_id, chunk, metadata in records:
+                add_document(doc_id=doc_id, content=chunk, metadata=metadata)
+
+    except Exception as e:
+        print(f"Error persisting to database: {e}")
+        raise
+
+    return PERSISTED
 
+def persist_many(items: list[tuple[ExtractedContent, Optional[Provenance]]]) -> list[Union[str, Exception]]:
+    """
+    Batch `persist_to_db` for backfills: one execute_values insert for all
+    rows and one Chroma enqueue for all their chunks. Returns PERSISTED,
+    ALREADY_INDEXED or, for an item with nothing to store, a ValueError per
+    item. A failure of the batch itself is logged and re-raised.
+    """
+    storable = [(content, provenance) for content, provenance in items if content.content or content.summary]
+    try:
+        created = save_many_to_postgres([_row(content, provenance) for content, provenance in storable])
+        records = []
+        for content, _ in storable:
+            if content.url in created:
+                records.extend(_chunk_records(content))
+        if records:
+            add_documents(records)
+        if created:
+            invalidate_digests()
     except Exception as e:
         print(f"Error persisting to database: {e}")
-        return f"Error persisting to database: {e}"
+        raise
+
+    results = []
+    for content, _ in items:
+        if not (content.content or content.summary):
+            results.append(ValueError(f"Nothing to store for {content.url}"))
+        else:
+            results.append(PERSISTED if content.url in created else ALREADY_INDEXED)
+    return results
+
+def find_indexed(url: str) -> Optional[ExtractedContent]:
+    """Returns the stored summary for an already indexed URL, or None."""
+    row = get_indexed_entry(url)
+    if row is None:
+        return None
 
-    return "Persisted to database ✅"
+    stored_url, summary, content, metadata = row
+    return ExtractedContent(
+        url=stored_url,
+        title=None,
+        summary=summary,
+        content=content,
+        media_type=detect_scraper_type(stored_url),
+        metadata=metadata or {},
+    )
@@ -1,8 +1,10 @@
 from adapters.scrapers.firecrawl_adapter import FirecrawlAdapter
 from adapters.scrapers.images import ImageAdapter
 from adapters.scrapers.youtube import YouTubeAdapter
+from models.adapter import ProgressCallback
 from models.database import ExtractedContent
-from typing import Literal
+from typing import Literal, Optional
+from utils.telemetry import stage
 
 ADAPTERS = {
     "link": FirecrawlAdapter,
@@ -12,10 +14,11 @@ ADAPTERS = {
 
 ScraperType = Literal["link", "image", "youtube"]
 
-def scrape(scraper_type: ScraperType, url: str) -> ExtractedContent :
+def scrape(scraper_type: ScraperType, url: str, on_progress: Optional[ProgressCallback] = None) -> ExtractedContent :
     adapter = ADAPTERS.get(scraper_type)
     if not adapter:
         raise ValueError(f"Unknown scraper type: {scraper_type}")
-    result = adapter.extract(url)
+    with stage(f"adapter.{scraper_type}"):
+        result = adapter.extract(url, on_progress=on_progress)
     return result
 
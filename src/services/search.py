@@ -0,0 +1,85 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from pydantic import BaseModel
+
+# Results shown per /search page
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "5"))
+# Minimum candidates pulled from each retriever before fusion
+SEARCH_DEPTH = int(os.getenv("SEARCH_DEPTH", "50"))
+# Reciprocal rank fusion damping constant (60 in the original RRF paper)
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Runs the full-text and vector retrievers side by side
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="search")
+
+
+class SearchHit(BaseModel):
+    url: str
+    score: float
+    snippet: Optional[str] = None
+    matched_by: list[str] = []          # "text" and/or "vector"
+
+
+def reciprocal_rank_fusion(ranked_lists: dict[str, list[str]], k: int = RRF_K) -> list[tuple[str, float]]:
+    """
+    Merges ranked URL lists into one ranking.
+
+    Each URL scores sum(1 / (k + rank)) over the lists it appears in, so
+    results both retrievers agree on rise to the top without having to
+    calibrate BM25-style ranks against vector distances.
+    """
+    scores: dict[str, float] = {}
+    for ranking in ranked_lists.values():
+        for rank, url in enumerate(ranking, start=1):
+            scores[url] = scores.get(url, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def hybrid_search(
+    query: str,
+    text_search: Callable[[str, int], list[tuple]],
+    vector_search: Callable[[str, int], dict],
+    page: int = 0,
+    page_size: int = SEARCH_PAGE_SIZE,
+) -> list[SearchHit]:
+    """
+    Returns one page of results fused from Postgres full-text and Chroma.
+
+    `text_search(query, n)` returns (url, summary, rank) rows and
+    `vector_search(query, n)` returns a collapsed Chroma query result. Both
+    run in parallel; `page` is zero-based.
+    """
+    depth = max(SEARCH_DEPTH, (page + 1) * page_size)
+    text_future = _executor.submit(text_search, query, depth)
+    vector_future = _executor.submit(vector_search, query, depth)
+    text_rows = text_future.result()
+    vector_results = vector_future.result()
+
+    snippets: dict[str, str] = {}
+    text_urls = []
+    for url, summary, _ in text_rows:
+        text_urls.append(url)
+        if summary:
+            snippets[url] = summary
+
+    vector_urls = list(vector_results.get("ids", [[]])[0])
+    documents = (vector_results.get("documents") or [[None] * len(vector_urls)])[0]
+    for url, document in zip(vector_urls, documents):
+        if document and url not in snippets:
+            snippets[url] = document
+
+    fused = reciprocal_rank_fusion({"text": text_urls, "vector": vector_urls})
+    start = page * page_size
+    text_set, vector_set = set(text_urls), set(vector_urls)
+
+    return [
+        SearchHit(
+            url=url,
+            score=score,
+            snippet=snippets.get(url),
+            matched_by=[name for name, found in (("text", url in text_set), ("vector", url in vector_set)) if found],
+        )
+        for url, score in fused[start:start + page_size]
+    ]
@@ -0,0 +1,186 @@
+# services/topology.py
+
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "single": one process runs the gateway and the ingestion workers (default).
+# "split": gateway processes only talk to Discord and enqueue jobs; separate
+# ingest processes drain the shared job queue.
+BOT_TOPOLOGY = os.getenv("BOT_TOPOLOGY", "single")
+# Total gateway shards; 0 lets Discord recommend a count (single mode only)
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))
+# Processes the shards are spread over, and ingest processes (split mode)
+GATEWAY_PROCESSES = int(os.getenv("GATEWAY_PROCESSES", "1"))
+INGEST_PROCESSES = int(os.getenv("INGEST_PROCESSES", "2"))
+# Seconds to wait before restarting a process that exited
+RESTART_DELAY = float(os.getenv("RESTART_DELAY", "5"))
+
+STANDALONE, GATEWAY, INGEST = "standalone", "gateway", "ingest"
+
+
+class ProcessSpec(BaseModel):
+    role: str
+    index: int = 0
+    shard_ids: Optional[list[int]] = None
+    shard_count: Optional[int] = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.role}-{self.index}"
+
+    def environ(self) -> dict[str, str]:
+        """Environment a spawned process reads its role and shards from."""
+        env = {
+            "PROCESS_ROLE": self.role,
+            "PROCESS_INDEX": str(self.index),
+            # Every process gets its own Chroma write-ahead file
+            "CHROMA_WAL_PATH": f"_data/chroma_wal.{self.name}.jsonl",
+        }
+        if self.shard_count:
+            env["SHARD_COUNT"] = str(self.shard_count)
+            env["SHARD_IDS"] = ",".join(map(str, self.shard_ids or []))
+        return env
+
+
+class Topology(BaseModel):
+    mode: str = "single"
+    shard_count: int = 0
+    gateway_processes: int = 1
+    ingest_processes: int = 2
+    chroma_mode: str = "local"
+    vector_backend: str = "chroma"
+
+    @classmethod
+    def from_env(cls) -> "Topology":
+        return cls(
+            mode=BOT_TOPOLOGY,
+            shard_count=SHARD_COUNT,
+            gateway_processes=GATEWAY_PROCESSES,
+            ingest_processes=INGEST_PROCESSES,
+            chroma_mode=os.getenv("CHROMA_MODE", "local"),
+            vector_backend=os.getenv("VECTOR_BACKEND", "chroma"),
+        )
+
+    def check(self):
+        """Raises ValueError for a topology that can't work."""
+        if self.mode not in ("single", "split"):
+            raise ValueError(f"Unknown BOT_TOPOLOGY {self.mode!r}; use 'single' or 'split'")
+        if self.mode == "single":
+            return
+        if self.vector_backend == "chroma" and self.chroma_mode != "http":
+            raise ValueError(
+                "A split deployment needs CHROMA_MODE=http or VECTOR_BACKEND=numpy; "
+                "processes can't share a local Chroma directory"
+            )
+        if self.gateway_processes < 1 or self.ingest_processes < 1:
+            raise ValueError("A split deployment needs at least one gateway and one ingest process")
+        if self.gateway_processes > 1 and self.shard_count < self.gateway_processes:
+            raise ValueError("Set SHARD_COUNT to at least GATEWAY_PROCESSES to spread shards over processes")
+
+    def processes(self) -> list[ProcessSpec]:
+        self.check()
+        if self.mode == "single":
+            return [ProcessSpec(role=STANDALONE, shard_count=self.shard_count or None)]
+
+        specs = []
+        for index in range(self.gateway_processes):
+            if self.shard_count:
+                # Contiguous slices: process i gets shards [start, end)
+                start = index * self.shard_count // self.gateway_processes
+                end = (index + 1) * self.shard_count // self.gateway_processes
+                specs.append(ProcessSpec(
+                    role=GATEWAY, index=index, shard_ids=list(range(start, end)), shard_count=self.shard_count
+                ))
+            else:
+                specs.append(ProcessSpec(role=GATEWAY, index=index))
+        specs.extend(ProcessSpec(role=INGEST, index=index) for index in range(self.ingest_processes))
+        return specs
+
+
+def process_role() -> str:
+    """Role of the current process; set by `launch` for spawned processes."""
+    return os.getenv("PROCESS_ROLE", STANDALONE)
+
+
+def is_primary() -> bool:
+    """The one process that does once-per-deployment work, like syncing slash commands."""
+    return process_role() == STANDALONE or (process_role() == GATEWAY and os.getenv("PROCESS_INDEX", "0") == "0")
+
+
+def shard_options() -> dict:
+    """Keyword arguments for AutoShardedClient from SHARD_COUNT / SHARD_IDS."""
+    if not SHARD_COUNT:
+        return {}
+    shard_ids = os.getenv("SHARD_IDS")
+    options = {"shard_count": SHARD_COUNT}
+    if shard_ids:
+        options["shard_ids"] = [int(shard_id) for shard_id in shard_ids.split(",")]
+    return options
+
+
+def _run(spec: ProcessSpec):
+    # Runs in a freshly spawned interpreter: set the role before anything
+    # reads the environment at import time
+    os.environ.update(spec.environ())
+    if spec.role == INGEST:
+        from services.ingest.worker_process import run_ingest_worker
+        run_ingest_worker()
+    else:
+        from discord.discord_bot import run_discord_bot
+        run_discord_bot()
+
+
+def launch(topology: Topology):
+    """
+    Starts every process of a split topology and restarts any that exit,
+    until SIGINT/SIGTERM, which is passed on to the children.
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    context = multiprocessing.get_context("spawn")
+    specs = topology.processes()
+    running: dict[str, multiprocessing.Process] = {}
+    stopping = False
+
+    def start(spec: ProcessSpec):
+        process = context.Process(target=_run, args=(spec,), name=spec.name)
+        process.start()
+        running[spec.name] = process
+        logger.info(f"Started {spec.name} (pid {process.pid}, shards {spec.shard_ids})")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for spec in specs:
+        start(spec)
+
+    while not stopping:
+        time.sleep(1)
+        for spec in specs:
+            process = running[spec.name]
+            if not process.is_alive() and not stopping:
+                logger.error(f"{spec.name} exited with code {process.exitcode}; restarting in {RESTART_DELAY}s")
+                time.sleep(RESTART_DELAY)
+                start(spec)
+
+    for process in running.values():
+        if process.is_alive():
+            process.terminate()
+    for process in running.values():
+        process.join()
@@ -0,0 +1,141 @@
+# src/tests/conftest.py
+
+import json
+import sqlite3
+from functools import partial
+
+import pytest
+from psycopg2.extras import Json
+
+from database import pg_database
+from database.pg_pool import PgPool
+
+# The columns the ingest path writes and reads; see
+# database/scripts/migrate_to_neon_db.py for the real schema
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scraped_content (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT UNIQUE NOT NULL,
+    content TEXT,
+    summary TEXT,
+    source TEXT,
+    metadata JSON,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    guild_id INTEGER,
+    channel_id INTEGER,
+    submitter_id INTEGER,
+    content_hash TEXT REFERENCES content_blobs(hash),
+    search_vector TEXT
+);
+CREATE TABLE IF NOT EXISTS content_blobs (
+    hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    body BLOB NOT NULL
+);
+"""
+
+# Postgres spellings on the ingest path that SQLite (3.35+) lacks; LEFT is a
+# keyword there, so it can't be registered as a function under that name
+TRANSLATIONS = [("%s", "?"), ("LEFT(", "pg_left(")]
+
+sqlite3.register_adapter(Json, lambda value: json.dumps(value.adapted))
+sqlite3.register_converter("JSON", json.loads)
+
+
+class _SqliteCursor:
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+    def execute(self, sql: str, params=()):
+        for postgres, sqlite in TRANSLATIONS:
+            sql = sql.replace(postgres, sqlite)
+        self._cursor.execute(sql, params)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+
+class SqliteConnection:
+    """Enough of a psycopg2 connection for PgPool and the ingest-path queries; bench_end_to_end uses it too."""
+
+    closed = 0
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.create_function("pg_left", 2, lambda text, n: text[:n] if text is not None else None)
+        # search_vector holds the plain text it would be built from
+        self._conn.create_function("to_tsvector", 2, lambda config, text: text)
+        self._conn.create_function("setweight", 2, lambda vector, weight: vector)
+        self._conn.executescript(SQLITE_SCHEMA)
+
+    def cursor(self) -> _SqliteCursor:
+        return _SqliteCursor(self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+        self.closed = 1
+
+
+class FakeClock:
+    """Settable time for the clocks queues, caches and limiters take; `sleep` advances it."""
+
+    def __init__(self, now: float = 1_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def sqlite_path(tmp_path) -> str:
+    """
+    A SQLite file for one store (job queue, cache, checkpoint). Opening a
+    second store on the same path is how tests simulate a restart or another
+    process.
+    """
+    return str(tmp_path / "store.sqlite3")
+
+
+@pytest.fixture
+def sqlite_pool(tmp_path, monkeypatch) -> PgPool:
+    """Points pg_database at a fresh SQLite database for the test."""
+    pool = PgPool(connect_fn=partial(SqliteConnection, str(tmp_path / "db.sqlite3")))
+    monkeypatch.setattr(pg_database, "_pool", pool)
+    return pool
+
+
+def _word_embedding(texts):
+    # One dimension per known word: documents sharing words end up close
+    vocabulary = ["cat", "dog", "fish", "bird", "car", "train", "plane", "boat"]
+    return [[float(word in text.split()) + 0.01 for word in vocabulary] for text in texts]
+
+
+@pytest.fixture
+def word_embedding():
+    """An embedding function that needs no model download."""
+    return _word_embedding
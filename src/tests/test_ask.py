@@ -0,0 +1,28 @@
+# src/tests/test_ask.py
+
+from services.ask import build_context, format_answer, group_chunks
+
+
+def test_chunks_are_grouped_by_parent_in_rank_order():
+    results = {
+        "ids": [["b#2", "a#0", "b#0"]],
+        "documents": [["b two", "a zero", "b zero"]],
+        "metadatas": [[{"parent_url": "b"}, {"parent_url": "a"}, {"parent_url": "b"}]],
+    }
+    assert group_chunks(results) == {"b": ["b two", "b zero"], "a": ["a zero"]}
+
+
+def test_context_respects_token_budget_and_numbers_sources():
+    chunks = {"https://a": ["alpha " * 50], "https://b": ["beta " * 50], "https://c": ["gamma " * 50]}
+    context, sources = build_context(chunks, {"https://a": "About A"}, token_budget=80)
+
+    assert sources == ["https://a", "https://b"]
+    assert context.startswith("[1] https://a\nSummary: About A")
+    assert "[2] https://b" in context
+    assert len(context.split()) <= 80 + 2 * 2  # budget plus the "[n] url" headers
+
+
+def test_answer_fits_in_one_discord_message():
+    rendered = format_answer("x" * 5000, ["https://a", "https://b"])
+    assert len(rendered) <= 2000
+    assert rendered.endswith("[1] <https://a>\n[2] <https://b>")
@@ -0,0 +1,160 @@
+# src/tests/test_backfill.py
+
+import asyncio
+
+from models.database import ExtractedContent
+from services.ingest.backfill import FAILED, Backfiller, BackfillCheckpoint, HistoryMessage
+from services.ingest.pipeline import IngestPipeline
+from services.persist.persist_to_db import ALREADY_INDEXED, PERSISTED
+
+
+def make_history(channels: dict[int, list[str]]):
+    """Fake history source: message ids count up from 1 in each channel."""
+    reads = []
+
+    async def history(channel_id, after):
+        reads.append((channel_id, after))
+        for index, content in enumerate(channels[channel_id], start=1):
+            if after is None or index > after:
+                yield HistoryMessage(id=index, channel_id=channel_id, guild_id=7, author_id=100 + index, content=content)
+
+    history.reads = reads
+    return history
+
+
+def fake_scrape(scraper_type, url):
+    if "broken" in url:
+        raise RuntimeError("502 Bad Gateway")
+    return ExtractedContent(url=url, title=None, summary=f"about {url}", content=None, media_type=scraper_type, metadata={})
+
+
+class FakeStore:
+    def __init__(self, indexed=(), errors=()):
+        self.rows = {url: None for url in indexed}
+        self.batches = []
+        self.errors = list(errors)
+
+    def persist_many(self, items):
+        self.batches.append(len(items))
+        if self.errors:
+            raise self.errors.pop(0)
+        results = []
+        for data, provenance in items:
+            if data.url in self.rows:
+                results.append(ALREADY_INDEXED)
+            else:
+                self.rows[data.url] = provenance
+                results.append(PERSISTED)
+        return results
+
+    def known(self, urls):
+        return {url for url in urls if url in self.rows}
+
+
+def make_pipeline(scrape_fn=fake_scrape) -> IngestPipeline:
+    return IngestPipeline(scrape_fn=scrape_fn, persist_fn=None, detect_fn=lambda url: "link")
+
+
+def test_backfill_dedupes_batches_and_records_provenance(sqlite_path):
+    history = make_history({
+        1: [
+            "check https://example.com/a and https://example.com/b?token=abc&utm_source=x",
+            "no links here",
+            "again https://example.com/a?utm_source=x",
+            "https://example.com/broken",
+            "https://example.com/old",
+        ],
+    })
+    store = FakeStore(indexed=["https://example.com/old"])
+    checkpoint = BackfillCheckpoint(sqlite_path)
+    backfiller = Backfiller(make_pipeline(), store.persist_many, checkpoint, known_fn=store.known, batch_size=2)
+
+    stats = asyncio.run(backfiller.run(history, [1]))
+
+    assert (stats.messages, stats.urls_found, stats.duplicates) == (5, 5, 1)
+    assert (stats.scraped, stats.persisted, stats.already_indexed, stats.failed) == (2, 2, 1, 1)
+    assert store.batches == [2]  # one bulk write; the other batches had nothing new
+    assert store.rows["https://example.com/b?token=abc"].submitter_id == 101
+    assert store.rows["https://example.com/b?token=abc"].guild_id == 7
+    assert checkpoint.cursor(1) == 5
+    assert checkpoint.failed() == {"https://example.com/broken": "https://example.com/broken"}
+    assert checkpoint.finished(["https://example.com/a", "https://example.com/old"]) == {
+        "https://example.com/a", "https://example.com/old"
+    }
+
+
+class Crash(BaseException):
+    """Stands in for the process dying mid-batch."""
+
+
+def test_backfill_resumes_from_checkpoint(sqlite_path):
+    history = make_history({1: [f"https://example.com/{i}" for i in range(6)]})
+    calls = []
+    crash = True
+
+    def scrape(scraper_type, url):
+        calls.append(url)
+        if crash and url.endswith("/4"):
+            raise Crash()
+        return fake_scrape(scraper_type, url)
+
+    store = FakeStore()
+    checkpoint = BackfillCheckpoint(sqlite_path)
+    backfiller = Backfiller(make_pipeline(scrape), store.persist_many, checkpoint, known_fn=store.known, batch_size=2)
+    try:
+        asyncio.run(backfiller.run(history, [1]))
+    except Crash:
+        pass
+    assert checkpoint.cursor(1) == 4
+    assert len(store.rows) == 4
+    checkpoint.close()
+
+    calls.clear()
+    crash = False
+    checkpoint = BackfillCheckpoint(sqlite_path)
+    resumed = Backfiller(make_pipeline(scrape), store.persist_many, checkpoint, known_fn=store.known, batch_size=2)
+    stats = asyncio.run(resumed.run(history, [1]))
+
+    assert history.reads[-1] == (1, 4)
+    assert sorted(calls) == ["https://example.com/4", "https://example.com/5"]
+    assert stats.messages == 2 and stats.persisted == 2
+    assert len(store.rows) == 6
+
+
+def test_retry_failed_urls(sqlite_path):
+    store = FakeStore()
+    scraped = []
+
+    def scrape(scraper_type, url):
+        scraped.append(url)
+        return fake_scrape(scraper_type, url)
+
+    checkpoint = BackfillCheckpoint(sqlite_path)
+    backfiller = Backfiller(make_pipeline(scrape), store.persist_many, checkpoint, known_fn=store.known)
+    checkpoint.mark({"https://example.com/flaky": "https://example.com/flaky?utm_source=discord"}, FAILED, "timeout")
+
+    stats = asyncio.run(backfiller.retry_failed())
+
+    # The posted URL is fetched; the canonical one is what gets stored
+    assert scraped == ["https://example.com/flaky?utm_source=discord"]
+    assert list(store.rows) == ["https://example.com/flaky"]
+    assert stats.persisted == 1 and checkpoint.failed() == {}
+    assert checkpoint.finished(["https://example.com/flaky"]) == {"https://example.com/flaky"}
+
+
+def test_transient_write_errors_are_retried_and_others_recorded(sqlite_path):
+    history = make_history({1: ["https://example.com/a"], 2: ["https://example.com/b"]})
+    store = FakeStore(errors=[ConnectionError("server closed the connection"), ValueError("bad row")])
+    checkpoint = BackfillCheckpoint(sqlite_path)
+    backfiller = Backfiller(
+        make_pipeline(), store.persist_many, checkpoint, known_fn=store.known, delay_fn=lambda attempt: 0
+    )
+
+    stats = asyncio.run(backfiller.run(history, [1, 2]))
+
+    # Channel 1's batch was retried after the dropped connection, then gave
+    # up on the permanent error; channel 2's went through
+    assert store.batches == [1, 1, 1]
+    assert list(store.rows) == ["https://example.com/b"]
+    assert stats.persisted == 1 and stats.failed == 1
+    assert checkpoint.failed() == {"https://example.com/a": "https://example.com/a"}
@@ -0,0 +1,31 @@
+# src/tests/test_canonical_url.py
+
+from utils.canonical_url import canonicalize_url
+
+
+def test_youtube_variants_collapse_to_watch_url():
+    expected = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    assert canonicalize_url("https://youtu.be/dQw4w9WgXcQ?si=abc123") == expected
+    assert canonicalize_url("https://m.youtube.com/watch?v=dQw4w9WgXcQ&feature=share") == expected
+    assert canonicalize_url("https://www.youtube.com/shorts/dQw4w9WgXcQ") == expected
+    assert canonicalize_url("https://youtube.com/watch?t=42&v=dQw4w9WgXcQ") == expected
+
+
+def test_tracking_params_and_fragments_are_dropped():
+    assert (
+        canonicalize_url("HTTPS://Example.com:443/post?utm_source=x&b=2&fbclid=y&a=1#comments")
+        == "https://example.com/post?a=1&b=2"
+    )
+
+
+def test_meaningful_query_and_path_are_kept():
+    url = "https://cdn.discordapp.com/attachments/1/2/shot.png?ex=abc&hm=def&is=123"
+    assert canonicalize_url(url) == "https://cdn.discordapp.com/attachments/1/2/shot.png?ex=abc&hm=def&is=123"
+    assert canonicalize_url("http://example.com:8080/a/") == "http://example.com:8080/a/"
+
+
+def test_github_ref_selects_a_branch_and_is_kept():
+    main = canonicalize_url("https://github.com/org/repo/blob/README.md?ref=main")
+    release = canonicalize_url("https://github.com/org/repo/blob/README.md?ref=v2.0&utm_source=discord")
+    assert main == "https://github.com/org/repo/blob/README.md?ref=main"
+    assert release == "https://github.com/org/repo/blob/README.md?ref=v2.0"
@@ -1,10 +1,29 @@
 # src/tests/test_chroma.py
 
-from database.chroma_db import collection
+import chromadb
+
+from database.chroma_db import ChromaStore
+from database.vector_db import get_store
 
 def test_chroma_search():
-    results = collection.get()
-    print(results)
+    # Reads the collection only, so no embedding model is loaded
+    store = get_store()
+    results = store.collection.get(limit=4)
+    print(store.count(), results)
+
+def test_chroma_store_queries_with_its_own_embeddings(tmp_path, word_embedding):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    store = ChromaStore(client.get_or_create_collection(name="test"), word_embedding, client)
+    store.upsert(
+        ids=["a", "b", "c"],
+        documents=["cat dog", "car train", "fish boat"],
+        metadatas=[{"url": "u1"}, {"url": "u2"}, {"url": "u3"}],
+    )
+    assert store.count() == 3
+
+    results = store.query(query_texts=["train", "cat"], n_results=2)
+    assert [ids[0] for ids in results["ids"]] == ["b", "a"]
+    assert results["metadatas"][0][0] == {"url": "u2"}
 
 if __name__ == "__main__":
-    test_chroma_search()
\ No newline at end of file
+    test_chroma_search()
@@ -0,0 +1,140 @@
+# src/tests/test_chroma_buffer.py
+
+import json
+import threading
+import time
+
+import pytest
+
+from database import vector_db
+from database.chroma_buffer import ChromaWriteBuffer
+from utils.registry import services
+
+
+class FakeCollection:
+    def __init__(self, fail_times: int = 0, bad_ids=()):
+        self.batches = []
+        self.docs = {}
+        self.fail_times = fail_times
+        self.bad_ids = set(bad_ids)
+        self.lock = threading.Lock()
+
+    def upsert(self, ids, documents, metadatas):
+        with self.lock:
+            if self.fail_times:
+                self.fail_times -= 1
+                raise RuntimeError("embedding failed")
+            if self.bad_ids & set(ids):
+                raise ValueError("Expected metadata value to be a str, int, float or bool")
+            self.batches.append(list(ids))
+            self.docs.update(zip(ids, documents))
+
+
+def test_documents_are_flushed_in_batches(tmp_path):
+    collection = FakeCollection()
+    buffer = ChromaWriteBuffer(collection, batch_size=4, flush_interval=60, wal_path=str(tmp_path / "wal.jsonl"))
+
+    for i in range(10):
+        buffer.add(f"doc-{i}", f"text {i}", {"url": f"u{i}"})
+    buffer.close()
+
+    assert len(collection.docs) == 10
+    assert all(len(batch) <= 4 for batch in collection.batches)
+    assert len(collection.batches) < 10
+    assert buffer.pending() == 0
+    assert (tmp_path / "wal.jsonl").read_text() == ""
+
+
+def test_background_flusher_writes_on_interval(tmp_path):
+    collection = FakeCollection()
+    buffer = ChromaWriteBuffer(collection, batch_size=100, flush_interval=0.05, wal_path=str(tmp_path / "wal.jsonl"))
+
+    buffer.add("doc-1", "text", {})
+    deadline = time.time() + 2
+    while not collection.docs and time.time() < deadline:
+        time.sleep(0.01)
+    buffer.close()
+
+    assert collection.docs == {"doc-1": "text"}
+
+
+def test_queued_documents_survive_a_crash(tmp_path):
+    wal_path = str(tmp_path / "wal.jsonl")
+    crashed = ChromaWriteBuffer(FakeCollection(), batch_size=100, flush_interval=60, wal_path=wal_path)
+    crashed.add("doc-1", "first", {"url": "a"})
+    crashed.add("doc-2", "second", {"url": "b"})
+    # No close(): the process dies with both documents still queued
+
+    collection = FakeCollection()
+    restarted = ChromaWriteBuffer(collection, batch_size=100, flush_interval=60, wal_path=wal_path)
+    assert restarted.pending() == 2
+    restarted.close()
+
+    assert collection.docs == {"doc-1": "first", "doc-2": "second"}
+
+
+def test_failed_flush_keeps_documents_queued(tmp_path):
+    collection = FakeCollection(fail_times=1)
+    buffer = ChromaWriteBuffer(collection, batch_size=100, flush_interval=60, wal_path=str(tmp_path / "wal.jsonl"))
+    buffer.add("doc-1", "text", {})
+
+    assert buffer.flush() == 0
+    assert buffer.pending() == 1
+    assert buffer.flush() == 1
+    buffer.close()
+    assert collection.docs == {"doc-1": "text"}
+
+
+def test_a_bad_document_is_isolated_then_dead_lettered(tmp_path):
+    collection = FakeCollection(bad_ids={"doc-3"})
+    wal_path, dead_path = tmp_path / "wal.jsonl", tmp_path / "dead.jsonl"
+    buffer = ChromaWriteBuffer(
+        collection, batch_size=100, flush_interval=60, wal_path=str(wal_path), max_attempts=3, dead_letter_path=str(dead_path)
+    )
+    buffer.add_many([(f"doc-{i}", f"text {i}", {}) for i in range(8)])
+
+    # The rest of its batch goes through on the first flush
+    assert buffer.flush() == 7
+    assert buffer.pending() == 1 and '"attempts": 1' in wal_path.read_text()
+
+    # The attempt count survives a restart
+    buffer = ChromaWriteBuffer(
+        collection, batch_size=100, flush_interval=60, wal_path=str(wal_path), max_attempts=3, dead_letter_path=str(dead_path)
+    )
+    buffer.flush()
+    buffer.add("doc-8", "text 8", {})
+    assert buffer.flush() == 1
+    buffer.close()
+
+    assert len(collection.docs) == 8 and "doc-3" not in collection.docs
+    assert buffer.pending() == 0 and wal_path.read_text() == ""
+    dead = [json.loads(line) for line in dead_path.read_text().splitlines()]
+    assert [entry["id"] for entry in dead] == ["doc-3"] and "metadata value" in dead[0]["error"]
+
+
+def test_an_unavailable_store_does_not_use_up_attempts(tmp_path):
+    collection = FakeCollection(fail_times=100)
+    buffer = ChromaWriteBuffer(
+        collection, batch_size=100, flush_interval=60, wal_path=str(tmp_path / "wal.jsonl"), max_attempts=2,
+        dead_letter_path=str(tmp_path / "dead.jsonl"),
+    )
+    buffer.add_many([(f"doc-{i}", "text", {}) for i in range(4)])
+    for _ in range(5):
+        assert buffer.flush() == 0
+
+    collection.fail_times = 0
+    assert buffer.flush() == 4
+    buffer.close()
+    assert buffer.dead_lettered == 0 and not (tmp_path / "dead.jsonl").exists()
+
+
+def test_documents_that_cannot_be_queued_raise(tmp_path, monkeypatch):
+    buffer = ChromaWriteBuffer(FakeCollection(), flush_interval=60, wal_path=str(tmp_path / "wal.jsonl"))
+    # A directory where the write-ahead file should be, so appending fails
+    (tmp_path / "wal.jsonl").mkdir()
+    monkeypatch.setitem(services._instances, "vector_writer", buffer)
+
+    with pytest.raises(OSError):
+        vector_db.add_document("doc-1", "text", {"url": "u1"})
+    with pytest.raises(OSError):
+        vector_db.add_documents([("doc-2", "text", {"url": "u2"})])
@@ -0,0 +1,51 @@
+# src/tests/test_chunk_text.py
+
+from utils.chunk_text import chunk_text, chunk_id, collapse_to_parents
+
+
+def words(n: int, prefix: str = "w") -> str:
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+def test_short_text_is_a_single_chunk():
+    assert chunk_text("just a summary", size=50) == ["just a summary"]
+
+
+def test_window_strategy_overlaps_and_covers_everything():
+    chunks = chunk_text(words(100), strategy="window", size=40, overlap=10)
+    assert all(len(c.split()) <= 40 for c in chunks)
+    assert chunks[0].split()[-10:] == chunks[1].split()[:10]
+    assert chunks[-1].split()[-1] == "w99"
+
+
+def test_markdown_strategy_keeps_sections_and_windows_long_ones():
+    text = "\n".join([
+        "# Intro", words(5, "a"),
+        "## Setup", words(5, "b"),
+        "## Details", words(80, "c"),
+        "## Outro", words(5, "d"),
+    ])
+    chunks = chunk_text(text, strategy="markdown", size=30, overlap=5)
+
+    assert chunks[0].startswith("# Intro") and "## Setup" in chunks[0]
+    assert all(len(c.split()) <= 30 for c in chunks)
+    assert chunks[-1].startswith("## Outro")
+    assert any("c79" in c for c in chunks)
+
+
+def test_query_hits_collapse_to_parent_urls():
+    url_a, url_b = "https://a.example", "https://b.example"
+    results = {
+        "ids": [[chunk_id(url_a, 3), chunk_id(url_a, 0), chunk_id(url_b, 1), "https://legacy.example"]],
+        "documents": [["a3", "a0", "b1", "legacy"]],
+        "metadatas": [[
+            {"parent_url": url_a}, {"parent_url": url_a}, {"parent_url": url_b}, {"url": "https://legacy.example"},
+        ]],
+        "distances": [[0.1, 0.2, 0.3, 0.4]],
+    }
+
+    collapsed = collapse_to_parents(results, n_results=2)
+
+    assert collapsed["ids"] == [[url_a, url_b]]
+    assert collapsed["documents"] == [["a3", "b1"]]
+    assert collapsed["distances"] == [[0.1, 0.3]]
@@ -0,0 +1,85 @@
+# src/tests/test_content_storage.py
+
+from types import SimpleNamespace
+
+from adapters.scrapers import firecrawl_adapter
+from database import pg_database
+from database.content_store import decompress_content, split_content
+from utils.registry import services
+
+PAGE = "# Release notes\n\n" + "\n\n".join(f"Fixed issue {i} in the parser." for i in range(400))
+
+
+def test_long_content_is_split_into_a_head_and_a_compressed_blob():
+    assert split_content(PAGE, "inline") == (PAGE, None)
+    assert split_content("short page", "compressed") == ("short page", None)
+
+    head, blob = split_content(PAGE, "compressed", hot_chars=100)
+    assert head == PAGE[:100]
+    assert blob.size == len(PAGE.encode("utf-8")) and len(blob.body) < blob.size / 5
+    assert decompress_content(blob.codec, blob.body) == PAGE
+    # Identical bodies share a key
+    assert split_content(PAGE, "compressed", hot_chars=100)[1].hash == blob.hash
+
+
+def test_compressed_rows_share_blobs_and_decompress_on_first_read(sqlite_pool, monkeypatch):
+    monkeypatch.setattr(pg_database, "CONTENT_STORAGE", "compressed")
+    loads = []
+    monkeypatch.setattr(pg_database, "get_content", lambda content_hash: loads.append(content_hash) or PAGE)
+
+    assert pg_database.save_to_postgres("https://a.example/notes", content=PAGE, summary="Notes").created
+    assert pg_database.save_to_postgres("https://b.example/notes", content=PAGE, summary="Same page elsewhere").created
+    assert pg_database.save_to_postgres("https://c.example/tiny", content="tiny page").created
+
+    with pg_database.get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM content_blobs")
+            assert cur.fetchone()[0] == 1
+
+    entry = pg_database.get_by_url("https://b.example/notes")
+    assert entry.summary == "Same page elsewhere" and loads == []
+    assert entry.content == PAGE and entry.content == PAGE
+    assert len(loads) == 1
+    assert pg_database.get_by_url("https://c.example/tiny").content == "tiny page"
+    assert pg_database.get_indexed_entry("https://a.example/notes")[2] == PAGE[:1001]
+    assert pg_database.get_by_url("https://missing.example") is None
+
+
+def test_compressed_rows_are_indexed_past_the_head(sqlite_pool, monkeypatch):
+    monkeypatch.setattr(pg_database, "CONTENT_STORAGE", "compressed")
+    pg_database.save_to_postgres("https://a.example/notes", content=PAGE, summary="Notes")
+
+    # The stand-in's to_tsvector keeps the text, so the vector shows what was indexed
+    with pg_database.get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT content, search_vector FROM scraped_content")
+            head, indexed = cur.fetchone()
+    assert "Fixed issue 399" not in head
+    assert indexed == "Notes" + PAGE
+
+
+class FakeFirecrawl:
+    def __init__(self, markdown):
+        self.markdown = markdown
+        self.requests = []
+
+    def scrape_url(self, url, formats):
+        self.requests.append(formats)
+        return SimpleNamespace(
+            markdown=self.markdown if "markdown" in formats else None,
+            html="<p>Only HTML</p>" if "html" in formats else None,
+            metadata={"sourceURL": url, "title": "Page"},
+        )
+
+
+def test_firecrawl_only_asks_for_html_when_markdown_is_empty(monkeypatch):
+    monkeypatch.setattr(firecrawl_adapter, "summarize_text", lambda text: f"summary of {text}")
+    for markdown, requests, content in [
+        ("# Page", [["markdown"]], "# Page"),
+        ("", [["markdown"], ["html"]], "<p>Only HTML</p>"),
+    ]:
+        app = FakeFirecrawl(markdown)
+        monkeypatch.setitem(services._instances, "firecrawl", app)
+        result = firecrawl_adapter.FirecrawlAdapter.extract("https://example.com/page")
+        assert app.requests == requests
+        assert result.content == content and result.summary == f"summary of {content}"
@@ -0,0 +1,135 @@
+# src/tests/test_daily_briefing.py
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from models.database import EntryCursor, EntryPage, Provenance, RecentEntry
+from services import daily_briefing
+from services.daily_briefing import (
+    EMPTY_BRIEFING, RollingDigest, all_digests, digest_for, fallback_takeaway, invalidate_digests,
+)
+
+NOW = datetime(2026, 1, 15, 12, tzinfo=timezone.utc)
+
+
+class FakeDb:
+    def __init__(self):
+        self.rows = []
+        self.reads = 0
+
+    def add(self, url, summary, minutes_ago=0):
+        entry = RecentEntry(id=len(self.rows) + 1, url=url, summary=summary, created_at=NOW - timedelta(minutes=minutes_ago))
+        self.rows.insert(0, entry)
+
+    def load(self, limit):
+        self.reads += 1
+        entries = self.rows[:limit]
+        more = len(self.rows) > limit
+        cursor = EntryCursor(created_at=entries[-1].created_at, id=entries[-1].id) if more else None
+        return EntryPage(entries=entries, next_cursor=cursor)
+
+
+class FakeSummarizer:
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, entries):
+        self.gate.wait()
+        self.calls.append([url for url, _ in entries])
+        return [f"takeaway of {url}" for url, _ in entries]
+
+
+def make_digest(db, summarizer, **kwargs):
+    return RollingDigest(load_fn=db.load, summarize_fn=summarizer, now=lambda: NOW, **kwargs)
+
+
+def test_concurrent_readers_share_one_refresh():
+    db, summarizer = FakeDb(), FakeSummarizer()
+    db.add("https://a", "- A")
+    digest = make_digest(db, summarizer)
+
+    summarizer.gate.clear()
+    readers = [threading.Thread(target=digest.render) for _ in range(10)]
+    for reader in readers:
+        reader.start()
+    summarizer.gate.set()
+    for reader in readers:
+        reader.join()
+
+    assert summarizer.calls == [["https://a"]]
+    assert db.reads == 1 and not digest.is_stale()
+    assert "takeaway of https://a" in digest.render()
+
+
+def test_only_new_entries_are_summarized():
+    db, summarizer = FakeDb(), FakeSummarizer()
+    db.add("https://a", "- A", minutes_ago=30)
+    db.add("https://b", "- B", minutes_ago=20)
+    digest = make_digest(db, summarizer, size=2)
+    digest.get()
+
+    db.add("https://c", "- C")
+    assert not digest.is_stale()  # nothing told it yet
+    digest.invalidate()
+    items = digest.get()
+
+    assert summarizer.calls == [["https://b", "https://a"], ["https://c"]]
+    assert [item.url for item in items] == ["https://c", "https://b"]
+    assert digest.next_cursor().id == 2  # older entries continue after https://b
+
+
+def test_entries_age_out_and_fall_back_without_llm():
+    db = FakeDb()
+    db.add("https://old", "1. Old news\n2. More", minutes_ago=24 * 60 + 1)
+
+    def failing(entries):
+        raise RuntimeError("Gemini text generation failed: 503")
+
+    digest = make_digest(db, failing)
+    assert digest.get() == []
+    assert digest._items[0].takeaway == "Old news"
+    assert digest.render() == EMPTY_BRIEFING
+
+
+def test_refreshes_after_max_age_for_rows_from_other_processes():
+    db, summarizer = FakeDb(), FakeSummarizer()
+    clock = [0.0]
+    digest = make_digest(db, summarizer, max_age=60, clock=lambda: clock[0])
+    digest.get()
+    db.add("https://elsewhere", "- persisted by another worker")
+    clock[0] += 61
+    assert [item.url for item in digest.get()] == ["https://elsewhere"]
+
+
+def test_fallback_takeaway_strips_bullets():
+    assert fallback_takeaway("\n* First point\n* Second") == "First point"
+    assert fallback_takeaway(None) == "No summary available."
+
+
+def test_invalidation_is_scoped_by_provenance():
+    guild, channel, other = digest_for(guild_id=1), digest_for(guild_id=1, channel_id=10), digest_for(guild_id=2)
+    for digest in (guild, channel, other):
+        digest._built_version = digest._version
+        digest._built_at = digest.clock()
+
+    invalidate_digests(Provenance(guild_id=1, channel_id=11, submitter_id=5))
+    assert guild.is_stale() and not channel.is_stale() and not other.is_stale()
+
+
+def test_digests_are_kept_for_recently_used_scopes_only(monkeypatch):
+    monkeypatch.setattr(daily_briefing, "_digests", OrderedDict())
+    monkeypatch.setattr(daily_briefing, "DIGEST_MAX_SCOPES", 2)
+    first, second = digest_for(guild_id=1), digest_for(guild_id=2)
+    assert digest_for(guild_id=1) is first
+    digest_for(guild_id=3)
+
+    assert digest_for(guild_id=1) is first and digest_for(guild_id=2) is not second
+    assert len(all_digests()) == 2
+
+
+def test_cursor_round_trips():
+    cursor = EntryCursor(created_at=NOW, id=42)
+    assert EntryCursor.decode(cursor.encode()) == cursor
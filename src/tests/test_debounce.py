@@ -0,0 +1,56 @@
+# src/tests/test_debounce.py
+
+import asyncio
+
+from utils.debounce import Debouncer
+
+
+def test_bursts_are_coalesced_and_spaced():
+    async def run():
+        loop = asyncio.get_running_loop()
+        flushed = []
+        state = {"text": ""}
+
+        async def flush():
+            flushed.append((loop.time(), state["text"]))
+
+        editor = Debouncer(flush, interval=0.05, clock=loop.time)
+        started = loop.time()
+        for i in range(40):
+            state["text"] += str(i % 10)
+            editor.touch()
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.1)
+        await editor.close()
+        editor.touch()  # ignored once closed
+        await asyncio.sleep(0.06)
+        return started, flushed, state["text"], editor
+
+    started, flushed, final, editor = asyncio.run(run())
+
+    # First text goes out immediately, the rest at most once per interval
+    assert flushed[0][0] - started < 0.02
+    assert all(b[0] - a[0] >= 0.045 for a, b in zip(flushed, flushed[1:]))
+    assert len(flushed) < 10
+    assert flushed[-1][1] == final
+    assert editor.flushes == len(flushed) and editor.first_flush_at >= flushed[0][0]
+
+
+def test_failed_flushes_do_not_stop_later_ones():
+    async def run():
+        calls = []
+
+        async def flush():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("429 Too Many Requests")
+
+        editor = Debouncer(flush, interval=0.01)
+        editor.touch()
+        await asyncio.sleep(0.02)
+        editor.touch()
+        await asyncio.sleep(0.02)
+        await editor.close()
+        return calls
+
+    assert len(asyncio.run(run())) == 2
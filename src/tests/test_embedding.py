@@ -0,0 +1,124 @@
+# src/tests/test_embedding.py
+
+from types import SimpleNamespace
+
+import huggingface_hub
+import numpy as np
+import onnxruntime
+from tokenizers import Tokenizer, models, pre_tokenizers
+
+from database.numpy_store import NumpyStore
+from services.embed.cache import EmbeddingCache
+from services.embed.embedder import EmbeddingService, OnnxEmbedder
+
+VOCABULARY = {"[PAD]": 0, "[UNK]": 1, "cat": 2, "dog": 3, "fish": 4, "bird": 5}
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(word in text.split()) + 0.01 for word in VOCABULARY] for text in texts]
+
+
+class TableSession:
+    """Stands in for an ONNX session: each token's hidden state is a fixed row of a table."""
+
+    def __init__(self, inputs=("input_ids", "attention_mask")):
+        self.table = np.random.default_rng(0).normal(size=(len(VOCABULARY), 8)).astype(np.float32)
+        self.inputs = inputs
+        self.batches = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name=name) for name in self.inputs]
+
+    def run(self, outputs, feed):
+        assert set(feed) == set(self.inputs)
+        self.batches.append(feed["input_ids"])
+        return [self.table[feed["input_ids"]]]
+
+
+def test_documents_are_embedded_once_across_batches_and_restarts(sqlite_path):
+    embedder = CountingEmbedder()
+    service = EmbeddingService(embedder, model="test-model", cache=EmbeddingCache(sqlite_path))
+    first = service.embed(["cat dog", "fish", "cat dog"])
+    assert embedder.calls == [["cat dog", "fish"]]
+    assert np.array_equal(first[0], first[2])
+
+    # Only the new text reaches the model, and rows keep the input order
+    second = service.embed(["fish", "bird", "cat dog"])
+    assert embedder.calls[1:] == [["bird"]]
+    assert np.array_equal(second[0], first[1]) and np.array_equal(second[2], first[0])
+
+    restarted = EmbeddingService(embedder, model="test-model", cache=EmbeddingCache(sqlite_path))
+    assert np.array_equal(restarted.embed(["bird"]), second[1:2])
+    assert len(embedder.calls) == 2
+    assert restarted.cache.stats()["hits"] == 1
+
+    # Another model's vectors are never reused
+    EmbeddingService(embedder, model="other-model", cache=restarted.cache).embed(["bird"])
+    assert len(embedder.calls) == 3
+
+
+def test_repeated_queries_skip_inference_and_the_disk_cache(sqlite_path, tmp_path):
+    embedder = CountingEmbedder()
+    service = EmbeddingService(embedder, model="test-model", cache=EmbeddingCache(sqlite_path), query_cache_size=2)
+    store = NumpyStore(str(tmp_path / "vectors"), service)
+    store.upsert(ids=["a", "b"], documents=["cat dog", "fish bird"], metadatas=[{}, {}])
+
+    for _ in range(3):
+        assert store.query(query_texts=["cat"], n_results=1)["ids"] == [["a"]]
+    assert embedder.calls == [["cat dog", "fish bird"], ["cat"]]
+    assert service.cache.stats()["misses"] == 3
+    assert service.query_cache.hits == 2
+
+    # Evicted from the LRU, but still on disk
+    service.embed_queries(["dog", "fish"])
+    service.embed_queries(["cat"])
+    assert embedder.calls[-1] == ["dog", "fish"]
+    assert service.inferred == 5
+
+
+def make_tokenizer() -> Tokenizer:
+    tokenizer = Tokenizer(models.WordLevel(VOCABULARY, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    return tokenizer
+
+
+def test_onnx_embedder_pads_per_batch_and_pools_only_real_tokens():
+    tokenizer = make_tokenizer()
+    session = TableSession()
+    embedder = OnnxEmbedder(session, tokenizer, batch_size=2)
+
+    texts = ["cat dog fish bird", "cat", "dog fish", "bird"]
+    vectors = embedder(texts)
+
+    expected = []
+    for text in texts:
+        mean = session.table[[VOCABULARY[word] for word in text.split()]].mean(axis=0)
+        expected.append(mean / np.linalg.norm(mean))
+    assert np.allclose(vectors, expected, atol=1e-6)
+    # Sorted by length: the two one-word texts share a batch with no padding
+    assert [batch.shape for batch in session.batches] == [(2, 1), (2, 4)]
+
+
+def test_onnx_embedder_downloads_the_model_files_itself(tmp_path, monkeypatch):
+    make_tokenizer().save(str(tmp_path / "tokenizer.json"))
+    downloads, sessions = [], []
+    monkeypatch.setattr(
+        huggingface_hub, "hf_hub_download",
+        lambda repo, filename: downloads.append((repo, filename)) or str(tmp_path / filename.split("/")[-1]),
+    )
+    monkeypatch.setattr(onnxruntime, "InferenceSession", lambda path, **kwargs: sessions.append(path) or TableSession())
+
+    embedder = OnnxEmbedder.load(model_dir="", repo="org/model", max_tokens=3)
+    assert downloads == [("org/model", "onnx/model.onnx"), ("org/model", "tokenizer.json")]
+    assert sessions == [str(tmp_path / "model.onnx")]
+    # Truncated to max_tokens, and not padded to it
+    embedder(["cat dog fish bird"])
+    assert [batch.shape for batch in embedder.session.batches] == [(1, 3)]
+
+    OnnxEmbedder.load(model_dir=str(tmp_path))
+    assert len(downloads) == 2 and sessions[-1] == str(tmp_path / "model.onnx")
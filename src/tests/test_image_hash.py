@@ -0,0 +1,103 @@
+# src/tests/test_image_hash.py
+
+import io
+import random
+
+from PIL import Image, ImageDraw
+
+from adapters.scrapers import images
+from services.ingest.image_dedup import ImageHashIndex
+from utils.image_hash import MultiIndexHash, dhash, hamming, is_featureless
+
+
+def screenshot(seed: int, size=(1600, 900)) -> Image.Image:
+    rng = random.Random(seed)
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    for _ in range(60):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        draw.rectangle([x, y, x + rng.randrange(40, 300), y + rng.randrange(10, 120)], fill=rng.choice(["black", "navy", "gray"]))
+    return image
+
+
+def encode(image: Image.Image, fmt: str, **kwargs) -> bytes:
+    out = io.BytesIO()
+    image.save(out, format=fmt, **kwargs)
+    return out.getvalue()
+
+
+def flip_bits(value: int, count: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def test_dhash_survives_reencoding_and_rescaling():
+    original = screenshot(1)
+    base = dhash(encode(original, "PNG"))
+    assert not is_featureless(base)
+    assert hamming(base, dhash(encode(original, "JPEG", quality=60))) <= 4
+    assert hamming(base, dhash(encode(original.resize((800, 450)), "WEBP"))) <= 4
+    assert hamming(base, dhash(encode(screenshot(2), "PNG"))) > 12
+
+
+def test_undecodable_images_have_no_hash():
+    assert dhash(b"\x00\x00\x00\x1cftypavif" + bytes(64)) is None
+
+
+def test_blank_images_are_featureless():
+    assert is_featureless(dhash(encode(Image.new("RGB", (500, 500), "white"), "PNG")))
+
+
+def test_multi_index_matches_linear_scan():
+    rng = random.Random(3)
+    stored = [rng.getrandbits(64) for _ in range(20_000)]
+    index = MultiIndexHash(max_distance=6)
+    for value in stored:
+        index.add(value)
+
+    for _ in range(300):
+        query = flip_bits(rng.choice(stored), rng.randint(0, 9), rng) if rng.random() < 0.7 else rng.getrandbits(64)
+        best = min(hamming(query, value) for value in stored)
+        found = index.nearest(query)
+        if best <= 6:
+            assert found is not None and found[1] == best
+        else:
+            assert found is None
+
+
+def test_index_reuses_descriptions_across_restarts(tmp_path):
+    path = str(tmp_path / "hashes.sqlite3")
+    original = dhash(encode(screenshot(5), "PNG"))
+    reposted = dhash(encode(screenshot(5), "JPEG", quality=70))
+
+    index = ImageHashIndex(path=path)
+    assert index.find(original) is None
+    index.add(original, "https://cdn.discordapp.com/a.png", "a terminal showing a stack trace")
+    index.close()
+
+    index = ImageHashIndex(path=path)
+    match = index.find(reposted)
+    assert match.url == "https://cdn.discordapp.com/a.png"
+    assert match.description == "a terminal showing a stack trace"
+    assert index.find(flip_bits(original, 20, random.Random(1))) is None
+    # Hashes with the top bit set round-trip through SQLite's signed integers
+    high = original | (1 << 63)
+    index.add(high, "https://cdn.discordapp.com/b.png", "b")
+    assert index.find(high).distance == 0
+    assert index.stats()["hits"] == 2
+
+
+def test_undecodable_images_are_described_without_dedup(sqlite_path, monkeypatch):
+    heic = b"\x00\x00\x00\x18ftypheic" + bytes(64)
+    described = []
+    monkeypatch.setattr(images, "download_image", lambda url: heic)
+    monkeypatch.setattr(images, "describe_image", lambda data, mime_type: described.append((data, mime_type)) or "a photo")
+    monkeypatch.setattr(images.ImageAdapter, "hash_index", ImageHashIndex(path=sqlite_path))
+
+    for _ in range(2):
+        result = images.ImageAdapter.extract("https://cdn.discordapp.com/photo.heic")
+        assert result.content == "a photo" and "image_hash" not in result.metadata
+    assert described == [(heic, "image/heic")] * 2
+    # Never looked up or stored
+    assert images.ImageAdapter.hash_index.stats()["images"] is None
@@ -0,0 +1,104 @@
+# src/tests/test_image_prep.py
+
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from utils.image_prep import download_image, prepare_for_vision, sniff_mime_type
+
+
+def encode(image: Image.Image, fmt: str) -> bytes:
+    out = io.BytesIO()
+    image.save(out, format=fmt)
+    return out.getvalue()
+
+
+@pytest.fixture
+def image_server():
+    """Serves `bodies[path]` over local HTTP; chunked when no length is sent."""
+    bodies: dict[str, tuple[bytes, bool]] = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body, send_length = bodies[self.path]
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")  # deliberately wrong for JPEGs
+            if send_length:
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                for start in range(0, len(body), 8192):
+                    self.wfile.write(body[start:start + 8192])
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", bodies
+    server.shutdown()
+    server.server_close()
+
+
+def test_sniff_ignores_declared_type():
+    jpeg = encode(Image.new("RGB", (4, 4)), "JPEG")
+    assert sniff_mime_type(jpeg) == "image/jpeg"
+    assert sniff_mime_type(encode(Image.new("RGB", (4, 4)), "PNG")) == "image/png"
+    assert sniff_mime_type(encode(Image.new("RGB", (4, 4)), "WEBP")) == "image/webp"
+    assert sniff_mime_type(b"<html>not an image</html>") is None
+
+
+def test_download_streams_within_cap(image_server):
+    base, bodies = image_server
+    body = encode(Image.new("RGB", (64, 64), "red"), "JPEG")
+    bodies["/ok.jpg"] = (body, True)
+    assert download_image(f"{base}/ok.jpg", max_bytes=len(body)) == body
+
+
+@pytest.mark.parametrize("send_length", [True, False])
+def test_download_rejects_oversized_bodies(image_server, send_length):
+    base, bodies = image_server
+    bodies["/big"] = (b"\x00" * 200_000, send_length)
+    with pytest.raises(ValueError, match="byte limit"):
+        download_image(f"{base}/big", max_bytes=50_000)
+
+
+def test_small_supported_images_pass_through_untouched():
+    png = encode(Image.new("RGB", (300, 200), "blue"), "PNG")
+    assert prepare_for_vision(png, max_side=512) == (png, "image/png")
+
+
+def test_large_images_are_downscaled_and_reencoded():
+    photo = encode(Image.new("RGB", (4000, 3000), "green"), "JPEG")
+    data, mime_type = prepare_for_vision(photo, max_side=1000)
+    assert mime_type == "image/jpeg"
+    assert Image.open(io.BytesIO(data)).size == (1000, 750)
+
+    screenshot = encode(Image.new("RGB", (3840, 2160), "white"), "PNG")
+    data, mime_type = prepare_for_vision(screenshot, max_side=1000)
+    assert mime_type == "image/png"
+    assert Image.open(io.BytesIO(data)).size == (1000, 563)
+
+    transparent = encode(Image.new("RGBA", (3000, 1500), (0, 0, 0, 0)), "PNG")
+    data, mime_type = prepare_for_vision(transparent, max_side=1000)
+    assert mime_type == "image/png"
+    assert Image.open(io.BytesIO(data)).size == (1000, 500)
+
+
+def test_unsupported_formats_are_converted():
+    gif = encode(Image.new("P", (50, 50)), "GIF")
+    data, mime_type = prepare_for_vision(gif)
+    assert mime_type == "image/png" and sniff_mime_type(data) == "image/png"
+
+
+
+def test_images_pil_cannot_decode_are_sent_as_they_are():
+    # An AVIF header without a decoder behind it
+    avif = b"\x00\x00\x00\x1cftypavif" + bytes(64)
+    assert prepare_for_vision(avif) == (avif, "image/avif")
+    assert prepare_for_vision(b"definitely not an image") == (b"definitely not an image", "image/png")
@@ -0,0 +1,220 @@
+# src/tests/test_ingest_pipeline.py
+
+import asyncio
+import threading
+import time
+
+from models.database import ExtractedContent
+from services.ingest.pipeline import IngestPipeline
+
+SLOW_SCRAPE_SECONDS = 0.5
+
+
+def slow_scrape(scraper_type: str, url: str) -> ExtractedContent:
+    # Simulates a blocking Firecrawl / Gemini call
+    time.sleep(SLOW_SCRAPE_SECONDS)
+    return ExtractedContent(
+        url=url,
+        title="Slow page",
+        summary="summary",
+        content="content",
+        media_type=scraper_type,
+        metadata={"source": "fake"},
+    )
+
+
+def fake_persist(content: ExtractedContent) -> str:
+    return "Persisted to database ✅"
+
+
+def make_pipeline(scrape_fn=slow_scrape, **kwargs) -> IngestPipeline:
+    return IngestPipeline(
+        scrape_fn=scrape_fn,
+        persist_fn=fake_persist,
+        detect_fn=lambda url: "link",
+        **kwargs,
+    )
+
+
+def test_event_loop_stays_responsive_during_slow_scrape():
+    pipeline = make_pipeline()
+
+    async def run():
+        gaps = []
+        done = asyncio.Event()
+
+        async def heartbeat():
+            last = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        ticker = asyncio.create_task(heartbeat())
+        result = await pipeline.ingest("https://example.com/slow")
+        done.set()
+        await ticker
+        return result, gaps
+
+    try:
+        result, gaps = asyncio.run(run())
+    finally:
+        pipeline.shutdown()
+
+    assert result.persist_result == "Persisted to database ✅"
+    assert result.data.url == "https://example.com/slow"
+    # The heartbeat kept ticking the whole time the adapter was blocked.
+    assert len(gaps) > 20
+    assert max(gaps) < SLOW_SCRAPE_SECONDS / 2
+
+
+def test_concurrency_limit_is_enforced():
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def tracked_scrape(scraper_type: str, url: str) -> ExtractedContent:
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        try:
+            time.sleep(0.05)
+            return ExtractedContent(
+                url=url, title=None, summary="s", content=None, media_type="link", metadata={}
+            )
+        finally:
+            with lock:
+                in_flight -= 1
+
+    pipeline = make_pipeline(scrape_fn=tracked_scrape, max_workers=8, max_concurrency=2)
+
+    async def run():
+        urls = [f"https://example.com/{i}" for i in range(6)]
+        return await asyncio.gather(*(pipeline.ingest(url) for url in urls))
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        pipeline.shutdown()
+
+    assert len(results) == 6
+    assert peak == 2
+
+
+def test_known_urls_skip_scraping():
+    from services.ingest.dedup import KnownUrlCache
+
+    scraped = []
+    stored = {
+        "https://www.youtube.com/watch?v=abc": ExtractedContent(
+            url="https://www.youtube.com/watch?v=abc",
+            title=None,
+            summary="stored summary",
+            content=None,
+            media_type="youtube",
+            metadata={},
+        )
+    }
+
+    def recording_scrape(scraper_type: str, url: str) -> ExtractedContent:
+        scraped.append(url)
+        return ExtractedContent(
+            url=url, title=None, summary="fresh", content=None, media_type=scraper_type, metadata={}
+        )
+
+    known_urls = KnownUrlCache(lookup_fn=stored.get, capacity=10)
+    pipeline = make_pipeline(scrape_fn=recording_scrape, known_urls=known_urls)
+
+    async def run():
+        reposted = await pipeline.ingest("https://youtu.be/abc?si=share")
+        first = await pipeline.ingest("https://example.com/new?utm_source=discord")
+        again = await pipeline.ingest("https://example.com/new")
+        return reposted, first, again
+
+    try:
+        reposted, first, again = asyncio.run(run())
+    finally:
+        pipeline.shutdown()
+
+    assert reposted.already_indexed and reposted.data.summary == "stored summary"
+    assert not first.already_indexed and first.data.url == "https://example.com/new"
+    assert again.already_indexed and again.data.summary == "fresh"
+    # The link is fetched as posted and stored under its canonical form
+    assert scraped == ["https://example.com/new?utm_source=discord"]
+    assert known_urls.db_hits == 1 and known_urls.hits == 1
+
+
+def test_failed_persist_is_not_remembered(monkeypatch):
+    from models.database import SaveResult
+    from services.ingest.dedup import KnownUrlCache
+    from services.persist import persist_to_db
+
+    scraped = []
+    failures = [RuntimeError("connection reset")]
+
+    def recording_scrape(scraper_type: str, url: str) -> ExtractedContent:
+        scraped.append(url)
+        return ExtractedContent(
+            url=url, title=None, summary="fresh", content=None, media_type=scraper_type, metadata={}
+        )
+
+    def flaky_save(**row) -> SaveResult:
+        if failures:
+            raise failures.pop()
+        return SaveResult(id=1, created=True)
+
+    monkeypatch.setattr(persist_to_db, "save_to_postgres", flaky_save)
+    monkeypatch.setattr(persist_to_db, "invalidate_digests", lambda provenance: None)
+    monkeypatch.setattr(persist_to_db, "add_document", lambda **kwargs: None)
+
+    known_urls = KnownUrlCache(lookup_fn=lambda url: None, capacity=10)
+    pipeline = IngestPipeline(
+        scrape_fn=recording_scrape,
+        persist_fn=persist_to_db.persist_to_db,
+        detect_fn=lambda url: "link",
+        known_urls=known_urls,
+    )
+
+    async def run():
+        try:
+            await pipeline.ingest("https://example.com/page")
+        except RuntimeError as e:
+            failed = e
+        return failed, await pipeline.ingest("https://example.com/page")
+
+    try:
+        failed, retried = asyncio.run(run())
+    finally:
+        pipeline.shutdown()
+
+    assert "connection reset" in str(failed)
+    # The retry scrapes and persists again instead of reporting "already indexed"
+    assert not retried.already_indexed and retried.persist_result == "Persisted to database ✅"
+    assert scraped == ["https://example.com/page"] * 2
+
+
+def test_stream_blocking_yields_items_as_they_arrive():
+    pipeline = make_pipeline()
+
+    def slow_tokens():
+        for token in ("Hello", ", ", "world"):
+            time.sleep(0.05)
+            yield token
+
+    async def run():
+        started = time.perf_counter()
+        arrivals = []
+        async for token in pipeline.stream_blocking(slow_tokens):
+            arrivals.append((token, time.perf_counter() - started))
+        return arrivals
+
+    try:
+        arrivals = asyncio.run(run())
+    finally:
+        pipeline.shutdown()
+
+    assert "".join(token for token, _ in arrivals) == "Hello, world"
+    # The first token is delivered long before the stream finishes
+    assert arrivals[0][1] < arrivals[-1][1] - 0.05
@@ -0,0 +1,269 @@
+# src/tests/test_job_queue.py
+
+import asyncio
+import time
+
+from models.database import ExtractedContent
+from services.ingest.job_queue import DEAD, DONE, PENDING, RUNNING, JobFailed, JobQueue, JobWatcher, JobWorkers
+from services.ingest.pipeline import IngestPipeline
+
+
+def test_job_keys_are_idempotent(sqlite_path):
+    queue = JobQueue(sqlite_path)
+    first = queue.enqueue("https://youtu.be/abc?si=x", {"channel_id": 1})
+    again = queue.enqueue("https://www.youtube.com/watch?v=abc", {"channel_id": 2})
+
+    assert first.id == again.id
+    assert queue.counts() == {PENDING: 1}
+
+    queue.complete(queue.claim())
+    rearmed = queue.enqueue("https://youtu.be/abc", {"channel_id": 3})
+    assert rearmed.id == first.id and rearmed.status == PENDING
+    assert rearmed.payload == {"channel_id": 3}
+
+
+def test_failures_back_off_then_dead_letter(sqlite_path, clock):
+    queue = JobQueue(sqlite_path, max_attempts=3, delay_fn=lambda attempt: 10 * attempt, clock=clock)
+    job = queue.enqueue("https://example.com/flaky")
+
+    queue.fail(queue.claim(), "429 RESOURCE_EXHAUSTED")
+    assert queue.claim() is None  # not due for another 10s
+    clock.now += 10
+    queue.fail(queue.claim(), "429 RESOURCE_EXHAUSTED")
+    clock.now += 20
+    dead = queue.fail(queue.claim(), "429 RESOURCE_EXHAUSTED")
+
+    assert dead.status == DEAD and dead.attempts == 3
+    assert queue.get(job.id).last_error == "429 RESOURCE_EXHAUSTED"
+    clock.now += 1_000
+    assert queue.claim() is None
+
+
+def test_permanent_errors_skip_retries(sqlite_path):
+    queue = JobQueue(sqlite_path)
+    queue.enqueue("https://example.com/bad")
+    assert queue.fail(queue.claim(), "Unknown scraper type", permanent=True).status == DEAD
+
+
+def test_restart_resumes_pending_and_abandoned_jobs(sqlite_path, clock):
+    queue = JobQueue(sqlite_path, lease_seconds=30, clock=clock)
+    queue.enqueue("https://example.com/in-flight")
+    queue.enqueue("https://example.com/pending")
+    assert queue.claim().url == "https://example.com/in-flight"  # this worker "crashes" mid-job
+    queue.close()
+
+    restarted = JobQueue(sqlite_path, lease_seconds=30, clock=clock)
+    assert restarted.claim().url == "https://example.com/pending"
+    assert restarted.claim() is None  # still leased to the dead worker
+    clock.now += 31
+    resumed = restarted.claim()
+    assert resumed.url == "https://example.com/in-flight" and resumed.attempts == 1
+    assert restarted.counts() == {RUNNING: 2}
+
+
+def test_only_the_lease_holder_can_finish_a_job(sqlite_path, clock):
+    queue = JobQueue(sqlite_path, lease_seconds=30, clock=clock)
+    queue.enqueue("https://example.com/slow")
+    stalled = queue.claim()
+
+    clock.now += 20
+    assert queue.extend_lease(stalled)
+    clock.now += 20
+    assert queue.claim() is None  # renewed, so not reclaimable yet
+    clock.now += 11
+    reclaimed = queue.claim()
+
+    # The stalled worker comes back after losing its lease
+    assert not queue.extend_lease(stalled)
+    assert not queue.complete(stalled) and queue.fail(stalled, "timed out") is None
+    assert queue.complete(reclaimed)
+    assert queue.counts() == {DONE: 1}
+
+
+def test_jobs_that_keep_losing_their_lease_are_dead_lettered(sqlite_path, clock):
+    queue = JobQueue(sqlite_path, max_attempts=3, lease_seconds=30, clock=clock)
+    job = queue.enqueue("https://example.com/crashes-the-worker")
+
+    for _ in range(3):
+        assert queue.claim() is not None  # the worker dies every time
+        clock.now += 31
+    assert queue.claim() is None
+
+    dead = queue.get(job.id)
+    assert dead.status == DEAD and dead.attempts == 3
+    assert "Lease expired" in dead.last_error
+
+
+def test_workers_retry_until_success_and_report_resumed_jobs(sqlite_path):
+    attempts = {}
+
+    def flaky_scrape(scraper_type, url):
+        attempts[url] = attempts.get(url, 0) + 1
+        if attempts[url] < 3:
+            raise RuntimeError("Gemini text summary failed: 429")
+        return ExtractedContent(url=url, title=None, summary="ok", content=None, media_type="link", metadata={})
+
+    queue = JobQueue(sqlite_path, delay_fn=lambda attempt: 0)
+    queue.enqueue("https://example.com/resumed", {"channel_id": 7})  # left over from a previous run
+
+    pipeline = IngestPipeline(
+        scrape_fn=flaky_scrape, persist_fn=lambda data, provenance=None: "Persisted to database ✅", detect_fn=lambda url: "link"
+    )
+    reported = []
+
+    async def on_finished(job, outcome):
+        reported.append((job.url, job.payload, outcome))
+
+    async def run():
+        workers = JobWorkers(queue, pipeline, on_finished=on_finished, workers=2, poll_interval=0.01)
+        workers.start()
+        future = await workers.submit("https://example.com/live")
+        result = await asyncio.wait_for(future, timeout=5)
+        while not reported:
+            await asyncio.sleep(0.01)
+        await workers.stop()
+        return result
+
+    try:
+        result = asyncio.run(run())
+    finally:
+        pipeline.shutdown()
+
+    assert result.data.summary == "ok"
+    assert attempts == {"https://example.com/live": 3, "https://example.com/resumed": 3}
+    assert reported[0][0] == "https://example.com/resumed" and reported[0][1] == {"channel_id": 7}
+    assert queue.counts() == {DONE: 2}
+
+
+def test_running_jobs_renew_their_lease(sqlite_path):
+    scraped = []
+
+    def slow_scrape(scraper_type, url):
+        scraped.append(url)
+        time.sleep(0.5)
+        return ExtractedContent(url=url, title=None, summary="ok", content=None, media_type="link", metadata={})
+
+    queue = JobQueue(sqlite_path, lease_seconds=0.15)
+    pipeline = IngestPipeline(
+        scrape_fn=slow_scrape, persist_fn=lambda data, provenance=None: "Persisted to database ✅", detect_fn=lambda url: "link"
+    )
+
+    async def run():
+        workers = JobWorkers(queue, pipeline, workers=2, poll_interval=0.01)
+        workers.start()
+        future = await workers.submit("https://example.com/slow")
+        result = await asyncio.wait_for(future, timeout=5)
+        await workers.stop()
+        return result
+
+    try:
+        result = asyncio.run(run())
+    finally:
+        pipeline.shutdown()
+
+    # The idle worker never reclaimed it, although the scrape outlasted the lease
+    assert result.data.summary == "ok" and scraped == ["https://example.com/slow"]
+    assert queue.counts() == {DONE: 1}
+
+
+def test_persist_failures_are_retried_then_dead_lettered(sqlite_path):
+    persisted = []
+
+    def failing_persist(data, provenance=None):
+        persisted.append(data.url)
+        raise RuntimeError("Error persisting to database: connection refused")
+
+    queue = JobQueue(sqlite_path, max_attempts=2, delay_fn=lambda attempt: 0)
+    pipeline = IngestPipeline(
+        scrape_fn=lambda scraper_type, url: ExtractedContent(
+            url=url, title=None, summary="ok", content=None, media_type="link", metadata={}
+        ),
+        persist_fn=failing_persist,
+        detect_fn=lambda url: "link",
+    )
+
+    async def run():
+        workers = JobWorkers(queue, pipeline, workers=1, poll_interval=0.01)
+        workers.start()
+        future = await workers.submit("https://example.com/unsaved")
+        outcome = await asyncio.wait_for(asyncio.gather(future, return_exceptions=True), timeout=5)
+        await workers.stop()
+        return outcome[0]
+
+    try:
+        error = asyncio.run(run())
+    finally:
+        pipeline.shutdown()
+
+    assert isinstance(error, RuntimeError) and "connection refused" in str(error)
+    assert persisted == ["https://example.com/unsaved"] * 2
+    assert queue.counts() == {DEAD: 1}
+
+
+def test_progress_is_relayed_to_the_submitter(sqlite_path):
+    def streaming_scrape(scraper_type, url, on_progress=None):
+        text = ""
+        for piece in ("A talk ", "about ", "Postgres."):
+            text += piece
+            if on_progress is not None:
+                on_progress(text)
+        return ExtractedContent(url=url, title=None, summary=text, content=None, media_type="youtube", metadata={})
+
+    queue = JobQueue(sqlite_path)
+    pipeline = IngestPipeline(
+        scrape_fn=streaming_scrape, persist_fn=lambda data, provenance=None: "Persisted to database ✅", detect_fn=lambda url: "youtube"
+    )
+
+    async def run():
+        seen = []
+        workers = JobWorkers(queue, pipeline, workers=1, poll_interval=0.01)
+        workers.start()
+        future = await workers.submit("https://youtu.be/abc", on_progress=seen.append)
+        result = await asyncio.wait_for(future, timeout=5)
+        await asyncio.sleep(0.01)
+        await workers.stop()
+        return seen, result
+
+    try:
+        seen, result = asyncio.run(run())
+    finally:
+        pipeline.shutdown()
+
+    assert seen == ["A talk ", "A talk about ", "A talk about Postgres."]
+    assert result.data.summary == "A talk about Postgres."
+
+
+def test_watcher_gets_results_from_another_process(sqlite_path):
+    def scrape(scraper_type, url):
+        if "bad" in url:
+            raise ValueError("Unknown scraper type")
+        return ExtractedContent(url=url, title=None, summary="ok", content="x" * 5000, media_type="link", metadata={})
+
+    # The gateway and the ingest process each open the same queue file
+    gateway_queue, ingest_queue = JobQueue(sqlite_path), JobQueue(sqlite_path)
+    gateway = IngestPipeline(scrape_fn=None, persist_fn=None, detect_fn=lambda url: "link")
+    ingest = IngestPipeline(
+        scrape_fn=scrape, persist_fn=lambda data, provenance=None: "Persisted to database ✅", detect_fn=lambda url: "link"
+    )
+
+    async def run():
+        watcher = JobWatcher(gateway_queue, gateway, poll_interval=0.01)
+        workers = JobWorkers(ingest_queue, ingest, workers=1, poll_interval=0.01)
+        watcher.start()
+        good = await watcher.submit("https://example.com/good", {"channel_id": 1})
+        bad = await watcher.submit("https://example.com/bad")
+        workers.start()
+        outcomes = await asyncio.wait_for(asyncio.gather(good, bad, return_exceptions=True), timeout=5)
+        await workers.stop()
+        await watcher.stop()
+        return outcomes
+
+    try:
+        result, error = asyncio.run(run())
+    finally:
+        gateway.shutdown()
+        ingest.shutdown()
+
+    assert result.data.summary == "ok"
+    assert len(result.data.content) < 5000  # only a preview crosses the queue
+    assert isinstance(error, JobFailed) and "Unknown scraper type" in str(error)
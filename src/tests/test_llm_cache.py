@@ -0,0 +1,77 @@
+# src/tests/test_llm_cache.py
+
+from services.llm.cache import LLMCache
+
+
+def test_identical_inputs_hit_the_cache(sqlite_path):
+    cache = LLMCache(sqlite_path)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "- bullet"
+
+    image = b"\x89PNG same bytes, different CDN url"
+    assert cache.get_or_compute("model", "describe", image, compute) == "- bullet"
+    assert cache.get_or_compute("model", "describe", image, compute) == "- bullet"
+    # A different prompt or model is a different entry
+    cache.get_or_compute("model", "summarize", image, compute)
+    cache.get_or_compute("other-model", "describe", image, compute)
+
+    assert len(calls) == 3
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 3
+
+
+def test_cache_survives_restart(sqlite_path):
+    LLMCache(sqlite_path).get_or_compute("model", "prompt", "text", lambda: "stored")
+    reopened = LLMCache(sqlite_path)
+    assert reopened.get_or_compute("model", "prompt", "text", lambda: "recomputed") == "stored"
+
+
+def test_entries_expire_after_ttl(sqlite_path, clock):
+    cache = LLMCache(sqlite_path, ttl=60, clock=clock)
+    cache.get_or_compute("model", "prompt", "text", lambda: "old")
+
+    clock.now += 61
+    assert cache.get_or_compute("model", "prompt", "text", lambda: "new") == "new"
+
+
+def test_least_recently_used_entries_are_evicted(sqlite_path, clock):
+    cache = LLMCache(sqlite_path, max_entries=2, clock=clock)
+    for text in ("a", "b"):
+        clock.now += 1
+        cache.get_or_compute("model", "prompt", text, lambda: text.upper())
+
+    clock.now += 1
+    cache.get_or_compute("model", "prompt", "a", lambda: "miss")  # refresh "a"
+    clock.now += 1
+    cache.get_or_compute("model", "prompt", "c", lambda: "C")
+
+    assert cache.get(cache.make_key("model", "prompt", "a")) == "A"
+    assert cache.get(cache.make_key("model", "prompt", "b")) is None
+
+
+def test_bypass_always_calls_the_api(sqlite_path):
+    cache = LLMCache(sqlite_path)
+    cache.get_or_compute("model", "prompt", "text", lambda: "cached")
+    assert cache.get_or_compute("model", "prompt", "text", lambda: "fresh", bypass=True) == "fresh"
+
+    disabled = LLMCache(sqlite_path, disabled=True)
+    assert disabled.get_or_compute("model", "prompt", "text", lambda: "fresh") == "fresh"
+
+
+def test_streams_are_cached_only_when_complete(sqlite_path):
+    cache = LLMCache(sqlite_path)
+
+    def stream():
+        yield "- first"
+        yield " bullet\n"
+
+    abandoned = cache.get_or_stream("model", "summarize", "article", stream)
+    assert next(abandoned) == "- first"
+    abandoned.close()
+    assert cache.get(cache.make_key("model", "summarize", "article")) is None
+
+    assert list(cache.get_or_stream("model", "summarize", "article", stream)) == ["- first", " bullet\n"]
+    assert list(cache.get_or_stream("model", "summarize", "article", stream)) == ["- first bullet"]
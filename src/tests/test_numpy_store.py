@@ -0,0 +1,84 @@
+# src/tests/test_numpy_store.py
+
+import numpy as np
+
+from database.numpy_store import NumpyStore
+from database.scripts.migrate_vectors import migrate, verify
+
+
+def clustered(n: int, dim: int = 32, clusters: int = 20, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return centers[rng.integers(clusters, size=n)] + rng.normal(scale=0.3, size=(n, dim))
+
+
+def test_upsert_and_query_return_chroma_shaped_results(tmp_path, word_embedding):
+    store = NumpyStore(str(tmp_path), word_embedding)
+    store.upsert(
+        ids=["a", "b", "c"],
+        documents=["cat dog", "car train", "fish boat"],
+        metadatas=[{"url": "u1"}, {"url": "u2"}, {"url": "u3"}],
+    )
+    # Replacing a chunk keeps its row
+    store.upsert(ids=["b"], documents=["car plane"], metadatas=[{"url": "u2", "chunk_index": 1}])
+    assert store.count() == 3
+
+    results = store.query(query_texts=["plane", "cat"], n_results=2)
+    assert [ids[0] for ids in results["ids"]] == ["b", "a"]
+    assert results["documents"][0][0] == "car plane"
+    assert results["metadatas"][0][0] == {"url": "u2", "chunk_index": 1}
+    assert all(distances == sorted(distances) for distances in results["distances"])
+    assert NumpyStore(str(tmp_path / "empty"), word_embedding).query(query_texts=["cat"]) == {
+        "ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]
+    }
+
+
+def test_other_instances_see_new_rows_after_the_file_grows(tmp_path):
+    writer = NumpyStore(str(tmp_path))
+    reader = NumpyStore(str(tmp_path))
+    vectors = clustered(3000)
+    ids = [f"chunk-{i}" for i in range(len(vectors))]
+    writer.upsert_embeddings(ids[:10], vectors[:10], ["doc"] * 10, [{}] * 10)
+    assert reader.count() == 10
+
+    # Past the initial capacity, so the writer remaps a larger file
+    writer.upsert_embeddings(ids[10:], vectors[10:], ["doc"] * 2990, [{}] * 2990)
+    results = reader.query(query_embeddings=vectors[[5, 2500]], n_results=1)
+    assert results["ids"] == [["chunk-5"], ["chunk-2500"]]
+
+
+def test_ivf_index_finds_neighbours_and_rows_added_after_the_build(tmp_path):
+    store = NumpyStore(str(tmp_path), probes=4)
+    vectors = clustered(4000)
+    store.upsert_embeddings([f"c{i}" for i in range(3000)], vectors[:3000], [""] * 3000, [{}] * 3000)
+    store.build_ivf(lists=16)
+    store.upsert_embeddings([f"c{i}" for i in range(3000, 4000)], vectors[3000:], [""] * 1000, [{}] * 1000)
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    exact = [[f"c{i}" for i in np.argsort(-(unit @ query))[:5]] for query in unit[:50]]
+    approximate = store.query(query_embeddings=vectors[:50], n_results=5)["ids"]
+    recall = np.mean([len(set(a) & set(e)) / 5 for a, e in zip(approximate, exact)])
+    assert recall >= 0.9
+    # Not part of any list yet, but still scanned
+    assert store.query(query_embeddings=vectors[3999], n_results=1)["ids"] == [["c3999"]]
+
+    # Another process picks the index up from disk
+    assert NumpyStore(str(tmp_path), probes=4).query(query_embeddings=vectors[:50], n_results=5)["ids"] == approximate
+
+
+def test_migration_copies_embeddings_without_reembedding(tmp_path, word_embedding):
+    source = NumpyStore(str(tmp_path / "source"), word_embedding)
+    source.upsert(
+        ids=[f"d{i}" for i in range(8)],
+        documents=["cat", "dog", "fish", "bird", "car", "train", "plane", "boat"],
+        metadatas=[{"index": i} for i in range(8)],
+    )
+
+    def no_embedding(texts):
+        raise AssertionError("migration must not re-embed")
+
+    target = NumpyStore(str(tmp_path / "target"), no_embedding)
+    assert migrate(source, target, batch_size=3) == 8
+    assert target.count() == 8
+    assert verify(source, target, samples=8) == 1.0
+    assert list(target.export())[0][3][:2] == [{"index": 0}, {"index": 1}]
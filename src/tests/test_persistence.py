@@ -1,6 +1,6 @@
 from models.database import ExtractedContent
 from services.persist.persist_to_db import persist_to_db
-from database.chroma_db import query_document, add_document
+from database.vector_db import flush_documents, query_document
 from database.pg_database import get_by_url
 
 sample_docs = [
@@ -55,6 +55,9 @@ def run_test():
         assert neon_row is not None, f"❌ {doc.url} was not saved to Neon!"
         print(f"✅ Found in Neon DB: {doc.url}")
 
+    # Vector writes are queued; write them before reading them back
+    flush_documents()
+
     print("\n🔍 Querying ChromaDB for: 'neural networks'\n")
     results = query_document(query_text="neural networks", n_results=3)
 
@@ -0,0 +1,157 @@
+# src/tests/test_pg_pool.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import psycopg2
+import pytest
+
+from database import pg_database
+from database.pg_pool import PgPool, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._row = None
+
+    def execute(self, sql, params=None):
+        time.sleep(0.01)  # network round trip
+        if self.conn.server.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        if sql.strip().startswith("INSERT"):
+            with self.conn.server.lock:
+                new = params[0] not in self.conn.server.rows
+                self.conn.server.rows.add(params[0])
+            self._row = (len(self.conn.server.rows),) if new else None
+        elif "FROM scraped_content" in sql:
+            # get_by_url's columns: id, url, summary, source, metadata, created_at, ...
+            self._row = (1, params[0], "s", None, None, datetime.now(timezone.utc), None, None, None, None, None)
+        else:
+            self._row = (1,)
+
+    def fetchone(self):
+        return self._row
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeServer:
+    """Stands in for Neon: tracks how many connections are open at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.open = 0
+        self.peak = 0
+        self.broken = False
+        self.rows = set()
+
+    def connect(self):
+        with self.lock:
+            self.open += 1
+            self.peak = max(self.peak, self.open)
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, server):
+        self.server = server
+        self.closed = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        if not self.closed:
+            self.closed = 1
+            with self.server.lock:
+                self.server.open -= 1
+
+
+def test_connection_count_stays_bounded_under_concurrent_ingestion(monkeypatch):
+    server = FakeServer()
+    pool = PgPool(min_size=2, max_size=4, connect_fn=server.connect)
+    monkeypatch.setattr(pg_database, "_pool", pool)
+
+    pool.warm_up()
+    assert server.open == 2
+
+    def ingest(i):
+        saved = pg_database.save_to_postgres(url=f"https://example.com/{i}", summary="s")
+        assert saved.created
+        return pg_database.get_by_url(f"https://example.com/{i}")
+
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        rows = list(executor.map(ingest, range(200)))
+
+    assert all(row.id == 1 and row.summary == "s" for row in rows)
+    assert server.peak <= 4
+    assert len(server.rows) == 200
+
+    stats = pool.stats()
+    assert stats["checkouts"] == 402  # warm-up + 2 per ingestion
+    assert stats["connects"] <= 4
+    assert stats["wait_max_ms"] > 0
+
+    pool.closeall()
+    assert server.open == 0
+
+
+def test_checkout_times_out_when_pool_is_exhausted():
+    server = FakeServer()
+    pool = PgPool(min_size=0, max_size=1, timeout=0.05, connect_fn=server.connect)
+
+    conn = pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+
+
+def test_stale_connections_are_replaced_after_failed_health_check():
+    server = FakeServer()
+    pool = PgPool(min_size=1, max_size=1, health_check_after=0, connect_fn=server.connect)
+    pool.warm_up()
+
+    stale = pool.getconn()
+    pool.putconn(stale)
+
+    server.broken = True
+    fresh = pool.getconn()
+
+    assert fresh is not stale
+    assert stale.closed
+    assert pool.stats()["health_check_failures"] == 1
+
+
+def test_save_to_postgres_reports_duplicates_in_one_round_trip(monkeypatch):
+    server = FakeServer()
+    statements = []
+    execute = FakeCursor.execute
+
+    def recording_execute(self, sql, params=None):
+        statements.append(sql)
+        return execute(self, sql, params)
+
+    monkeypatch.setattr(FakeCursor, "execute", recording_execute)
+    monkeypatch.setattr(pg_database, "_pool", PgPool(min_size=0, max_size=1, connect_fn=server.connect))
+
+    first = pg_database.save_to_postgres(url="https://example.com/a", summary="s")
+    second = pg_database.save_to_postgres(url="https://example.com/a", summary="s")
+
+    assert first.created and first.id == 1
+    assert not second.created and second.id is None
+    assert len(statements) == 2
+    assert all("ON CONFLICT (url) DO NOTHING" in sql for sql in statements)
@@ -0,0 +1,118 @@
+# src/tests/test_rate_limiter.py
+
+import asyncio
+
+import pytest
+
+from utils.rate_limiter import AdaptiveRateLimiter, is_throttle_error
+
+
+class SimClock:
+    """Simulated time: sleeping just advances the clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class ThrottledError(Exception):
+    code = 429
+
+
+class FakeUpstream:
+    """Accepts at most `capacity` requests in any one-second window, else 429."""
+
+    def __init__(self, clock, capacity):
+        self.clock = clock
+        self.capacity = capacity
+        self.accepted = []
+        self.rejected = 0
+
+    def __call__(self):
+        now = self.clock()
+        self.accepted = [t for t in self.accepted if now - t < 1.0]
+        if len(self.accepted) >= self.capacity:
+            self.rejected += 1
+            raise ThrottledError("429 Too Many Requests")
+        self.accepted.append(now)
+        self.clock.sleep(0.01)  # service time
+        return "ok"
+
+
+def test_limiter_converges_to_upstream_capacity():
+    clock = SimClock()
+    upstream = FakeUpstream(clock, capacity=10)
+    # Deliberately starts 3x too fast
+    limiter = AdaptiveRateLimiter("fake", rate=30, max_rate=60, clock=clock, sleep=clock.sleep)
+
+    successes, caller_errors = 0, 0
+    while clock.now < 120:
+        try:
+            limiter.call(upstream)
+            successes += 1
+        except ThrottledError:
+            caller_errors += 1
+
+    throughput = successes / clock.now
+    upstream_error_rate = upstream.rejected / (successes + upstream.rejected)
+
+    assert caller_errors == 0
+    assert upstream_error_rate < 0.05
+    assert throughput > 0.7 * upstream.capacity
+    assert limiter.stats()["rate_per_s"] <= 15
+
+
+def test_async_callers_share_the_budget():
+    limiter = AdaptiveRateLimiter("fake", rate=20, burst=1)
+    calls = []
+
+    async def upstream():
+        calls.append(asyncio.get_running_loop().time())
+        return "ok"
+
+    async def run():
+        return await asyncio.gather(*(limiter.call_async(upstream) for _ in range(6)))
+
+    assert asyncio.run(run()) == ["ok"] * 6
+    # Six requests at 20/s with a burst of one take about a quarter second
+    assert calls[-1] - calls[0] == pytest.approx(0.25, abs=0.06)
+    assert limiter.stats()["queue_depth"] == 0
+
+
+def test_non_throttle_errors_are_not_retried():
+    limiter = AdaptiveRateLimiter("fake", rate=1000)
+    attempts = []
+
+    def broken():
+        attempts.append(1)
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        limiter.call(broken)
+    assert len(attempts) == 1
+    assert limiter.stats()["throttled"] == 0
+
+
+def test_throttle_detection():
+    from google.genai.errors import ClientError
+    from requests import HTTPError, Response
+
+    def http_error(status):
+        response = Response()
+        response.status_code = status
+        return HTTPError("Unexpected error during scrape URL", response=response)
+
+    quota = {"error": {"code": 429, "message": "Quota exceeded", "status": "RESOURCE_EXHAUSTED"}}
+    assert is_throttle_error(ThrottledError())
+    assert is_throttle_error(ClientError(429, quota))
+    assert is_throttle_error(http_error(429))
+    assert not is_throttle_error(ClientError(404, {"error": {"code": 404, "message": "Not found"}}))
+    assert not is_throttle_error(http_error(500))
+    # Only the status counts, not what the message says
+    assert not is_throttle_error(RuntimeError("429 RESOURCE_EXHAUSTED. Quota exceeded"))
+    assert not is_throttle_error(ValueError("Failed to parse rate limit settings"))
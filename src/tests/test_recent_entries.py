@@ -0,0 +1,83 @@
+# src/tests/test_recent_entries.py
+
+from datetime import datetime, timezone
+
+import pytest
+
+from database.pg_database import build_recent_entries_query
+from database.scripts.migrate_to_neon_db import MIGRATIONS, Migration, apply_migrations
+from models.database import EntryCursor
+
+
+def test_keyset_query_filters_and_seeks():
+    cursor = EntryCursor(created_at=datetime(2026, 1, 1, tzinfo=timezone.utc), id=7)
+    sql, params = build_recent_entries_query(20, guild_id=123, before=cursor)
+
+    assert "guild_id = %(guild_id)s" in sql and "channel_id = %(channel_id)s" not in sql
+    assert "(created_at, id) < (%(before_created_at)s, %(before_id)s)" in sql
+    assert "OFFSET" not in sql
+    assert params == {"limit": 20, "guild_id": 123, "before_created_at": cursor.created_at, "before_id": 7}
+
+    sql, params = build_recent_entries_query(10)
+    assert "WHERE" not in sql.split("ORDER BY")[0] and params == {"limit": 10}
+
+
+class RecordingCursor:
+    def __init__(self, applied):
+        self.applied = applied
+        self.statements = []
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(" ".join(sql.split()))
+        if sql.startswith("SELECT version"):
+            self._rows = [(version,) for version in self.applied]
+        elif sql.startswith("INSERT INTO schema_migrations"):
+            self.applied.append(params[0])
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    def __init__(self, applied):
+        self.autocommit = False
+        self.cur = RecordingCursor(applied)
+
+    def cursor(self):
+        return self.cur
+
+
+def test_migrations_apply_once_in_order():
+    assert [m.version for m in MIGRATIONS] == sorted({m.version for m in MIGRATIONS})
+
+    applied = [1]
+    conn = RecordingConnection(applied)
+    assert apply_migrations(conn, MIGRATIONS[:3]) == [2, 3]
+    assert conn.autocommit
+    statements = conn.cur.statements
+    # Concurrent index builds run outside a transaction; the column change inside one
+    alter = next(i for i, s in enumerate(statements) if s.startswith("ALTER TABLE"))
+    assert statements[alter - 1] == "BEGIN" and statements[alter + 2] == "COMMIT"
+    assert not any(s == "BEGIN" for s in statements[alter + 3:])
+
+    conn = RecordingConnection(applied)
+    assert apply_migrations(conn, MIGRATIONS[:3]) == []
+
+
+def test_failed_migration_rolls_back():
+    class FailingCursor(RecordingCursor):
+        def execute(self, sql, params=None):
+            super().execute(sql, params)
+            if "boom" in sql:
+                raise RuntimeError("syntax error")
+
+    conn = RecordingConnection([])
+    conn.cur = FailingCursor([])
+    with pytest.raises(RuntimeError):
+        apply_migrations(conn, [Migration(version=1, name="bad", statements=["SELECT boom"])])
+    assert conn.cur.statements[-2:] == ["ROLLBACK", "SELECT pg_advisory_unlock(%s)"]
+    assert conn.cur.applied == []
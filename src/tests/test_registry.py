@@ -0,0 +1,64 @@
+# src/tests/test_registry.py
+
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from utils.registry import ServiceRegistry
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_services_are_created_once_on_first_use():
+    registry = ServiceRegistry()
+    created = []
+    registry.register("client", lambda: created.append(1) or object())
+    assert not registry.ready("client") and created == []
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("client"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert created == [1]
+    assert len({id(result) for result in results}) == 1
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+def test_failed_factories_are_retried_and_warm_up_skips_them():
+    registry = ServiceRegistry()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("server not up yet")
+        return "client"
+
+    warmed = []
+    registry.register("flaky", flaky)
+    registry.register("collection", lambda: registry.get("flaky") + "/collection", warm=warmed.append)
+
+    timings = registry.warm_up()
+    assert set(timings) == {"collection"}  # built on its behalf once flaky's first attempt failed
+    assert warmed == ["client/collection"]
+    assert registry.get("flaky") == "client" and len(attempts) == 2
+
+
+def test_importing_clients_needs_no_credentials_or_heavy_imports():
+    code = (
+        "import sys\n"
+        "import database.vector_db, database.chroma_db, database.numpy_store, services.embed.embedder, services.llm.gemini, adapters.scrapers.firecrawl_adapter\n"
+        "print(sorted(m for m in ('chromadb', 'google.genai', 'firecrawl', 'onnxruntime', 'tokenizers') if m in sys.modules))\n"
+    )
+    env = {key: value for key, value in os.environ.items() if not key.endswith("_API_KEY")}
+    env["PYTHONPATH"] = SRC
+    proc = subprocess.run([sys.executable, "-c", code], cwd=SRC, env=env, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == "[]"
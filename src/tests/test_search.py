@@ -0,0 +1,31 @@
+# src/tests/test_search.py
+
+from services.search import hybrid_search, reciprocal_rank_fusion
+
+
+def fake_text_search(query, n):
+    rows = [("https://a", "A summary", 0.9), ("https://b", "B summary", 0.5), ("https://c", None, 0.1)]
+    return rows[:n]
+
+
+def fake_vector_search(query, n):
+    ids = ["https://b", "https://d", "https://a"][:n]
+    return {"ids": [ids], "documents": [[f"{url} chunk" for url in ids]]}
+
+
+def test_rrf_rewards_agreement():
+    fused = reciprocal_rank_fusion({"text": ["a", "b", "c"], "vector": ["b", "d", "a"]}, k=60)
+    urls = [url for url, _ in fused]
+    assert urls[:2] == ["b", "a"]
+    assert set(urls) == {"a", "b", "c", "d"}
+
+
+def test_hybrid_search_merges_and_paginates():
+    first = hybrid_search("query", fake_text_search, fake_vector_search, page=0, page_size=2)
+    second = hybrid_search("query", fake_text_search, fake_vector_search, page=1, page_size=2)
+
+    assert [hit.url for hit in first] == ["https://b", "https://a"]
+    assert first[0].matched_by == ["text", "vector"]
+    assert first[0].snippet == "B summary"
+    assert {hit.url for hit in second} == {"https://c", "https://d"}
+    assert next(hit for hit in second if hit.url == "https://d").snippet == "https://d chunk"
@@ -0,0 +1,84 @@
+# src/tests/test_telemetry.py
+
+import json
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from utils import telemetry
+from utils.telemetry import StageStats, format_stats, record_usage, stage, traced
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def fresh_stats(monkeypatch):
+    recorded = StageStats(window=100)
+    monkeypatch.setattr(telemetry, "stats", recorded)
+    return recorded
+
+
+def test_stages_record_durations_and_errors(fresh_stats):
+    for _ in range(3):
+        with stage("scrape", scraper_type="web"):
+            pass
+    with pytest.raises(ValueError):
+        with stage("scrape"):
+            raise ValueError("boom")
+
+    @traced("postgres.save")
+    def save(value):
+        return value * 2
+
+    assert save(21) == 42
+    summaries = {s.stage: s for s in fresh_stats.snapshot()}
+    assert summaries["scrape"].count == 4 and summaries["scrape"].errors == 1
+    assert summaries["postgres.save"].count == 1 and summaries["postgres.save"].errors == 0
+
+
+def test_percentiles_come_from_the_rolling_window():
+    recorded = StageStats(window=100)
+    for ms in range(1, 201):
+        recorded.record("persist", float(ms))
+    (summary,) = recorded.snapshot()
+    # Only the last 100 samples (101..200) are kept
+    assert summary.count == 200
+    assert summary.p50_ms == 151 and summary.p95_ms == 196 and summary.max_ms == 200
+
+
+def test_token_usage_is_added_to_the_stage(fresh_stats):
+    usage = SimpleNamespace(prompt_token_count=120, candidates_token_count=30)
+    for _ in range(2):
+        with stage("gemini.text") as span:
+            record_usage(span, "gemini.text", "gemini-2.0-flash", usage)
+    with stage("gemini.text") as span:
+        record_usage(span, "gemini.text", "gemini-2.0-flash", None)
+
+    (summary,) = fresh_stats.snapshot()
+    assert (summary.prompt_tokens, summary.output_tokens) == (240, 60)
+    assert "240/60" in format_stats([summary])
+
+
+def test_file_exporter_writes_spans(tmp_path):
+    path = tmp_path / "telemetry.jsonl"
+    code = (
+        "from utils.telemetry import setup_telemetry, shutdown_telemetry, stage\n"
+        f"setup_telemetry('file', {str(path)!r})\n"
+        "with stage('ingest', url='https://example.com'):\n"
+        "    with stage('scrape'):\n"
+        "        pass\n"
+        "shutdown_telemetry()\n"
+    )
+    env = dict(os.environ, PYTHONPATH=SRC)
+    proc = subprocess.run([sys.executable, "-c", code], cwd=SRC, env=env, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+
+    # Metric exports share the file; spans are the records with a span context
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    spans = [record for record in records if "context" in record]
+    by_name = {span["name"]: span for span in spans}
+    assert set(by_name) == {"ingest", "scrape"}
+    assert by_name["scrape"]["parent_id"] == by_name["ingest"]["context"]["span_id"]
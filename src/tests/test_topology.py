@@ -0,0 +1,35 @@
+# src/tests/test_topology.py
+
+import pytest
+
+from services.topology import GATEWAY, INGEST, STANDALONE, Topology
+
+
+def test_single_topology_is_one_standalone_process():
+    specs = Topology().processes()
+    assert [(spec.role, spec.shard_ids) for spec in specs] == [(STANDALONE, None)]
+
+
+def test_split_topology_spreads_shards_over_gateways():
+    topology = Topology(mode="split", shard_count=5, gateway_processes=2, ingest_processes=3, chroma_mode="http")
+    specs = topology.processes()
+
+    gateways = [spec for spec in specs if spec.role == GATEWAY]
+    assert [spec.shard_ids for spec in gateways] == [[0, 1], [2, 3, 4]]
+    assert [spec.name for spec in specs if spec.role == INGEST] == ["ingest-0", "ingest-1", "ingest-2"]
+    env = gateways[1].environ()
+    assert env["SHARD_IDS"] == "2,3,4" and env["SHARD_COUNT"] == "5"
+    assert len({spec.environ()["CHROMA_WAL_PATH"] for spec in specs}) == len(specs)
+    # The NumPy vector store is shared through files, so it needs no Chroma server
+    Topology(mode="split", chroma_mode="local", vector_backend="numpy").check()
+
+
+@pytest.mark.parametrize("topology", [
+    Topology(mode="split", chroma_mode="local"),
+    Topology(mode="split", chroma_mode="http", gateway_processes=3, shard_count=2),
+    Topology(mode="split", chroma_mode="http", ingest_processes=0),
+    Topology(mode="cluster"),
+])
+def test_unworkable_topologies_are_rejected(topology):
+    with pytest.raises(ValueError):
+        topology.check()
@@ -0,0 +1,62 @@
+# utils/canonical_url.py
+
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that only track where a click came from. Not "ref":
+# GitHub uses ?ref=<branch> to pick which version of a file to show.
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref_src", "ref_url", "si", "feature", "_hsenc", "_hsmi", "spm",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+YOUTUBE_HOSTS = {"youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com"}
+
+
+def _is_tracking(key: str) -> bool:
+    key = key.lower()
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES)
+
+
+def _youtube_watch_url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalizes a URL so reposts of the same link map to one key.
+
+    Lowercases scheme and host, drops fragments, default ports and tracking
+    parameters, sorts the remaining query, and rewrites youtu.be / shorts /
+    mobile YouTube links to https://www.youtube.com/watch?v=<id>.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    path = parts.path or "/"
+
+    if host == "youtu.be":
+        video_id = path.strip("/").split("/")[0]
+        if video_id:
+            return _youtube_watch_url(video_id)
+    if host in YOUTUBE_HOSTS:
+        if path.startswith("/shorts/") or path.startswith("/live/"):
+            video_id = path.split("/")[2]
+            if video_id:
+                return _youtube_watch_url(video_id)
+        if path == "/watch":
+            video_id = dict(parse_qsl(parts.query)).get("v")
+            if video_id:
+                return _youtube_watch_url(video_id)
+
+    netloc = host
+    if parts.port and not (scheme == "http" and parts.port == 80) and not (scheme == "https" and parts.port == 443):
+        netloc = f"{host}:{parts.port}"
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(key)
+    )
+
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
@@ -0,0 +1,107 @@
+# utils/chunk_text.py
+
+import os
+import re
+from typing import Literal
+
+# "markdown" splits on headings first, "window" only uses sliding windows
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "markdown")
+# Approximate tokens (whitespace-separated words) per chunk. The default
+# embedding model (all-MiniLM-L6-v2) stops reading at 256 word pieces.
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "200"))
+# Tokens shared between consecutive windows
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "40"))
+
+HEADING_RE = re.compile(r"^#{1,6}\s", re.MULTILINE)
+
+ChunkStrategy = Literal["markdown", "window"]
+
+
+def chunk_id(url: str, index: int) -> str:
+    return f"{url}#{index}"
+
+
+def _windows(words: list[str], size: int, overlap: int) -> list[str]:
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    step = max(size - overlap, 1)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + size]))
+        if start + size >= len(words):
+            break
+    return chunks
+
+
+def _sections(text: str) -> list[str]:
+    starts = [m.start() for m in HEADING_RE.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    bounds = starts + [len(text)]
+    return [text[a:b].strip() for a, b in zip(bounds, bounds[1:]) if text[a:b].strip()]
+
+
+def chunk_text(
+    text: str,
+    strategy: ChunkStrategy = CHUNK_STRATEGY,
+    size: int = CHUNK_TOKENS,
+    overlap: int = CHUNK_OVERLAP,
+) -> list[str]:
+    """
+    Splits a page into chunks of at most `size` tokens for embedding.
+
+    The markdown strategy keeps heading sections together, merging short
+    neighbours up to the budget and windowing sections that are too long.
+    """
+    if strategy == "window":
+        return _windows(text.split(), size, overlap)
+    if strategy != "markdown":
+        raise ValueError(f"Unknown chunk strategy: {strategy}")
+
+    chunks: list[str] = []
+    current: list[str] = []
+    for section in _sections(text):
+        words = section.split()
+        if len(words) > size:
+            if current:
+                chunks.append(" ".join(current))
+                current = []
+            chunks.extend(_windows(words, size, overlap))
+        elif len(current) + len(words) > size:
+            chunks.append(" ".join(current))
+            current = words
+        else:
+            current = current + words
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def collapse_to_parents(results: dict, n_results: int) -> dict:
+    """
+    Folds chunk-level Chroma query results back to one hit per parent URL.
+
+    Keeps the best (first) chunk for each parent and returns the same shape
+    as `collection.query`, with parent URLs as ids.
+    """
+    collapsed = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+    seen = set()
+
+    ids = results.get("ids", [[]])[0]
+    documents = (results.get("documents") or [[None] * len(ids)])[0]
+    metadatas = (results.get("metadatas") or [[None] * len(ids)])[0]
+    distances = (results.get("distances") or [[None] * len(ids)])[0]
+
+    for doc_id, document, metadata, distance in zip(ids, documents, metadatas, distances):
+        parent = (metadata or {}).get("parent_url") or (metadata or {}).get("url") or doc_id
+        if parent in seen:
+            continue
+        seen.add(parent)
+        collapsed["ids"][0].append(parent)
+        collapsed["documents"][0].append(document)
+        collapsed["metadatas"][0].append(metadata)
+        collapsed["distances"][0].append(distance)
+        if len(seen) == n_results:
+            break
+
+    return collapsed
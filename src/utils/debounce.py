@@ -0,0 +1,64 @@
+# utils/debounce.py
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Debouncer:
+    """
+    Coalesces bursts of updates into at most one `flush()` per `interval`.
+
+    Used to turn a stream of partial text into Discord message edits without
+    tripping the edit rate limit: `touch()` marks new content, the first one
+    flushes straight away, and later ones wait until `interval` has passed
+    since the previous flush. Only the latest state is ever sent.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[], Awaitable[None]],
+        interval: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.flush = flush
+        self.interval = interval
+        self.clock = clock
+        self.flushes = 0
+        self.first_flush_at: Optional[float] = None
+        self._dirty = False
+        self._closed = False
+        self._last_flush = float("-inf")
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self):
+        if self._closed:
+            return
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stops pending flushes; later touches are ignored. The caller sends the final state."""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self):
+        while self._dirty and not self._closed:
+            delay = self._last_flush + self.interval - self.clock()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._dirty = False
+            self._last_flush = self.clock()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Debounced flush failed: {e}")
+            self.flushes += 1
+            if self.first_flush_at is None:
+                self.first_flush_at = self.clock()
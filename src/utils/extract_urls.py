@@ -0,0 +1,8 @@
+# utils/extract_urls.py
+
+import re
+
+URL_RE = re.compile(r'https?://[^\s]+')
+
+def extract_urls(text: str) -> list[str]:
+    return URL_RE.findall(text)
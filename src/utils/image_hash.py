@@ -0,0 +1,110 @@
+# utils/image_hash.py
+
+import io
+from array import array
+from itertools import combinations
+from typing import Optional
+
+from PIL import Image
+
+HASH_BITS = 64
+# Hashes with fewer set (or unset) bits than this come from near-uniform
+# images, which all look alike to dHash and must not be matched
+MIN_FEATURE_BITS = 8
+
+
+def dhash(data: bytes, size: int = 8) -> Optional[int]:
+    """
+    64-bit difference hash of an encoded image, or None if PIL can't decode
+    it (HEIC or AVIF without a plugin, say).
+
+    The image is reduced to a (size + 1) x size grayscale thumbnail and each
+    bit records whether a pixel is brighter than its right-hand neighbour,
+    so re-encoding and rescaling barely change the hash.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Exception:
+        return None
+    # Let JPEG decode at 1/8 scale; the hash only needs a few pixels
+    image.draft("L", (size * 8, size * 8))
+    if getattr(image, "is_animated", False):
+        image.seek(0)
+    pixels = image.convert("L").resize((size + 1, size), Image.Resampling.BOX).tobytes()
+
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def is_featureless(value: int) -> bool:
+    ones = value.bit_count()
+    return ones < MIN_FEATURE_BITS or ones > HASH_BITS - MIN_FEATURE_BITS
+
+
+class MultiIndexHash:
+    """
+    Multi-index hashing for Hamming-radius lookups over 64-bit hashes.
+
+    Each hash is split into `chunks` substrings, each indexed in its own
+    table. Two hashes within `max_distance` bits must agree to within
+    max_distance // chunks bits on at least one substring (pigeonhole), so a
+    query only probes the buckets near its own substrings and verifies the
+    few candidates found there, instead of scanning every stored hash.
+    """
+
+    def __init__(self, max_distance: int = 6, chunks: int = 4):
+        if HASH_BITS % chunks:
+            raise ValueError(f"chunks must divide {HASH_BITS}")
+        self.max_distance = max_distance
+        self.chunks = chunks
+        self.chunk_bits = HASH_BITS // chunks
+        self._mask = (1 << self.chunk_bits) - 1
+        self._tables: list[dict[int, array]] = [{} for _ in range(chunks)]
+        # Every XOR mask within the per-substring radius, nearest first
+        radius = max_distance // chunks
+        self._probes = [0] + [
+            sum(1 << bit for bit in flipped)
+            for flips in range(1, radius + 1)
+            for flipped in combinations(range(self.chunk_bits), flips)
+        ]
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _substrings(self, value: int):
+        for i in range(self.chunks):
+            yield i, (value >> (i * self.chunk_bits)) & self._mask
+
+    def add(self, value: int):
+        for i, key in self._substrings(value):
+            bucket = self._tables[i].get(key)
+            if bucket is None:
+                bucket = self._tables[i][key] = array("Q")
+            bucket.append(value)
+        self.size += 1
+
+    def nearest(self, value: int) -> Optional[tuple[int, int]]:
+        """Returns (hash, distance) of the closest stored hash within range, or None."""
+        best, best_distance = None, self.max_distance + 1
+        for i, key in self._substrings(value):
+            table = self._tables[i]
+            for probe in self._probes:
+                bucket = table.get(key ^ probe)
+                if bucket is None:
+                    continue
+                for candidate in bucket:
+                    distance = (candidate ^ value).bit_count()
+                    if distance < best_distance:
+                        best, best_distance = candidate, distance
+                        if distance == 0:
+                            return best, 0
+        return (best, best_distance) if best is not None else None
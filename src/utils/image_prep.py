@@ -0,0 +1,125 @@
+# utils/image_prep.py
+
+import io
+import logging
+import os
+from typing import Optional
+
+import requests
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Largest image body we are willing to download, in bytes
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(20 * 1024 * 1024)))
+# Seconds to wait for the connection and then between received chunks
+IMAGE_CONNECT_TIMEOUT = float(os.getenv("IMAGE_CONNECT_TIMEOUT", "5"))
+IMAGE_READ_TIMEOUT = float(os.getenv("IMAGE_READ_TIMEOUT", "30"))
+# Longest side, in pixels, of the image sent to Gemini vision. Gemini tiles
+# images into 768px blocks, so anything larger only costs extra tokens.
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1536"))
+# JPEG quality used when an image has to be re-encoded
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Leading bytes of the formats Gemini vision accepts
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+# Formats Gemini takes as-is; anything else is re-encoded
+PASSTHROUGH_TYPES = {"image/png", "image/jpeg", "image/webp", "image/heic", "image/heif"}
+# Lossless sources are mostly screenshots and diagrams; they stay PNG so
+# small text survives for OCR
+LOSSLESS_TYPES = {"image/png", "image/gif", "image/bmp"}
+
+
+def sniff_mime_type(data: bytes) -> Optional[str]:
+    """Detects the image type from its magic bytes, ignoring what the server claimed."""
+    for signature, mime_type in SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:12] in (b"ftypheic", b"ftypheix", b"ftypmif1"):
+        return "image/heic"
+    if data[4:12] in (b"ftypavif", b"ftypavis"):
+        return "image/avif"
+    if data.startswith(b"BM"):
+        return "image/bmp"
+    return None
+
+
+def download_image(
+    url: str,
+    max_bytes: int = IMAGE_MAX_BYTES,
+    timeout: tuple[float, float] = (IMAGE_CONNECT_TIMEOUT, IMAGE_READ_TIMEOUT),
+) -> bytes:
+    """
+    Streams an image into memory, giving up once it passes `max_bytes`.
+
+    Raises ValueError for bodies that are too large, so the job queue does
+    not retry them; network errors and timeouts propagate as-is. This is the
+    only permanent error on the image path.
+    """
+    with requests.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        declared = response.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise ValueError(f"Image is {int(declared)} bytes, over the {max_bytes} byte limit")
+
+        buffer = bytearray()
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+            buffer += chunk
+            if len(buffer) > max_bytes:
+                raise ValueError(f"Image exceeds the {max_bytes} byte limit")
+    return bytes(buffer)
+
+
+def prepare_for_vision(
+    data: bytes,
+    max_side: int = IMAGE_MAX_SIDE,
+    quality: int = IMAGE_JPEG_QUALITY,
+) -> tuple[bytes, str]:
+    """
+    Returns (bytes, mime_type) ready for Gemini vision.
+
+    Images that already fit within `max_side` in a supported format pass
+    through untouched. Larger ones are downscaled and re-encoded: PNG for
+    lossless or transparent sources, JPEG for photos. Data PIL can't decode
+    (HEIC or AVIF without a plugin, say) is sent as it is, for Gemini to read
+    or reject.
+    """
+    mime_type = sniff_mime_type(data)
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Exception as e:
+        logger.warning(f"Sending undecodable {mime_type or 'unknown'} image as-is: {e}")
+        # describe_image's own default when the type is unknown
+        return data, mime_type or "image/png"
+
+    if mime_type in PASSTHROUGH_TYPES and max(image.size) <= max_side:
+        return data, mime_type
+
+    # JPEG can decode straight to a reduced scale, which is far cheaper than
+    # decoding full size and resampling
+    scale = max_side / max(image.size)
+    image.draft("RGB", (int(image.width * scale), int(image.height * scale)))
+    if getattr(image, "is_animated", False):
+        image.seek(0)
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    # Palette and other exotic modes only resample with nearest-neighbour
+    target_mode = "RGBA" if has_alpha else "RGB"
+    if image.mode != target_mode:
+        image = image.convert(target_mode)
+    image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+    out = io.BytesIO()
+    if has_alpha or mime_type in LOSSLESS_TYPES:
+        image.save(out, format="PNG")
+        return out.getvalue(), "image/png"
+    image.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue(), "image/jpeg"
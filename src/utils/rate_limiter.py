@@ -0,0 +1,196 @@
+# utils/rate_limiter.py
+
+import asyncio
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+try:
+    from google.api_core.exceptions import ResourceExhausted
+except ImportError:  # only installed with the older google-generativeai SDK
+    ResourceExhausted = None
+
+T = TypeVar("T")
+
+# Times a throttled call is retried (after the limiter slows down) before the
+# error reaches the caller
+RATE_LIMIT_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", "3"))
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    """
+    True for HTTP 429 / quota errors, judged by exception type and status
+    code only: google-genai's APIError.code, google.api_core's
+    ResourceExhausted, and the response of requests' HTTPError (Firecrawl).
+    """
+    if ResourceExhausted is not None and isinstance(error, ResourceExhausted):
+        return True
+    for attr in ("code", "status_code"):
+        if getattr(error, attr, None) == 429:
+            return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket whose refill rate adapts to what the upstream accepts.
+
+    Each success grows the rate by a factor of (1 + `increase`), so probing
+    costs the same share of requests at 10 RPM as at 10 RPS. Each 429 cuts it
+    by `decrease` and holds new requests for `pause` seconds; rejections of
+    requests sent before the last cut are ignored, so a burst of in-flight
+    429s only slows the limiter once. Callers reserve a token and sleep until
+    it is theirs, which keeps requests evenly spaced and FIFO for both threads
+    and coroutines.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        min_rate: float = 0.1,
+        max_rate: Optional[float] = None,
+        burst: float = 1.0,
+        increase: float = 0.01,
+        decrease: float = 0.7,
+        cooldown: float = 1.0,
+        pause: float = 0.5,
+        max_retries: int = RATE_LIMIT_RETRIES,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.name = name
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate * 4
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.pause = pause
+        self.max_retries = max_retries
+        self.clock = clock
+        self.sleep = sleep
+
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._updated = clock()
+        self._last_decrease = float("-inf")
+
+        self.waiting = 0
+        self.successes = 0
+        self.throttled = 0
+
+    def _reserve(self) -> float:
+        """Takes a token, possibly on credit, and returns how long to wait for it."""
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            with self._lock:
+                self.waiting += 1
+            try:
+                self.sleep(delay)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+
+    async def acquire_async(self):
+        delay = self._reserve()
+        if delay > 0:
+            with self._lock:
+                self.waiting += 1
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+
+    def on_success(self):
+        with self._lock:
+            self.successes += 1
+            self.rate = min(self.max_rate, self.rate * (1 + self.increase))
+
+    def on_throttle(self, issued_at: Optional[float] = None):
+        """
+        Records a 429. `issued_at` is the clock time the rejected request was
+        sent; without it, decreases are spaced at least `cooldown` apart.
+        """
+        with self._lock:
+            self.throttled += 1
+            now = self.clock()
+            if issued_at is not None:
+                if issued_at < self._last_decrease:
+                    return
+            elif now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            # Drop any saved-up burst and hold new requests for `pause` seconds
+            # so the upstream's window can drain before we probe again
+            self._tokens = min(self._tokens, 0.0) - self.pause * self.rate
+
+    def call(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Runs `fn` under the limiter, retrying throttled attempts."""
+        for attempt in range(self.max_retries + 1):
+            self.acquire()
+            issued_at = self.clock()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if is_throttle_error(e):
+                    self.on_throttle(issued_at)
+                    if attempt < self.max_retries:
+                        continue
+                raise
+            self.on_success()
+            return result
+
+    async def call_async(self, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async()
+            issued_at = self.clock()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                if is_throttle_error(e):
+                    self.on_throttle(issued_at)
+                    if attempt < self.max_retries:
+                        continue
+                raise
+            self.on_success()
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rate_per_s": round(self.rate, 3),
+                "queue_depth": self.waiting,
+                "successes": self.successes,
+                "throttled": self.throttled,
+            }
+
+
+# One limiter per upstream quota, shared by every caller in the process.
+# Starting rates are requests per second.
+limiters = {
+    "gemini_text": AdaptiveRateLimiter("gemini_text", rate=float(os.getenv("GEMINI_TEXT_RPS", "1.0"))),
+    "gemini_vision": AdaptiveRateLimiter("gemini_vision", rate=float(os.getenv("GEMINI_VISION_RPS", "0.5"))),
+    "firecrawl": AdaptiveRateLimiter("firecrawl", rate=float(os.getenv("FIRECRAWL_RPS", "0.5"))),
+}
+
+
+def get_limiter(name: str) -> AdaptiveRateLimiter:
+    return limiters[name]
+
+
+def limiter_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in limiters.items()}
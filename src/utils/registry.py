@@ -0,0 +1,84 @@
+# utils/registry.py
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """
+    Clients that are expensive to build (Gemini, Chroma, Firecrawl), created
+    on first use instead of at import time.
+
+    Modules register a factory under a name and call `get(name)` where they
+    used to touch a module-level client. The factory runs once; if it raises,
+    the next `get` tries again. `warm_up` builds everything registered ahead
+    of time, e.g. in the background once the bot is connected, and runs each
+    service's optional `warm` hook (loading a model, opening a connection).
+    """
+
+    def __init__(self):
+        self._factories: dict[str, Callable[[], Any]] = {}
+        self._warmers: dict[str, Callable[[Any], None]] = {}
+        self._instances: dict[str, Any] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.timings: dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], warm: Optional[Callable[[Any], None]] = None):
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+            if warm is not None:
+                self._warmers[name] = warm
+
+    def get(self, name: str) -> Any:
+        # Fast path once built; no lock needed for a dict read
+        if name in self._instances:
+            return self._instances[name]
+        with self._lock:
+            if name not in self._factories:
+                raise KeyError(f"No service registered as {name!r}")
+            lock = self._locks[name]
+        # One lock per service, so a factory can get() the services it needs
+        with lock:
+            if name not in self._instances:
+                started = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                self.timings[name] = time.perf_counter() - started
+                logger.info(f"Created {name} in {self.timings[name] * 1000:.0f}ms")
+        return self._instances[name]
+
+    def ready(self, name: str) -> bool:
+        return name in self._instances
+
+    def names(self) -> list[str]:
+        with self._lock:
+            return list(self._factories)
+
+    def warm_up(self, names: Optional[list[str]] = None) -> dict[str, float]:
+        """Creates and warms the services (all registered ones by default); returns seconds per service."""
+        timings = {}
+        for name in names or self.names():
+            started = time.perf_counter()
+            try:
+                service = self.get(name)
+                if name in self._warmers:
+                    self._warmers[name](service)
+            except Exception as e:
+                logger.warning(f"Warm-up of {name} failed, it will be retried on first use: {e}")
+                continue
+            timings[name] = time.perf_counter() - started
+        logger.info("Warm-up: " + ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in timings.items()))
+        return timings
+
+    def reset(self, name: str):
+        """Forgets a built instance so the next `get` creates a new one."""
+        self._instances.pop(name, None)
+
+
+# Process-wide registry
+services = ServiceRegistry()
@@ -0,0 +1,205 @@
+# utils/telemetry.py
+
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+from opentelemetry import metrics, trace
+from opentelemetry.trace import Status, StatusCode
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# Where spans and metrics go: "none" (only the in-process /stats window),
+# "console" (stdout), "file" (JSON lines in TELEMETRY_FILE) or "otlp"
+# (the collector at OTEL_EXPORTER_OTLP_ENDPOINT)
+TELEMETRY_EXPORTER = os.getenv("TELEMETRY_EXPORTER", "none")
+TELEMETRY_FILE = os.getenv("TELEMETRY_FILE", "_data/telemetry.jsonl")
+# Seconds between metric exports
+TELEMETRY_EXPORT_INTERVAL = float(os.getenv("TELEMETRY_EXPORT_INTERVAL", "60"))
+# Recent durations kept per stage for the p50/p95 in /stats
+TELEMETRY_WINDOW = int(os.getenv("TELEMETRY_WINDOW", "1000"))
+
+SERVICE_NAME = "discord-knowledge-bot"
+
+# API objects are proxies until setup_telemetry() installs the SDK, and
+# no-ops if it never does
+tracer = trace.get_tracer(SERVICE_NAME)
+meter = metrics.get_meter(SERVICE_NAME)
+stage_duration = meter.create_histogram(
+    "stage.duration", unit="ms", description="Wall-clock time per pipeline stage"
+)
+gemini_tokens = meter.create_counter(
+    "gemini.tokens", unit="{token}", description="Gemini tokens by model and kind (prompt/output)"
+)
+
+
+class StageSummary(BaseModel):
+    stage: str
+    count: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    max_ms: float
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class StageStats:
+    """Rolling window of recent stage durations and token totals, for /stats."""
+
+    def __init__(self, window: int = TELEMETRY_WINDOW):
+        self.window = window
+        self._durations: dict[str, deque] = defaultdict(lambda: deque(maxlen=self.window))
+        self._counts: dict[str, int] = defaultdict(int)
+        self._errors: dict[str, int] = defaultdict(int)
+        self._tokens: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, ms: float, error: bool = False):
+        with self._lock:
+            self._durations[stage].append(ms)
+            self._counts[stage] += 1
+            self._errors[stage] += error
+
+    def add_tokens(self, stage: str, prompt: int, output: int):
+        with self._lock:
+            self._tokens[stage][0] += prompt
+            self._tokens[stage][1] += output
+
+    def snapshot(self) -> list[StageSummary]:
+        with self._lock:
+            summaries = []
+            for stage, durations in sorted(self._durations.items()):
+                ordered = sorted(durations)
+                prompt, output = self._tokens.get(stage, (0, 0))
+                summaries.append(StageSummary(
+                    stage=stage,
+                    count=self._counts[stage],
+                    errors=self._errors[stage],
+                    p50_ms=_percentile(ordered, 0.50),
+                    p95_ms=_percentile(ordered, 0.95),
+                    max_ms=ordered[-1],
+                    prompt_tokens=prompt,
+                    output_tokens=output,
+                ))
+            return summaries
+
+
+stats = StageStats()
+
+
+@contextmanager
+def stage(name: str, attach: bool = True, **attributes):
+    """
+    Times a block as one pipeline stage: a span named `name`, a
+    `stage.duration` histogram sample and an entry in the /stats window.
+
+    Pass attach=False inside generators, which may be resumed from another
+    context than the one that started them; the span is then not made
+    current, so it can't be a parent.
+    """
+    span = tracer.start_span(name, attributes=attributes)
+    started = time.perf_counter()
+    error = False
+    try:
+        if attach:
+            with trace.use_span(span):
+                yield span
+        else:
+            yield span
+    except Exception as e:
+        error = True
+        span.record_exception(e)
+        span.set_status(Status(StatusCode.ERROR, str(e)[:200]))
+        raise
+    finally:
+        ms = (time.perf_counter() - started) * 1000
+        span.end()
+        stage_duration.record(ms, {"stage": name, "error": error})
+        stats.record(name, ms, error)
+
+
+def traced(name: str):
+    """Decorator form of `stage`."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_usage(span, stage_name: str, model: str, usage) -> None:
+    """Adds token counts from a Gemini response's usage_metadata to the span and metrics."""
+    if usage is None:
+        return
+    prompt = usage.prompt_token_count or 0
+    output = usage.candidates_token_count or 0
+    span.set_attribute("gemini.model", model)
+    span.set_attribute("gemini.prompt_tokens", prompt)
+    span.set_attribute("gemini.output_tokens", output)
+    gemini_tokens.add(prompt, {"model": model, "kind": "prompt"})
+    gemini_tokens.add(output, {"model": model, "kind": "output"})
+    stats.add_tokens(stage_name, prompt, output)
+
+
+def format_stats(summaries: list[StageSummary]) -> str:
+    """Fixed-width table of stage timings for a Discord code block."""
+    lines = [f"{'stage':<22}{'n':>6}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'tokens in/out':>16}"]
+    for s in summaries:
+        tokens = f"{s.prompt_tokens}/{s.output_tokens}" if s.prompt_tokens or s.output_tokens else ""
+        lines.append(f"{s.stage[:21]:<22}{s.count:>6}{s.errors:>5}{s.p50_ms:>9.0f}{s.p95_ms:>9.0f}{tokens:>16}")
+    return "\n".join(lines)
+
+
+def setup_telemetry(exporter: str = TELEMETRY_EXPORTER, path: str = TELEMETRY_FILE):
+    """Installs the OpenTelemetry SDK with the chosen exporter; call once per process."""
+    if exporter == "none":
+        return
+
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import ConsoleMetricExporter, PeriodicExportingMetricReader
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    resource = Resource.create({"service.name": SERVICE_NAME, "process.role": os.getenv("PROCESS_ROLE", "standalone")})
+    if exporter == "console":
+        span_exporter, metric_exporter = ConsoleSpanExporter(), ConsoleMetricExporter()
+    elif exporter == "file":
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        out = open(path, "a", encoding="utf-8")
+        span_exporter = ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+        metric_exporter = ConsoleMetricExporter(out=out, formatter=lambda data: data.to_json(indent=None) + "\n")
+    elif exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        span_exporter, metric_exporter = OTLPSpanExporter(), OTLPMetricExporter()
+    else:
+        raise ValueError(f"Unknown TELEMETRY_EXPORTER {exporter!r}; use none, console, file or otlp")
+
+    tracer_provider = TracerProvider(resource=resource)
+    tracer_provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    trace.set_tracer_provider(tracer_provider)
+    reader = PeriodicExportingMetricReader(metric_exporter, export_interval_millis=TELEMETRY_EXPORT_INTERVAL * 1000)
+    metrics.set_meter_provider(MeterProvider(resource=resource, metric_readers=[reader]))
+    logger.info(f"Telemetry exporting to {exporter}")
+
+
+def shutdown_telemetry():
+    """Flushes pending spans and metrics; called on shutdown."""
+    for provider in (trace.get_tracer_provider(), metrics.get_meter_provider()):
+        if hasattr(provider, "shutdown"):
+            provider.shutdown()